@@ -2,6 +2,7 @@ from app.agents.intention_detection import IntentionDetectionAgent
 from app.agents.context_extraction import ContextExtractionAgent
 from app.agents.daily_planner import DailyPlannerAgent
 from app.agents.hotel_recommender import HotelRecommenderAgent
+from app.agents.conversation_summary import ConversationSummaryAgent
 # from app.agents.itinerary_integrator import ItineraryIntegratorAgent
 # from app.agents.itinerary_evaluator import ItineraryEvaluatorAgent
 
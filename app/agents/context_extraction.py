@@ -34,6 +34,9 @@ class ContextExtractionAgent(BaseAgent):
             
             Update Target: {update_target}
 
+            Recent Conversation:
+            {conversation}
+
             Return the complete updated JSON object with all fields.
             """
         )
@@ -65,16 +68,18 @@ class ContextExtractionAgent(BaseAgent):
         self,
         current_context: ContextArtifact,
         query: str,
-        update_target: str
+        update_target: str,
+        conversation: str = ""
     ) -> Union[ContextExtractionEvent, StopEvent]:
-        """Update existing context with new information."""
+        """Update existing context with new information, using the conversation so far for reference."""
         try:
             updated_context = await self.llm.astructured_predict(
                 ContextArtifact,
                 self.update_prompt,
                 current_context=current_context.model_dump(),
                 query=query,
-                update_target=update_target
+                update_target=update_target,
+                conversation=conversation or "(none)"
             )
             self._log_verbose(f"Step - ContextExtractionAgent: Context update successful: {updated_context}")
             
@@ -0,0 +1,47 @@
+from typing import Dict, List, Optional
+from llama_index.llms.openai import OpenAI
+from llama_index.core import PromptTemplate
+from app.agents.base import BaseAgent
+
+class ConversationSummaryAgent(BaseAgent):
+    def __init__(self, llm: OpenAI, verbose: bool = False):
+        super().__init__(llm, verbose)
+        self.summary_prompt = PromptTemplate(
+            template="""
+            You maintain a running summary of a travel planning conversation.
+
+            Summary so far:
+            {summary}
+
+            Older messages to fold into the summary:
+            {messages}
+
+            Write the updated summary in at most 120 words. Keep decisions and constraints
+            the user stated (destination, dates, duration, group, budget, preferences) and
+            anything they asked to change or rejected. Drop greetings and small talk.
+            Return only the summary text.
+            """
+        )
+
+    async def process(self, summary: str, messages: List[Dict[str, str]]) -> Optional[str]:
+        """
+        Fold older conversation messages into the rolling summary.
+
+        Args:
+            summary: The current summary, empty if there is none yet
+            messages: Messages that dropped out of the recent history, oldest first
+
+        Returns:
+            The updated summary, or None if summarization fails
+        """
+        try:
+            updated = await self.llm.apredict(
+                self.summary_prompt,
+                summary=summary or "(none)",
+                messages="\n".join(f"{message['role']}: {message['content']}" for message in messages)
+            )
+            self._log_verbose(f"Step - ConversationSummaryAgent: Summarized {len(messages)} messages")
+            return updated.strip()
+        except Exception as e:
+            self._log_verbose(f"Error summarizing conversation: {str(e)}")
+            return None
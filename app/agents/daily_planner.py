@@ -1,16 +1,54 @@
-from typing import List, Dict, Any
+import re
+import asyncio
+from typing import List, Dict, Any, Callable, Optional, Set
 from datetime import date
+from pydantic import BaseModel
 from app.agents.base import BaseAgent
-from app.workflow.models import TravelItinerary
+from app.workflow.models import TravelItinerary, DayPlan, TripSkeleton, DaySkeleton, Location
 from app.workflow.events import StopEvent, PlanGenerationEvent
 from app.artifacts.context import ContextArtifact
 from app.artifacts.itinerary import ItineraryArtifact
 from llama_index.llms.openai import OpenAI
 from llama_index.core import PromptTemplate
+from app.config.constants import PLANNER_FAN_OUT_MIN_DAYS, PLANNER_MAX_PARALLEL_DAYS
+
+# Context fields that change every day of the plan when updated
+PLAN_WIDE_FIELDS = ("group_size", "budget", "preferences")
+
+ORDINAL_DAYS = {
+    "first": 1, "second": 2, "third": 3, "fourth": 4, "fifth": 5,
+    "sixth": 6, "seventh": 7, "eighth": 8, "ninth": 9, "tenth": 10
+}
+CHINESE_NUMERALS = {"一": 1, "二": 2, "兩": 2, "三": 3, "四": 4, "五": 5, "六": 6, "七": 7, "八": 8, "九": 9, "十": 10}
+
+def referenced_days(query: str, num_days: int) -> Set[int]:
+    """Day numbers explicitly mentioned in an update request, e.g. "day 3", "3rd day", "第三天", "last day"."""
+    text = query.lower()
+    days = set()
+    for match in re.finditer(r"\bday[\s\-_#]*(\d+)|\b(\d+)(?:st|nd|rd|th)\s+day", text):
+        days.add(int(match.group(1) or match.group(2)))
+    for word, number in ORDINAL_DAYS.items():
+        if re.search(rf"\b{word}\s+day", text):
+            days.add(number)
+    for match in re.finditer(r"第\s*(\d+|[一二兩三四五六七八九十])\s*[天日]", query):
+        token = match.group(1)
+        days.add(int(token) if token.isdigit() else CHINESE_NUMERALS[token])
+    if re.search(r"\b(last|final)\s+day|最後一[天日]", text):
+        days.add(num_days)
+    return {day for day in days if 1 <= day <= num_days}
 
 class DailyPlannerAgent(BaseAgent):
-    def __init__(self, llm: OpenAI, verbose: bool = False):
+    def __init__(
+        self,
+        llm: OpenAI,
+        verbose: bool = False,
+        fan_out_min_days: Optional[int] = PLANNER_FAN_OUT_MIN_DAYS,
+        max_parallel_days: int = PLANNER_MAX_PARALLEL_DAYS
+    ):
         super().__init__(llm, verbose)
+        # Trips of at least fan_out_min_days are outlined first and planned day by day in parallel
+        self.fan_out_min_days = fan_out_min_days
+        self.max_parallel_days = max_parallel_days
         self.planning_prompt = PromptTemplate(
             template="""
             Create a detailed day-by-day travel itinerary for:
@@ -64,9 +102,73 @@ class DailyPlannerAgent(BaseAgent):
             """
     )
 
-    def _prepare_prompt_variables(self, context: ContextArtifact) -> Dict[str, Any]:
+        self.skeleton_prompt = PromptTemplate(
+            template="""
+            Outline a {duration}-day travel itinerary for:
+                Destination: {destination}
+                Group Size: {group_size}
+                Budget: {budget}
+                Preferences: {preferences}
+
+            For each day, provide only:
+                1. Day number
+                2. Main location (county and district)
+                3. A short theme for the day
+
+            Order the days so that travel between consecutive locations is practical,
+            and spread the preferences across the trip without repeating a theme.
+            """
+        )
+
+        self.day_prompt = PromptTemplate(
+            template="""
+            Create the schedule for day {day} of a {duration}-day trip to {destination}:
+                Group Size: {group_size}
+                Budget: {budget}
+                Preferences: {preferences}
+                Main location: {location}
+                Theme of the day: {theme}
+
+            Outline of the whole trip (don't repeat activities planned for other days):
+            {trip_outline}
+
+            Return the day with its main location and a schedule as a chronological list
+            of events, where each event has:
+                - time (in 24-hour format, e.g. "09:00")
+                - type ("activity", "meal", or "transit")
+                - description (what to do/eat/how to move)
+                - location (county and district, e.g. "台北市信義區")
+
+            Ensure:
+            - Activities are reasonably spaced
+            - Include breakfast, lunch, and dinner
+            - Account for travel time between locations
+            - Stay within daily budget
+            """
+        )
+
+        self.day_update_prompt = PromptTemplate(
+            template="""
+            Update day {day} of a {duration}-day trip to {destination}:
+                Group Size: {group_size}
+                Budget: {budget}
+                Preferences: {preferences}
+
+            Current plan for the day:
+            {day_plan}
+
+            Change request: {query}
+            Update target: {update_target}
+
+            Apply the change request to this day. Keep every event the request doesn't
+            affect exactly as it is, and adjust neighbouring events only where timing or
+            travel requires it. Return the complete updated day.
+            """
+        )
+
+    def _prepare_prompt_variables(self, context: ContextArtifact, start_date: Optional[date] = None) -> Dict[str, Any]:
         """Prepare and validate all variables needed for the prompt"""
-        start_date = date.today() # Default to start Today
+        start_date = start_date or date.today() # Default to start Today
         
         return {
             "destination": getattr(context, "destination", "Unknown"),
@@ -78,25 +180,252 @@ class DailyPlannerAgent(BaseAgent):
         }
 
 
-    async def process(self, context: ContextArtifact) -> PlanGenerationEvent:
-        """Generate daily plans based on travel context."""
+    async def _stream_itinerary(
+        self,
+        prompt_vars: Dict[str, Any],
+        on_day_plan: Callable[[DayPlan], None]
+    ) -> TravelItinerary:
+        """Generate the itinerary with a streaming LLM call, reporting each day as soon as it is complete."""
+        emitted = 0
+        partial = None
+        stream = await self.llm.astream_structured_predict(
+            TravelItinerary,
+            self.planning_prompt,
+            **prompt_vars
+        )
+        async for partial in stream:
+            plans = getattr(partial, "daily_plans", None) or []
+            # Every day except the last one in a partial result is complete
+            while emitted < len(plans) - 1:
+                plan = plans[emitted]
+                try:
+                    day_plan = DayPlan.model_validate(plan.model_dump() if isinstance(plan, BaseModel) else plan)
+                except Exception:
+                    break  # Not parseable yet; retry on the next partial result
+                on_day_plan(day_plan)
+                emitted += 1
+
+        if partial is None:
+            raise ValueError("LLM stream produced no output")
+        itinerary = TravelItinerary.model_validate(partial.model_dump())
+        for day_plan in itinerary.daily_plans[emitted:]:
+            on_day_plan(day_plan)
+        return itinerary
+
+    async def _plan_day(
+        self,
+        skeleton: DaySkeleton,
+        trip_outline: str,
+        prompt_vars: Dict[str, Any],
+        semaphore: asyncio.Semaphore,
+        keep_location: bool = True
+    ) -> DayPlan:
+        """Generate the schedule for one day of the outline."""
+        location = skeleton.location
+        async with semaphore:
+            day_plan = await self.llm.astructured_predict(
+                DayPlan,
+                self.day_prompt,
+                day=skeleton.day,
+                location=f"{location.county}{location.district or ''}",
+                theme=skeleton.theme or "general sightseeing",
+                trip_outline=trip_outline,
+                **prompt_vars
+            )
+        # The outline is authoritative for the day number and, unless told otherwise, the main location
+        update = {"day": skeleton.day}
+        if keep_location:
+            update["location"] = skeleton.location
+        return day_plan.model_copy(update=update)
+
+    async def _update_day(
+        self,
+        day_plan: DayPlan,
+        query: str,
+        update_target: str,
+        prompt_vars: Dict[str, Any],
+        semaphore: asyncio.Semaphore
+    ) -> DayPlan:
+        """Apply a change request to a single existing day."""
+        async with semaphore:
+            updated = await self.llm.astructured_predict(
+                DayPlan,
+                self.day_update_prompt,
+                day=day_plan.day,
+                day_plan=day_plan.model_dump_json(),
+                query=query,
+                update_target=update_target,
+                **prompt_vars
+            )
+        return updated.model_copy(update={"day": day_plan.day})
+
+    async def _update_itinerary(
+        self,
+        current: TravelItinerary,
+        previous_context: ContextArtifact,
+        updated_context: ContextArtifact,
+        prompt_vars: Dict[str, Any],
+        query: str,
+        update_target: Optional[str],
+        on_day_plan: Optional[Callable[[DayPlan], None]] = None
+    ) -> TravelItinerary:
+        """
+        Regenerate only the days affected by an update, reusing the others verbatim.
+
+        A new destination replans the whole trip. A changed duration drops or appends
+        days at the end. Changes to group size, budget or preferences update every day;
+        otherwise only the days named in the request are updated (all days if none are
+        named), and requests targeting hotels leave the plan untouched.
+        """
+        changed = {
+            field for field in ContextArtifact.model_fields
+            if getattr(previous_context, field) != getattr(updated_context, field)
+        }
+        if "destination" in changed:
+            self._log_verbose("Step - DailyPlannerAgent: Destination changed, replanning the whole trip")
+            return await self._generate_itinerary(prompt_vars, on_day_plan)
+
+        plans = sorted(current.daily_plans, key=lambda plan: plan.day)
+        duration = updated_context.duration or len(plans)
+        kept = plans[:duration]
+
+        target = update_target or "general"
+        if changed & set(PLAN_WIDE_FIELDS):
+            days_to_update = {plan.day for plan in kept}
+        elif "hotel" in target.lower():
+            days_to_update = set()
+        else:
+            days_to_update = referenced_days(query, len(kept))
+            if not days_to_update and "duration" not in changed:
+                days_to_update = {plan.day for plan in kept}
+
+        semaphore = asyncio.Semaphore(self.max_parallel_days)
+        tasks = [
+            asyncio.create_task(self._update_day(plan, query, target, prompt_vars, semaphore))
+            for plan in kept if plan.day in days_to_update
+        ]
+        # Days added by a longer duration continue from where the last day ended
+        last_location = kept[-1].location if kept else Location(county=prompt_vars["destination"] or "")
+        trip_outline = "\n".join(
+            f"Day {plan.day}: {plan.location.county}{plan.location.district or ''} - "
+            + ", ".join(item.get("description", "") for item in plan.activities)
+            for plan in kept
+        )
+        tasks += [
+            asyncio.create_task(self._plan_day(
+                DaySkeleton(day=day, location=last_location),
+                trip_outline,
+                prompt_vars,
+                semaphore,
+                keep_location=False
+            ))
+            for day in range(len(kept) + 1, duration + 1)
+        ]
+        self._log_verbose(
+            f"Step - DailyPlannerAgent: Updating days {sorted(days_to_update)}, "
+            f"adding {max(0, duration - len(kept))}, reusing {len(kept) - len(days_to_update)}"
+        )
+
+        regenerated = {}
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                day_plan = await next_done
+                regenerated[day_plan.day] = day_plan
+                if on_day_plan is not None:
+                    on_day_plan(day_plan)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+        daily_plans = [regenerated.get(plan.day, plan) for plan in kept]
+        daily_plans += [regenerated[day] for day in range(len(kept) + 1, duration + 1)]
+        return TravelItinerary(daily_plans=daily_plans)
+
+    async def _fan_out_itinerary(
+        self,
+        prompt_vars: Dict[str, Any],
+        on_day_plan: Optional[Callable[[DayPlan], None]] = None
+    ) -> TravelItinerary:
+        """Outline the trip with one cheap call, then generate every day's schedule concurrently."""
+        duration = prompt_vars["duration"]
+        skeleton = await self.llm.astructured_predict(
+            TripSkeleton,
+            self.skeleton_prompt,
+            **prompt_vars
+        )
+        days = sorted(skeleton.days, key=lambda d: d.day)[:duration]
+        if len(days) < duration:
+            raise ValueError(f"Trip outline has {len(days)} days, expected {duration}")
+        days = [d.model_copy(update={"day": number}) for number, d in enumerate(days, start=1)]
+        self._log_verbose(f"Step - DailyPlannerAgent: Trip outline generated - {days}")
+
+        trip_outline = "\n".join(
+            f"Day {d.day}: {d.location.county}{d.location.district or ''} - {d.theme or 'general sightseeing'}"
+            for d in days
+        )
+        semaphore = asyncio.Semaphore(self.max_parallel_days)
+        tasks = [
+            asyncio.create_task(self._plan_day(d, trip_outline, prompt_vars, semaphore))
+            for d in days
+        ]
+        try:
+            if on_day_plan is not None:
+                for next_done in asyncio.as_completed(tasks):
+                    on_day_plan(await next_done)
+            daily_plans = await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+        return TravelItinerary.model_validate({"daily_plans": [plan.model_dump() for plan in daily_plans]})
+
+    async def _generate_itinerary(
+        self,
+        prompt_vars: Dict[str, Any],
+        on_day_plan: Optional[Callable[[DayPlan], None]] = None
+    ) -> TravelItinerary:
+        """Generate a whole itinerary, fanning out per day for long trips."""
+        if self.fan_out_min_days is not None and (prompt_vars["duration"] or 1) >= self.fan_out_min_days:
+            return await self._fan_out_itinerary(prompt_vars, on_day_plan)
+        if on_day_plan is not None:
+            return await self._stream_itinerary(prompt_vars, on_day_plan)
+        return await self.llm.astructured_predict(
+            TravelItinerary,
+            self.planning_prompt,
+            **prompt_vars
+        )
+
+    async def process(
+        self,
+        context: ContextArtifact,
+        on_day_plan: Optional[Callable[[DayPlan], None]] = None
+    ) -> PlanGenerationEvent:
+        """
+        Generate daily plans based on travel context.
+
+        Args:
+            context (ContextArtifact): Travel context
+            on_day_plan (Callable): If given, called with each day as soon as it has been generated
+        """
         try:
     
             # Prepare prompt variables with defaults
-            prompt_vars = self._prepare_prompt_variables(context)
+            start_date = date.today()
+            prompt_vars = self._prepare_prompt_variables(context, start_date)
 
             # Generate daily plans
-            daily_plans = await self.llm.astructured_predict(
-                TravelItinerary,
-                self.planning_prompt,
-                **prompt_vars
-            )
+            daily_plans = await self._generate_itinerary(prompt_vars, on_day_plan)
 
             self._log_verbose(f"Step - DailyPlannerAgent: Daily plans generated - {daily_plans}")
 
-            # Create itinerary artifact
+            # Create itinerary artifact; the start date is kept so later updates plan the same dates
             itinerary = ItineraryArtifact(
-                itinerary=daily_plans
+                itinerary=daily_plans,
+                start_date=start_date
             )
             
             return PlanGenerationEvent(content=itinerary)
@@ -113,27 +442,47 @@ class DailyPlannerAgent(BaseAgent):
     async def update_plans(
         self,
         existing_itinerary: ItineraryArtifact,
-        updated_context: ContextArtifact
+        updated_context: ContextArtifact,
+        previous_context: Optional[ContextArtifact] = None,
+        query: str = "",
+        update_target: Optional[str] = None,
+        on_day_plan: Optional[Callable[[DayPlan], None]] = None
     ) -> PlanGenerationEvent:
-        """Update existing plans with new context."""
+        """
+        Update existing plans with new context, regenerating only the affected days.
+
+        Args:
+            existing_itinerary (ItineraryArtifact): Itinerary from the previous turn
+            updated_context (ContextArtifact): Context after this update
+            previous_context (ContextArtifact): Context before this update; without it the trip is replanned
+            query (str): The user's update request
+            update_target (str): What the update targets, as detected by the intention agent
+            on_day_plan (Callable): If given, called with each regenerated day as soon as it is ready
+        """
         try:
             # Prepare prompt variables with defaults
-            prompt_vars = self._prepare_prompt_variables(updated_context)
-            
-            if existing_itinerary.itinerary:
-                prompt_vars["start_date"] = existing_itinerary.itinerary.start_date.isoformat()
+            prompt_vars = self._prepare_prompt_variables(updated_context, existing_itinerary.start_date)
+            current = existing_itinerary.itinerary
 
-            # Generate new plans with updated context
-            new_itinerary = await self.llm.astructured_predict(
-                TravelItinerary,
-                self.planning_prompt,
-                **prompt_vars
-            )
+            if current and current.daily_plans and previous_context is not None:
+                new_itinerary = await self._update_itinerary(
+                    current,
+                    previous_context,
+                    updated_context,
+                    prompt_vars,
+                    query,
+                    update_target,
+                    on_day_plan
+                )
+            else:
+                # Nothing to diff against; generate new plans with updated context
+                new_itinerary = await self._generate_itinerary(prompt_vars, on_day_plan)
 
-            # Update existing itinerary
-            existing_itinerary.update_itinerary(new_itinerary)
+            # Update a copy so the previous itinerary stays available for comparison
+            updated_itinerary = existing_itinerary.model_copy(deep=True)
+            updated_itinerary.update_itinerary(new_itinerary)
             
-            return PlanGenerationEvent(content=existing_itinerary)
+            return PlanGenerationEvent(content=updated_itinerary)
             
         except Exception as e:
             self._log_verbose(f"Error updating daily plans: {str(e)}")
@@ -142,4 +491,4 @@ class DailyPlannerAgent(BaseAgent):
                     "status": "error",
                     "message": "Failed to update daily plans. Please try again."
                 }
-            )
\ No newline at end of file
+            )
@@ -1,23 +1,85 @@
 import os
+import asyncio
 import httpx
+from functools import partial
+from itertools import groupby
 from dotenv import load_dotenv
-from typing import List, Optional
-from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Set, Tuple
+from datetime import date, datetime, time, timedelta
 from llama_index.core.tools import FunctionTool
 from llama_index.llms.openai import OpenAI
 from app.agents.base import BaseAgent
-from app.config.constants import BASE_URL
+from app.config.constants import (
+    BASE_URL,
+    HTTP_REQUEST_TIMEOUT,
+    HOTEL_VACANCY_CONCURRENCY,
+    HOTEL_STEP_DEADLINE,
+    HOTEL_INVENTORY_COUNTIES,
+    HOTEL_INVENTORY_REFRESH_INTERVAL,
+    HOTEL_INVENTORY_REFRESH_CONCURRENCY
+)
 from app.artifacts.itinerary import ItineraryArtifact
-from app.workflow.models import VacancySearchParams, HotelSearchParams, HotelPlanParams, HotelRecommendation
+from app.artifacts.context import ContextArtifact
+from app.workflow.models import (
+    VacancySearchParams,
+    HotelSearchParams,
+    HotelPlanParams,
+    HotelRecommendation,
+    HotelNight,
+    DayPlan
+)
 from app.workflow.events import HotelRecommendationEvent
 from app.utils.counties_mapper import CountyMapper
-from app.workflow.models import Location, HotelRoom
+from app.utils.gazetteer import taiwan_gazetteer
+from app.utils.hotel_ranking import HotelRanker, hotel_ranker
+from app.utils.hotel_inventory import HotelInventory, hotel_inventory
+from app.utils.vacancies import VacancyPrefetch, parse_vacancies
+from app.utils.response_cache import ResponseCache
+from app.utils.rate_limiter import Priority, UpstreamLimiters, priority_scope, upstream_limiters, retry_after_seconds
+from app.utils.resilience import ResilienceLayer, CircuitOpenError, UpstreamStatusError, hotel_api_resilience
 
 _ = load_dotenv('.env')
 
+class Stay(NamedTuple):
+    """Consecutive nights spent in one county, booked as one check-in/check-out window"""
+    county_id: int
+    check_in_date: datetime
+    check_out_date: datetime
+    days: List[int]  # Itinerary day each night follows
+    centroids: List[Optional[Tuple[float, float]]]  # Activity centroid of each night's day in the county
+
+class StayRecommendations(NamedTuple):
+    """Hotels found for a stay and, per night, the IDs of the best ranked ones"""
+    recommendations: List[HotelRecommendation]
+    night_hotel_ids: List[List[str]]
+
 class HotelRecommenderAgent(BaseAgent):
-    def __init__(self, llm: OpenAI, verbose: bool = False):
+    def __init__(
+        self,
+        llm: OpenAI,
+        verbose: bool = False,
+        http_client: Optional[httpx.AsyncClient] = None,
+        response_cache: Optional[ResponseCache] = None,
+        max_concurrency: int = HOTEL_VACANCY_CONCURRENCY,
+        deadline: float = HOTEL_STEP_DEADLINE,
+        limiters: Optional[UpstreamLimiters] = None,
+        resilience: Optional[ResilienceLayer] = None,
+        ranker: Optional[HotelRanker] = None,
+        inventory: Optional[HotelInventory] = None
+    ):
         super().__init__(llm, verbose)
+        # Shared, app-scoped client; falls back to a client per request when not provided
+        self.http_client = http_client
+        self.response_cache = response_cache
+        # Process-wide admission control per hotel endpoint
+        self.limiters = limiters if limiters is not None else upstream_limiters
+        # Process-wide retries, hedging and circuit breakers per hotel endpoint
+        self.resilience = resilience if resilience is not None else hotel_api_resilience
+        self.ranker = ranker if ranker is not None else hotel_ranker
+        # Process-wide offline snapshot answering name searches and static filters for its counties
+        self.inventory = inventory if inventory is not None else hotel_inventory
+        self.max_concurrency = max_concurrency
+        self.deadline = deadline
         self.api_base_url = f"{BASE_URL}/api/v3/tools/interview_test/taiwan_hotels"
         self.api_key = os.getenv("JTCG_API_KEY")
         if not self.api_key:
@@ -28,32 +90,62 @@ class HotelRecommenderAgent(BaseAgent):
         }
         self.tools = self._create_tools()
         self.tools_by_name = {tool.metadata.name: tool for tool in self.tools}
-        self.county_mapper = CountyMapper()
+        # District names resolve to their county too, e.g. "礁溪鄉" to 宜蘭縣
+        self.county_mapper = CountyMapper(extra_names=taiwan_gazetteer.district_counties())
+        self.prefetch_stats = {"started": 0, "used": 0, "wasted": 0}
 
     async def _make_api_request(self, endpoint: str, params: dict = None) -> dict:
         """
-        Make an authenticated API request.
+        Make an authenticated API request, served from the response cache when configured.
+
+        Upstream calls are retried, hedged and circuit-broken per endpoint; while an
+        endpoint's circuit is open, the last cached response is served even if expired.
         
         Args:
             endpoint (str): API endpoint path
             params (dict): Query parameters
         """
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.api_base_url}/{endpoint}",
-                params=params,
-                headers=self.headers,
-                timeout=30.0  # Add timeout for safety
+        async def fetch() -> dict:
+            return await self.resilience.call(endpoint, lambda: self._fetch_api_response(endpoint, params))
+
+        if self.response_cache is None:
+            return await fetch()
+        try:
+            return await self.response_cache.get_or_fetch(endpoint, params, fetch)
+        except CircuitOpenError:
+            stale = await self.response_cache.get_stale(endpoint, params)
+            if stale is None:
+                raise
+            self._log_verbose(f"Circuit open for {endpoint}, serving a stale cached response")
+            return stale
+
+    async def _fetch_api_response(self, endpoint: str, params: dict = None) -> dict:
+        """Send the request upstream, within the endpoint's rate limit, and validate the response status."""
+        url = f"{self.api_base_url}/{endpoint}"
+        limiter = self.limiters.get(f"hotel:{endpoint}")
+        async with limiter.acquire():
+            if self.http_client is not None:
+                response = await self.http_client.get(url, params=params, headers=self.headers)
+            else:
+                async with httpx.AsyncClient(timeout=HTTP_REQUEST_TIMEOUT) as client:
+                    response = await client.get(url, params=params, headers=self.headers)
+
+        if response.status_code == 429:
+            limiter.record_throttle(retry_after_seconds(response.headers))
+            raise UpstreamStatusError(f"API request throttled for {endpoint}", response.status_code)
+        limiter.record_success()
+
+        if response.status_code == 401:
+            raise UpstreamStatusError("Invalid API key", response.status_code)
+        elif response.status_code == 403:
+            raise UpstreamStatusError("Unauthorized access", response.status_code)
+        elif response.status_code != 200:
+            raise UpstreamStatusError(
+                f"API request failed with status {response.status_code}: {response.text}",
+                response.status_code
             )
-            
-            if response.status_code == 401:
-                raise ValueError("Invalid API key")
-            elif response.status_code == 403:
-                raise ValueError("Unauthorized access")
-            elif response.status_code != 200:
-                raise ValueError(f"API request failed with status {response.status_code}: {response.text}")
-            
-            return response.json()
+
+        return response.json()
 
     async def search_hotels_by_name(self, keyword: str) -> List[dict]:
         """
@@ -62,6 +154,10 @@ class HotelRecommenderAgent(BaseAgent):
         Args:
             hotel_name (str): Hotel name or keyword to search
         """
+        if self.inventory.covers():
+            hotels = await asyncio.to_thread(self.inventory.search, keyword)
+            if hotels:
+                return hotels
         return await self._make_api_request(
             "hotel/fuzzy_match",
             params={"hotel_name": keyword}
@@ -74,16 +170,74 @@ class HotelRecommenderAgent(BaseAgent):
         Args:
             hotel_name (str): Name of the hotel
         """
+        if self.inventory.covers():
+            hotel = await asyncio.to_thread(self.inventory.details, hotel_name)
+            if hotel is not None:
+                return hotel
+        return await self._fetch_hotel_details(hotel_name)
+
+    async def _fetch_hotel_details(self, hotel_name: str) -> dict:
+        """Get details of a hotel from the API, bypassing the inventory snapshot."""
         return await self._make_api_request(
             "hotel/details",
             params={"hotel_name": hotel_name}
         )
+
+    async def find_hotels(
+        self,
+        county_id: int,
+        district: Optional[str] = None,
+        facilities: Sequence[str] = (),
+        bed_types: Sequence[str] = ()
+    ) -> Optional[List[dict]]:
+        """
+        Find a county's hotels by static attributes in the inventory snapshot, without calling the API.
+
+        Args:
+            county_id (int): County to search
+            district (str): Exact district name, e.g. "信義區"
+            facilities (Sequence[str]): Facilities each hotel needs, matched as substrings, e.g. "停車"
+            bed_types (Sequence[str]): Bed types each hotel needs, matched as substrings
+
+        Returns:
+            Matching hotel records, or None when the snapshot doesn't cover the county, or
+            only holds part of its hotels and none of them match
+        """
+        hotel_ids = await self._filter_inventory(county_id, district, facilities, bed_types)
+        if hotel_ids is None:
+            return None
+        if not hotel_ids and not self.inventory.covers(county_id, complete=True):
+            # A partial listing can't tell that no hotel in the county matches
+            return None
+        return await asyncio.to_thread(self.inventory.hotels, hotel_ids)
+
+    async def _filter_inventory(
+        self,
+        county_id: int,
+        district: Optional[str] = None,
+        facilities: Sequence[str] = (),
+        bed_types: Sequence[str] = ()
+    ) -> Optional[Set[int]]:
+        """IDs of a county's hotels with every given attribute; None when the snapshot doesn't cover the county."""
+        if not self.inventory.covers(county_id):
+            return None
+        facility_matches = self.inventory.match_attributes("facility", facilities)
+        bed_type_matches = self.inventory.match_attributes("bed_type", bed_types)
+        if len(facility_matches) < len(set(facilities)) or len(bed_type_matches) < len(set(bed_types)):
+            return set()  # No hotel in the snapshot has one of the attributes
+        return await asyncio.to_thread(
+            self.inventory.filter,
+            county_id,
+            district,
+            list(facility_matches.values()),
+            list(bed_type_matches.values())
+        )
     
     async def check_hotel_vacancies(
         self,
         check_in_date: datetime,
         check_out_date: datetime,
-        county_ids: List[str]
+        county_ids: List[int]
     ) -> List[dict]:
         """
         Check hotel vacancies for given dates and requirements.
@@ -91,7 +245,7 @@ class HotelRecommenderAgent(BaseAgent):
         Args:
             check_in_date (datetime): Check-in date
             check_out_date (datetime): Check-out date
-            county_ids (List[str]): List of county IDs
+            county_ids (List[int]): List of county IDs, as the county mapper returns them
         """
         return await self._make_api_request(
             "hotel/vacancies",
@@ -170,93 +324,508 @@ class HotelRecommenderAgent(BaseAgent):
             self._log_verbose(f"Error executing tool '{tool_name}': {str(e)}")
             raise
 
-    def _parse_hotel_details(self, hotel_data: dict, available_rooms: List[dict]) -> HotelRecommendation:
-        """Parse raw hotel data into simplified HotelRecommendation model."""
+    async def _recommend_for_stay(
+        self,
+        stay: Stay,
+        semaphore: asyncio.Semaphore,
+        context: Optional[ContextArtifact] = None,
+        trip_nights: Optional[int] = None,
+        prefetched: Optional[asyncio.Task] = None
+    ) -> StayRecommendations:
+        """
+        Check vacancies for one stay and keep the best ranked hotels for each of its nights;
+        failures are logged and yield no recommendations.
+
+        Args:
+            stay (Stay): Consecutive nights in one county, queried as a single check-in/check-out window
+            semaphore (asyncio.Semaphore): Bounds concurrent stay queries
+            context (ContextArtifact): Trip context providing the budget and group size
+            trip_nights (int): Nights of the whole trip, over which a trip budget is spread
+            prefetched (asyncio.Task): Vacancy query for the same stay started ahead of the plan
+        """
+        # Any failure of this stay, from the query to ranking, leaves the other stays unaffected
         try:
-            location = Location(
-                county=hotel_data.get('county', {}).get('name', ''),
-                district=hotel_data.get('district', {}).get('name', ''),
-                latitude=hotel_data.get('latitude'),
-                longitude=hotel_data.get('longitude')
-            )
+            vacancies = None
+            if prefetched is not None:
+                try:
+                    vacancies = await prefetched
+                except Exception as e:
+                    self._log_verbose(f"Prefetch for county {stay.county_id} failed, querying again: {str(e)}")
+            if vacancies is None:
+                async with semaphore:
+                    vacancies = await self.check_hotel_vacancies(
+                        stay.check_in_date,
+                        stay.check_out_date,
+                        [stay.county_id]
+                    )
 
-            # Parse room information from available rooms data
-            rooms = []
-            for room in available_rooms:
-                rooms.append(HotelRoom(
-                    room_name=room.get('name', ''),
-                    bed_types=room.get('bed_types', []),
-                    facilities=room.get('facilities', []),
-                    price=float(room.get('price', 0))
-                ))
+            vacancies = await self._preferred_vacancies(vacancies or [], stay.county_id, context)
 
-            return HotelRecommendation(
-                hotel_id=str(hotel_data['id']),
-                name=hotel_data['name'],
-                location=location,
-                rooms=rooms
+            # Validate the payload in bulk and only build models for the hotels that rank
+            batch = parse_vacancies(vacancies)
+            rankings = self.ranker.rank(
+                batch.table,
+                stay.centroids,
+                budget=context.budget if context else None,
+                group_size=context.group_size if context else None,
+                nights=trip_nights
             )
+            selected = list(dict.fromkeys(index for ranking in rankings for index in ranking.tolist()))
+            recommendations = batch.recommendations(selected)
+            if batch.errors:
+                first = batch.errors[0]
+                self._log_verbose(
+                    f"Skipped {len(batch.errors)} malformed vacancies in county {stay.county_id}, "
+                    f"e.g. hotel {first.hotel_id}: {first.message}"
+                )
+
+            built = {hotel.hotel_id for hotel in recommendations}
+            night_hotel_ids = [
+                [hotel_id for index in ranking.tolist() if (hotel_id := str(batch.records[index]["id"])) in built]
+                for ranking in rankings
+            ]
+            return StayRecommendations(recommendations, night_hotel_ids)
         except Exception as e:
-            self._log_verbose(f"Error parsing hotel details: {str(e)}")
-            raise
+            self._log_verbose(f"Error processing county {stay.county_id}: {str(e)}")
+            return StayRecommendations([], [[] for _ in stay.days])
 
-    async def process(self, content: ItineraryArtifact) -> HotelRecommendationEvent:
-        """Generate hotel recommendations based on itinerary content."""
-        # Extract locations and map to county IDs
-        print(content.itinerary)
-        county_ids = set()
-        for plan in content.itinerary.daily_plans:
-            for activity in plan.activities:
-                if 'location' in activity:
-                    county_id = self.county_mapper.get_county_id(activity['location'])
-                    if county_id:
-                        county_ids.add(county_id)
-                        self._log_verbose(f"Mapped location '{activity['location']}' to county ID {county_id}")
+    async def _preferred_vacancies(
+        self,
+        vacancies: List[dict],
+        county_id: int,
+        context: Optional[ContextArtifact]
+    ) -> List[dict]:
+        """
+        Keep the vacancies of hotels that have the facilities and bed types among the trip's preferences.
 
-        if not county_ids:
-            self._log_verbose("No valid counties found in itinerary")
-            return HotelRecommendationEvent(content=content)
+        Attributes come from the inventory snapshot, so this only applies to counties it covers;
+        preferences that aren't hotel attributes are ignored, and every vacancy is kept when
+        fewer hotels than the ranker recommends would remain.
+        """
+        if not context or not context.preferences or not vacancies or not self.inventory.covers(county_id):
+            return vacancies
+        facilities = list(self.inventory.match_attributes("facility", context.preferences))
+        bed_types = list(self.inventory.match_attributes("bed_type", context.preferences))
+        if not facilities and not bed_types:
+            return vacancies
+        hotel_ids = {str(hotel_id) for hotel_id in await self._filter_inventory(county_id, None, facilities, bed_types)}
+        preferred = [vacancy for vacancy in vacancies if isinstance(vacancy, dict) and str(vacancy.get("id")) in hotel_ids]
+        if len(preferred) < self.ranker.k:
+            self._log_verbose(
+                f"Only {len(preferred)} hotels in county {county_id} have {facilities + bed_types}; ranking all vacancies"
+            )
+            return vacancies
+        self._log_verbose(f"{len(preferred)}/{len(vacancies)} hotels in county {county_id} have {facilities + bed_types}")
+        return preferred
+
+    async def refresh_inventory(self, county_ids: Iterable[int] = HOTEL_INVENTORY_COUNTIES) -> int:
+        """
+        Rebuild the inventory snapshot for the given counties and reopen it.
 
-        # Calculate stay duration and requirements
-        check_in_date = content.context.start_date
-        check_out_date = check_in_date + timedelta(days=content.context.duration)
+        A county's hotels are those with a vacancy tomorrow night plus those already in the
+        snapshot, each fetched again from hotel/details; when that fails the previous or
+        vacancy record is kept. Fully booked hotels can be missing, so refreshed counties are
+        marked as partial listings. Other counties in the snapshot are carried over unchanged.
 
-        hotel_recommendations = []
+        Args:
+            county_ids (Iterable[int]): Counties to refresh
+
+        Returns:
+            Number of hotels in the new snapshot
+        """
+        county_ids = list(county_ids)
+        check_in_date = self._trip_start() + timedelta(days=1)
+        semaphore = asyncio.Semaphore(HOTEL_INVENTORY_REFRESH_CONCURRENCY)
+
+        async def fetch_details(record: dict) -> dict:
+            try:
+                async with semaphore:
+                    hotel = await self._fetch_hotel_details(record["name"])
+            except Exception as e:
+                self._log_verbose(f"Keeping the previous record of hotel {record.get('id')}: {str(e)}")
+                return record
+            if isinstance(hotel, list):
+                hotel = next((item for item in hotel if isinstance(item, dict) and item.get("id") == record.get("id")), None)
+            return hotel if isinstance(hotel, dict) and hotel.get("id") is not None else record
+
+        refreshed_at = self.inventory.refreshed_at()
+        complete = {county_id: county_id in self.inventory.complete_county_ids() for county_id in refreshed_at}
+        records_by_county: Dict[int, List[dict]] = {}
+        for county_id in refreshed_at:
+            records_by_county[county_id] = await asyncio.to_thread(self.inventory.county_records, county_id)
         for county_id in county_ids:
+            started = datetime.now().timestamp()
             try:
-                # First, check vacancies
-                vacancies = await self.execute_tool(
-                    "check_vacancies",
-                    params={
-                        "county_id": county_id,
-                        "check_in_date": check_in_date.strftime("%Y-%m-%d"),
-                        "check_out_date": check_out_date.strftime("%Y-%m-%d"),
-                    }
+                vacancies = await self.check_hotel_vacancies(check_in_date, check_in_date + timedelta(days=1), [county_id])
+            except Exception as e:
+                self._log_verbose(f"Error refreshing inventory for county {county_id}: {str(e)}")
+                continue
+            hotels = {str(record["id"]): record for record in records_by_county.get(county_id, [])}
+            hotels.update((str(record["id"]), record) for record in parse_vacancies(vacancies or []).records)
+            records_by_county[county_id] = list(await asyncio.gather(*(fetch_details(record) for record in hotels.values())))
+            refreshed_at[county_id] = started
+            complete[county_id] = False
+
+        count = await asyncio.to_thread(
+            HotelInventory.build, self.inventory.path, records_by_county, refreshed_at, complete
+        )
+        await asyncio.to_thread(self.inventory.open)
+        self._log_verbose(f"Hotel inventory refreshed for counties {county_ids}: {count} hotels")
+        return count
+
+    async def maintain_inventory(
+        self,
+        county_ids: Sequence[int] = HOTEL_INVENTORY_COUNTIES,
+        interval: float = HOTEL_INVENTORY_REFRESH_INTERVAL
+    ) -> None:
+        """
+        Refresh the snapshot's counties whenever they are `interval` seconds old, until cancelled.
+
+        Meant to run as a background task; start it within priority_scope(Priority.BACKGROUND)
+        so refreshes wait behind interactive hotel API calls.
+        """
+        while True:
+            refreshed_at = self.inventory.refreshed_at()
+            now = datetime.now().timestamp()
+            due = [county_id for county_id in county_ids if now - refreshed_at.get(county_id, 0.0) >= interval]
+            if due:
+                try:
+                    await self.refresh_inventory(due)
+                except Exception as e:
+                    self._log_verbose(f"Error refreshing hotel inventory: {str(e)}")
+            refreshed_at = self.inventory.refreshed_at()
+            next_due = min(refreshed_at.get(county_id, 0.0) + interval for county_id in county_ids) if county_ids else now + interval
+            # Counties that failed to refresh are retried after a while rather than immediately
+            await asyncio.sleep(max(interval / 24, next_due - datetime.now().timestamp()))
+
+    def _overnight_county(self, plan: DayPlan) -> Optional[int]:
+        """County the night after a day is spent in: the day's main location, else where its last activity is."""
+        for text in (plan.location.county, plan.location.district or ""):
+            county_id = self.county_mapper.get_county_id(text) if text else None
+            if county_id:
+                return county_id
+        for activity in reversed(plan.activities):
+            county_id = self.county_mapper.get_county_id(activity.get('location', ''))
+            if county_id:
+                return county_id
+        return None
+
+    @staticmethod
+    def _night_centroid(plan: DayPlan, county_id: int) -> Optional[Tuple[float, float]]:
+        """Centroid of the day's activity locations in the overnight county, else of the day's main location."""
+        points = [
+            (place.latitude, place.longitude)
+            for activity in plan.activities
+            for place in taiwan_gazetteer.resolve(activity.get('location', ''))
+            if place.county_id == county_id
+        ]
+        if not points and plan.location.latitude is not None and plan.location.longitude is not None:
+            return plan.location.latitude, plan.location.longitude
+        if not points:
+            points = [
+                (place.latitude, place.longitude)
+                for place in taiwan_gazetteer.resolve(f"{plan.location.county}{plan.location.district or ''}")
+                if place.county_id == county_id
+            ]
+        if not points:
+            return None
+        return (
+            sum(point[0] for point in points) / len(points),
+            sum(point[1] for point in points) / len(points)
+        )
+
+    @staticmethod
+    def _trip_start(content: Optional[ItineraryArtifact] = None) -> datetime:
+        """
+        Check-in date of the first night: the itinerary's start date, or today for a trip not planned yet.
+
+        Itineraries stored before start dates were kept are dated from their hotel plan.
+        """
+        start = content.start_date if content else None
+        if start is None and content and content.hotel_plan:
+            first = min(content.hotel_plan, key=lambda night: night.day)
+            start = first.night_date - timedelta(days=first.day - 1)
+        return datetime.combine(start or date.today(), time.min)
+
+    @staticmethod
+    def _trip_nights(days: int) -> int:
+        """Nights of a trip: one after every day but the last, and one for a day trip."""
+        return max(1, days - 1)
+
+    def _plan_stays(self, content: ItineraryArtifact) -> List[Stay]:
+        """
+        Split the itinerary's nights into stays of consecutive nights in the same county.
+
+        Each night follows a day of the plan and is spent in that day's overnight county;
+        nights whose county can't be determined stay where the previous night was.
+        """
+        if not content.itinerary or not content.itinerary.daily_plans:
+            return []
+        plans = sorted(content.itinerary.daily_plans, key=lambda plan: plan.day)
+        nights = plans[:self._trip_nights(len(plans))]
+
+        county_ids: List[Optional[int]] = []
+        for plan in nights:
+            county_ids.append(self._overnight_county(plan) or (county_ids[-1] if county_ids else None))
+        first_county_id = next((county_id for county_id in county_ids if county_id), None)
+        if first_county_id is None:
+            return []
+
+        start = self._trip_start(content)
+        stays = []
+        offset = 0
+        for county_id, group in groupby(zip(nights, county_ids), key=lambda night: night[1] or first_county_id):
+            group_plans = [plan for plan, _ in group]
+            check_in_date = start + timedelta(days=offset)
+            offset += len(group_plans)
+            stays.append(Stay(
+                county_id,
+                check_in_date,
+                start + timedelta(days=offset),
+                [plan.day for plan in group_plans],
+                [self._night_centroid(plan, county_id) for plan in group_plans]
+            ))
+            self._log_verbose(
+                f"Stay in county {county_id} for days {stays[-1].days}: "
+                f"{check_in_date:%Y-%m-%d} to {stays[-1].check_out_date:%Y-%m-%d}"
+            )
+        return stays
+
+    def prefetch_vacancies(self, context: ContextArtifact) -> Optional[VacancyPrefetch]:
+        """
+        Start vacancy queries for the destination's counties in the background, before the plan exists.
+
+        The queries run at prefetch priority, behind interactive upstream calls, and are
+        handed to `process` through the returned VacancyPrefetch; the caller cancels
+        whatever the plan doesn't use. They cover the whole trip, so a county is only
+        taken when the plan stays there every night.
+
+        Args:
+            context (ContextArtifact): Extracted trip context
+
+        Returns:
+            The started queries, or None when the destination or duration is unknown
+        """
+        if not context.is_sufficient():
+            return None
+        county_ids = list(dict.fromkeys(self.county_mapper.find_all(context.destination)))
+        if not county_ids:
+            county_id = self.county_mapper.get_county_id(context.destination)
+            county_ids = [county_id] if county_id else []
+        if not county_ids:
+            self._log_verbose(f"No county found for destination '{context.destination}', not prefetching")
+            return None
+
+        check_in_date = self._trip_start()
+        check_out_date = check_in_date + timedelta(days=self._trip_nights(context.duration))
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def fetch(county_id: int) -> List[dict]:
+            async with semaphore:
+                return await self.check_hotel_vacancies(check_in_date, check_out_date, [county_id])
+
+        with priority_scope(Priority.PREFETCH):
+            tasks = {county_id: asyncio.create_task(fetch(county_id)) for county_id in county_ids}
+        self._log_verbose(f"Prefetching vacancies for counties {county_ids}")
+        return VacancyPrefetch(check_in_date, check_out_date, tasks, self.prefetch_stats)
+
+    def prefetch_metrics(self) -> Dict[str, float]:
+        """Counters for vacancy prefetches per county and the share of them wasted."""
+        stats = dict(self.prefetch_stats)
+        stats["waste_rate"] = stats["wasted"] / stats["started"] if stats["started"] else 0.0
+        return stats
+
+    async def _recommend_for_stays(
+        self,
+        stays: List[Stay],
+        on_recommendations: Optional[Callable[[int, List[HotelRecommendation]], None]] = None,
+        context: Optional[ContextArtifact] = None,
+        trip_nights: Optional[int] = None,
+        prefetch: Optional[VacancyPrefetch] = None
+    ) -> List[StayRecommendations]:
+        """
+        Query stays concurrently, one vacancy query each, bounded by max_concurrency and the step deadline.
+
+        Prefetched stays are not queried again; stays that miss the deadline get no hotels.
+        Results are in the order of `stays`.
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        tasks = [
+            asyncio.create_task(
+                self._recommend_for_stay(
+                    stay,
+                    semaphore,
+                    context=context,
+                    trip_nights=trip_nights,
+                    prefetched=prefetch.take(stay.county_id, stay.check_in_date, stay.check_out_date) if prefetch else None
                 )
+            )
+            for stay in stays
+        ]
+        if on_recommendations is not None:
+            def report(county_id: int, task: asyncio.Task) -> None:
+                if not task.cancelled() and task.exception() is None:
+                    on_recommendations(county_id, task.result().recommendations)
+
+            for stay, task in zip(stays, tasks):
+                task.add_done_callback(partial(report, stay.county_id))
+        if not tasks:
+            return []
+        try:
+            done, pending = await asyncio.wait(tasks, timeout=self.deadline)
+        except asyncio.CancelledError:
+            # The run was cancelled; don't leave stay queries running behind it
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        if pending:
+            self._log_verbose(
+                f"Hotel step deadline of {self.deadline}s reached; "
+                f"returning partial results for {len(done)}/{len(tasks)} stays"
+            )
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
 
-                if not vacancies:
-                    continue
+        return [
+            task.result() if task in done and not task.cancelled() and task.exception() is None
+            else StayRecommendations([], [[] for _ in stay.days])
+            for stay, task in zip(stays, tasks)
+        ]
 
-                # Get details for hotels with vacancies
-                for vacancy in vacancies[:3]:  # Limit to top 3 hotels
-                    try:
+    def _night_plan(
+        self,
+        stays: List[Stay],
+        results: List[StayRecommendations]
+    ) -> Tuple[List[HotelRecommendation], List[HotelNight]]:
+        """Merge stay results, in stay order, into the trip's hotels and its night-by-night plan."""
+        hotels: Dict[str, HotelRecommendation] = {}
+        nights = []
+        for stay, result in zip(stays, results):
+            for hotel in result.recommendations:
+                hotels.setdefault(hotel.hotel_id, hotel)
+            county = self.county_mapper.get_county_name(stay.county_id) or ""
+            for offset, (day, hotel_ids) in enumerate(zip(stay.days, result.night_hotel_ids)):
+                nights.append(HotelNight(
+                    day=day,
+                    night_date=(stay.check_in_date + timedelta(days=offset)).date(),
+                    county_id=stay.county_id,
+                    county=county,
+                    hotel_ids=hotel_ids
+                ))
+        return list(hotels.values()), nights
 
-                        # Parse into simplified recommendation format
-                        recommendation = self._parse_hotel_details(
-                            vacancy, 
-                            vacancy['available_rooms']
-                        )
-                        hotel_recommendations.append(recommendation)
+    async def process(
+        self,
+        content: ItineraryArtifact,
+        on_recommendations: Optional[Callable[[int, List[HotelRecommendation]], None]] = None,
+        context: Optional[ContextArtifact] = None,
+        prefetch: Optional[VacancyPrefetch] = None
+    ) -> HotelRecommendationEvent:
+        """
+        Generate hotel recommendations night by night for the itinerary.
 
-                    except Exception as e:
-                        self._log_verbose(f"Error processing hotel {vacancy.get('hotel_id')}: {str(e)}")
-                        continue
+        Consecutive nights in the same county form a stay with a single vacancy query;
+        the hotels of every stay are ranked for each of its nights.
 
-            except Exception as e:
-                self._log_verbose(f"Error processing county {county_id}: {str(e)}")
-                continue
+        Args:
+            content (ItineraryArtifact): Itinerary to recommend hotels for
+            context (ContextArtifact): Trip context; its budget and group size steer the ranking
+            on_recommendations (Callable): Called with each stay's county ID and its recommendations as the stay completes
+            prefetch (VacancyPrefetch): Vacancy queries started from the context, used instead of querying again
+        """
+        content.start_date = self._trip_start(content).date()
+        stays = self._plan_stays(content)
 
-        content.hotel_recommendations = hotel_recommendations
-        self._log_verbose(f"Generated {len(hotel_recommendations)} hotel recommendations")
-        
-        return HotelRecommendationEvent(content=content)
\ No newline at end of file
+        if not stays:
+            self._log_verbose("No valid counties found in itinerary")
+            return HotelRecommendationEvent(content=content)
+
+        results = await self._recommend_for_stays(
+            stays,
+            on_recommendations,
+            context=context,
+            trip_nights=sum(len(stay.days) for stay in stays),
+            prefetch=prefetch
+        )
+
+        content.hotel_recommendations, content.hotel_plan = self._night_plan(stays, results)
+        self._log_verbose(
+            f"Generated {len(content.hotel_recommendations)} hotel recommendations "
+            f"for {len(content.hotel_plan)} nights in {len(stays)} stays"
+        )
+
+        return HotelRecommendationEvent(content=content)
+
+    async def update_recommendations(
+        self,
+        content: ItineraryArtifact,
+        previous: ItineraryArtifact,
+        on_recommendations: Optional[Callable[[int, List[HotelRecommendation]], None]] = None,
+        context: Optional[ContextArtifact] = None,
+        prefetch: Optional[VacancyPrefetch] = None
+    ) -> HotelRecommendationEvent:
+        """
+        Update hotel recommendations after an itinerary update, querying only stays the update changed.
+
+        A stay is kept when the previous plan had hotels for each of its nights in the same
+        county on the same date; recommendations from before night-by-night plans are kept
+        for stays in counties they cover.
+
+        Args:
+            content (ItineraryArtifact): Updated itinerary
+            previous (ItineraryArtifact): Itinerary and recommendations from before the update
+            context (ContextArtifact): Trip context; its budget and group size steer the ranking
+            on_recommendations (Callable): Called with each newly queried stay's county ID and its recommendations
+            prefetch (VacancyPrefetch): Vacancy queries started from the context, used instead of querying again
+        """
+        # Nights are dated from the trip's stored start, so an update on a later day still matches them
+        content.start_date = content.start_date or self._trip_start(previous).date()
+        stays = self._plan_stays(content)
+        previous_hotels = {hotel.hotel_id: hotel for hotel in previous.hotel_recommendations}
+        previous_nights = {(night.night_date, night.county_id): night for night in previous.hotel_plan}
+
+        results: List[Optional[StayRecommendations]] = []
+        for stay in stays:
+            if previous.hotel_plan:
+                nights = [
+                    previous_nights.get(((stay.check_in_date + timedelta(days=offset)).date(), stay.county_id))
+                    for offset in range(len(stay.days))
+                ]
+                kept = all(
+                    night is not None and night.hotel_ids and all(hotel_id in previous_hotels for hotel_id in night.hotel_ids)
+                    for night in nights
+                )
+                night_hotel_ids = [night.hotel_ids for night in nights] if kept else []
+            else:
+                county_hotel_ids = [
+                    hotel.hotel_id for hotel in previous.hotel_recommendations
+                    if self.county_mapper.get_county_id(hotel.location.county) == stay.county_id
+                ]
+                night_hotel_ids = [county_hotel_ids for _ in stay.days] if county_hotel_ids else []
+            if night_hotel_ids:
+                hotel_ids = dict.fromkeys(hotel_id for hotel_ids in night_hotel_ids for hotel_id in hotel_ids)
+                results.append(StayRecommendations([previous_hotels[hotel_id] for hotel_id in hotel_ids], night_hotel_ids))
+            else:
+                results.append(None)
+
+        changed = [index for index, result in enumerate(results) if result is None]
+        if changed:
+            queried = await self._recommend_for_stays(
+                [stays[index] for index in changed],
+                on_recommendations,
+                context=context,
+                trip_nights=sum(len(stay.days) for stay in stays),
+                prefetch=prefetch
+            )
+            for index, result in zip(changed, queried):
+                results[index] = result
+
+        content.hotel_recommendations, content.hotel_plan = self._night_plan(stays, results)
+        self._log_verbose(
+            f"Updated hotel recommendations: queried {len(changed)} of {len(stays)} stays, "
+            f"{len(content.hotel_recommendations)} recommendations in total"
+        )
+
+        return HotelRecommendationEvent(content=content)
@@ -1,14 +1,22 @@
-from typing import Union
+from typing import Union, Optional
 import uuid
 from llama_index.llms.openai import OpenAI
 from llama_index.core import PromptTemplate
 from app.agents.base import BaseAgent
 from app.workflow.events import IntentionEvent, StopEvent
 from app.workflow.models import IntentionAnalysis
+from app.utils.intent_classifier import RuleIntentClassifier
 
 class IntentionDetectionAgent(BaseAgent):
-    def __init__(self, llm: OpenAI, verbose: bool = False):
+    def __init__(self, llm: OpenAI, verbose: bool = False, classifier: Optional[RuleIntentClassifier] = None):
+        """
+        Args:
+            llm: LLM used for messages the local classifier is not confident about
+            verbose: Whether to print verbose output
+            classifier: Local pre-classifier tried before the LLM; None always calls the LLM
+        """
         super().__init__(llm, verbose)
+        self.classifier = classifier
         self.intent_prompt = PromptTemplate(
             template="""
             Analyze the following user message and determine its intention in the context of travel planning:
@@ -33,12 +41,16 @@ class IntentionDetectionAgent(BaseAgent):
     async def process(self, query: str) -> Union[IntentionEvent, StopEvent]:
         """Detect the intention of the user's query."""
         try:
-            analysis = await self.llm.astructured_predict(
-                IntentionAnalysis,
-                self.intent_prompt,
-                query=query
-            )
-            
+            analysis = self.classifier.classify(query) if self.classifier is not None else None
+            if analysis is not None:
+                self._log_verbose(f"Step - IntentionDetectionAgent: Intention decided locally: {analysis}")
+            else:
+                analysis = await self.llm.astructured_predict(
+                    IntentionAnalysis,
+                    self.intent_prompt,
+                    query=query
+                )
+
             if analysis.confidence < 0.5:
                 self._log_verbose(f"Low confidence in intention detection: {analysis.confidence}")
                 return StopEvent(
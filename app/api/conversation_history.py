@@ -0,0 +1,68 @@
+from typing import Callable, List, Optional
+from llama_index.core.utils import get_tokenizer
+from app.api.models import SessionState
+from app.config.constants import HISTORY_MAX_MESSAGES, HISTORY_MAX_PENDING, HISTORY_PROMPT_TOKENS
+
+def append_message(
+    session: SessionState,
+    role: str,
+    content: str,
+    max_messages: int = HISTORY_MAX_MESSAGES,
+    max_pending: int = HISTORY_MAX_PENDING
+) -> None:
+    """
+    Append a message to the session's recent history, moving overflow to the summary queue.
+
+    Args:
+        session: The session to update in place
+        role: "user" or "assistant"
+        content: The message text
+        max_messages: Size of the recent history ring buffer
+        max_pending: Evicted messages kept for summarization; older ones are dropped
+    """
+    session.conversation_history.append({"role": role, "content": content})
+    overflow = len(session.conversation_history) - max_messages
+    if overflow > 0:
+        session.pending_summary.extend(session.conversation_history[:overflow])
+        del session.conversation_history[:overflow]
+    if len(session.pending_summary) > max_pending:
+        del session.pending_summary[:len(session.pending_summary) - max_pending]
+
+def history_view(
+    session: SessionState,
+    max_tokens: int = HISTORY_PROMPT_TOKENS,
+    tokenizer: Optional[Callable[[str], List]] = None
+) -> str:
+    """
+    Render the conversation for a prompt within a token budget.
+
+    The rolling summary comes first, followed by as many of the most recent messages as
+    fit, oldest first. The summary is dropped only if it alone exceeds the budget.
+
+    Args:
+        session: The session whose history to render
+        max_tokens: Token budget for the rendered text
+        tokenizer: Tokenizer used to count tokens, defaults to llama_index's global tokenizer
+    """
+    tokenize = tokenizer if tokenizer is not None else get_tokenizer()
+    budget = max_tokens
+
+    header = ""
+    if session.history_summary:
+        header = f"Summary of earlier conversation: {session.history_summary}"
+        cost = len(tokenize(header))
+        if cost <= budget:
+            budget -= cost
+        else:
+            header = ""
+
+    lines: List[str] = []
+    for message in reversed(session.conversation_history):
+        line = f"{message['role']}: {message['content']}"
+        cost = len(tokenize(line))
+        if cost > budget:
+            break
+        lines.append(line)
+        budget -= cost
+
+    return "\n".join(([header] if header else []) + lines[::-1])
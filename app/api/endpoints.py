@@ -1,22 +1,165 @@
+import json
+import asyncio
 from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from uuid import UUID
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Callable, Awaitable, AsyncIterator, Set
+from llama_index.core.workflow import Event
 
 from app.api.models import ConversationRequest, ConversationResponse
 from app.api.session_manager import session_manager
-from app.workflow.travel_itinerary import TravelItineraryWorkflow
+from app.api.conversation_history import history_view
+from app.api.session_concurrency import session_turns, SessionBusyError, TurnSupersededError
+from app.workflow.factory import workflow_factory
+from app.workflow.events import (
+    IntentionEvent,
+    ContextExtractionEvent,
+    StepProgressEvent,
+    DayPlanEvent,
+    HotelBatchEvent
+)
+from app.utils.http_client import http_client_manager
+from app.utils.response_cache import hotel_response_cache
+from app.utils.llm_cache import llm_output_cache
+from app.utils.rate_limiter import Priority, priority_scope, upstream_limiters
+from app.utils.hotel_inventory import hotel_inventory
+from app.utils.resilience import hotel_api_resilience
+from app.config.constants import SSE_HEARTBEAT_INTERVAL, SSE_QUEUE_SIZE
 
 router = APIRouter()
 
+# Background refresh of the hotel inventory snapshot, running while the app is up
+inventory_refresh: Optional[asyncio.Task] = None
+
+@router.on_event("startup")
+async def start_shared_resources() -> None:
+    """Open the pooled HTTP client, map the hotel inventory snapshot and build the workflow shared by every request"""
+    global inventory_refresh
+    http_client = await http_client_manager.start()
+    await asyncio.to_thread(hotel_inventory.open)
+    workflow = workflow_factory.build(
+        verbose=True,
+        http_client=http_client,
+        response_cache=hotel_response_cache,
+        llm_cache=llm_output_cache
+    )
+    session_manager.summarizer = workflow.summary_agent.process
+    # Snapshot refreshes wait behind interactive turns for hotel API capacity
+    with priority_scope(Priority.BACKGROUND):
+        inventory_refresh = asyncio.create_task(workflow.hotel_agent.maintain_inventory())
+
+@router.on_event("shutdown")
+async def close_shared_resources() -> None:
+    """Stop the inventory refresh and close the shared HTTP client, caches and the session store"""
+    global inventory_refresh
+    if inventory_refresh is not None:
+        inventory_refresh.cancel()
+        await asyncio.gather(inventory_refresh, return_exceptions=True)
+        inventory_refresh = None
+    workflow_factory.reset()
+    await http_client_manager.close()
+    llm_output_cache.close()
+    hotel_inventory.close()
+    await session_manager.close()
+
+def _stream_payload(event: Event) -> Optional[Dict[str, Any]]:
+    """JSON payload sent to streaming clients for a workflow stream event"""
+    if isinstance(event, StepProgressEvent):
+        return {"type": "step", "step": event.step, "status": event.status}
+    if isinstance(event, IntentionEvent):
+        return {
+            "type": "intention",
+            "intent_type": event.intent_type,
+            "confidence": event.confidence,
+            "update_target": event.update_target
+        }
+    if isinstance(event, ContextExtractionEvent):
+        return {"type": "context", "context": event.context.model_dump(mode="json")}
+    if isinstance(event, DayPlanEvent):
+        return {"type": "day_plan", "day_plan": event.day_plan.model_dump(mode="json")}
+    if isinstance(event, HotelBatchEvent):
+        return {
+            "type": "hotels",
+            "county_id": event.county_id,
+            "recommendations": [hotel.model_dump(mode="json") for hotel in event.recommendations]
+        }
+    return None
+
+async def _process_turn(
+    session_id: UUID,
+    message: str,
+    on_event: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None
+) -> Dict[str, Any]:
+    """
+    Run one conversation turn through the shared workflow and store the results in the session.
+
+    Args:
+        session_id: ID of an existing session
+        message: The user's message
+        on_event: If given, the workflow runs in streaming mode and this is awaited with each stream payload
+
+    Returns:
+        The response message, the session's itinerary if one was produced, and the status
+    """
+    session = await session_manager.get_session(session_id)
+    conversation = history_view(session)
+
+    # Add message to history
+    await session_manager.add_message_to_history(session_id, "user", message)
+
+    # Process the message with this session's context and itinerary
+    workflow = workflow_factory.get()
+    if on_event is None:
+        result = await workflow.process_message(
+            message,
+            existing_context=session.context_artifact(),
+            existing_itinerary=session.itinerary_artifact(),
+            conversation=conversation
+        )
+    else:
+        handler = workflow.stream_message(
+            message,
+            existing_context=session.context_artifact(),
+            existing_itinerary=session.itinerary_artifact(),
+            conversation=conversation
+        )
+        try:
+            async for event in handler.stream_events():
+                payload = _stream_payload(event)
+                if payload is not None:
+                    await on_event(payload)
+            result = await asyncio.shield(handler)
+        except asyncio.CancelledError:
+            # Stop the run so in-flight LLM and hotel API calls are cancelled rather than leaked
+            await workflow.cancel(handler)
+            raise
+
+    # Add response to history
+    await session_manager.add_message_to_history(session_id, "assistant", result.get("message", ""))
+
+    # Update session with new context and itinerary in one write
+    if "context" in result or "itinerary" in result:
+        session = await session_manager.update_session(
+            session_id=session_id,
+            context=result.get("context"),
+            itinerary=result.get("itinerary"),
+            current_step="integrate_itinerary" if "itinerary" in result else "extract_context"
+        )
+
+    return {
+        "message": result.get("message", ""),
+        "itinerary": session.itinerary if "itinerary" in result else None,
+        "status": "complete" if "itinerary" in result else "in_progress"
+    }
+
 @router.post("/conversation", response_model=ConversationResponse)
 async def handle_conversation(request: ConversationRequest) -> ConversationResponse:
     """
     Handle a conversation message, either starting a new conversation or continuing an existing one.
-    
+
     Args:
         request: The conversation request containing the message and optional session ID
-        
+
     Returns:
         A response containing the session ID, response message, and itinerary if available
     """
@@ -24,154 +167,172 @@ async def handle_conversation(request: ConversationRequest) -> ConversationRespo
         # Check if this is a new or existing conversation
         if request.session_id is None:
             # New conversation
-            session = session_manager.create_session()
+            session = await session_manager.create_session()
             session_id = session.session_id
-            
-            # Create a new workflow
-            workflow = TravelItineraryWorkflow(verbose=True)
-            
-            # Add message to history
-            session_manager.add_message_to_history(session_id, "user", request.message)
-            
-            # Process the message
-            result = await workflow.process_message(request.message)
-            
-            # Add response to history
-            session_manager.add_message_to_history(session_id, "assistant", result.get("message", ""))
-            
-            # Update session with context and itinerary
-            if "context" in result:
-                session_manager.update_session(
-                    session_id=session_id,
-                    context=result["context"],
-                    current_step="extract_context"
-                )
-            
-            if "itinerary" in result:
-                session_manager.update_session(
-                    session_id=session_id,
-                    itinerary=result["itinerary"],
-                    current_step="integrate_itinerary"
-                )
-            
-            return ConversationResponse(
-                session_id=session_id,
-                message=result.get("message", ""),
-                itinerary=result.get("itinerary"),
-                status="complete" if "itinerary" in result else "in_progress"
-            )
         else:
             # Existing conversation
             session_id = request.session_id
-            session = session_manager.get_session(session_id)
-            
+            session = await session_manager.get_session(session_id)
+
             if not session:
                 raise HTTPException(status_code=404, detail="Session not found")
-            
-            # Add message to history
-            session_manager.add_message_to_history(session_id, "user", request.message)
-            
-            # Create workflow with existing context and itinerary
-            workflow = TravelItineraryWorkflow(
-                verbose=True,
-                existing_context=session.context,
-                existing_itinerary=session.itinerary
-            )
-            
-            # Process the message
-            result = await workflow.process_message(request.message)
-            
-            # Add response to history
-            session_manager.add_message_to_history(session_id, "assistant", result.get("message", ""))
-            
-            # Update session with new context and itinerary
-            if "context" in result:
-                session_manager.update_session(
-                    session_id=session_id,
-                    context=result["context"],
-                    current_step="extract_context"
-                )
-            
-            if "itinerary" in result:
-                session_manager.update_session(
-                    session_id=session_id,
-                    itinerary=result["itinerary"],
-                    current_step="integrate_itinerary"
-                )
-            
-            return ConversationResponse(
-                session_id=session_id,
-                message=result.get("message", ""),
-                itinerary=result.get("itinerary"),
-                status="complete" if "itinerary" in result else "in_progress"
-            )
+
+        response = await session_turns.run(session_id, lambda: _process_turn(session_id, request.message))
+
+        return ConversationResponse(session_id=session_id, **response)
+    except HTTPException:
+        raise
+    except (SessionBusyError, TurnSupersededError) as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing conversation: {str(e)}")
 
+def _format_sse(payload: Dict[str, Any]) -> str:
+    """Encode a stream payload as a Server-Sent Event"""
+    data = json.dumps(payload, ensure_ascii=False, default=str)
+    return f"event: {payload['type']}\ndata: {data}\n\n"
+
+async def _sse_events(session_id: UUID, message: str) -> AsyncIterator[str]:
+    """
+    Run a conversation turn and yield its stream payloads as Server-Sent Events.
+
+    Events go through a bounded queue, so a slow client holds back the turn instead of
+    buffering without limit. A heartbeat comment is sent after SSE_HEARTBEAT_INTERVAL
+    seconds of silence. If the client disconnects, the generator is closed and the turn
+    is cancelled along with its upstream calls.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=SSE_QUEUE_SIZE)
+
+    async def run_turn() -> None:
+        try:
+            response = await session_turns.run(
+                session_id,
+                lambda: _process_turn(session_id, message, on_event=queue.put)
+            )
+            await queue.put({"type": "done", "session_id": str(session_id), **response})
+        except Exception as e:
+            await queue.put({"type": "error", "message": f"Error: {str(e)}"})
+
+    turn = asyncio.create_task(run_turn())
+    try:
+        yield _format_sse({"type": "session", "session_id": str(session_id)})
+        while True:
+            try:
+                payload = await asyncio.wait_for(queue.get(), timeout=SSE_HEARTBEAT_INTERVAL)
+            except asyncio.TimeoutError:
+                yield ": heartbeat\n\n"
+                continue
+
+            yield _format_sse(payload)
+            if payload["type"] in ("done", "error"):
+                break
+    finally:
+        if not turn.done():
+            turn.cancel()
+            await asyncio.gather(turn, return_exceptions=True)
+
+@router.post("/conversation/stream")
+async def stream_conversation(request: ConversationRequest) -> StreamingResponse:
+    """
+    Server-Sent Events variant of POST /conversation.
+
+    Streams session, step, intention, context, day_plan and hotels events as the workflow
+    runs, followed by a final done (or error) event carrying the same fields as
+    ConversationResponse.
+
+    Args:
+        request: The conversation request containing the message and optional session ID
+    """
+    if request.session_id is None:
+        session_id = (await session_manager.create_session()).session_id
+    else:
+        session_id = request.session_id
+        if not await session_manager.get_session(session_id):
+            raise HTTPException(status_code=404, detail="Session not found")
+        if session_turns.policy == "reject" and session_turns.is_busy(session_id):
+            raise HTTPException(status_code=409, detail=f"Session {session_id} is already processing a message")
+
+    return StreamingResponse(
+        _sse_events(session_id, request.message),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/metrics")
+async def get_metrics() -> Dict[str, Any]:
+    """Upstream admission control, cache and workflow counters for this process"""
+    workflow = workflow_factory.get()
+    return {
+        "upstream": upstream_limiters.stats(),
+        "hotel_cache": hotel_response_cache.stats(),
+        "hotel_resilience": hotel_api_resilience.stats(),
+        "hotel_inventory": hotel_inventory.stats(),
+        "llm_cache": llm_output_cache.stats(),
+        "intent_fast_path": workflow.intent_classifier.stats() if workflow.intent_classifier else None,
+        "speculation": workflow.speculation_metrics(),
+        "hotel_prefetch": workflow.hotel_agent.prefetch_metrics(),
+        "session_turns": {"rejected": session_turns.rejected, "superseded": session_turns.superseded}
+    }
+
 # WebSocket endpoint for real-time conversation
 @router.websocket("/ws/conversation/{session_id}")
 async def websocket_conversation(websocket: WebSocket, session_id: Optional[UUID] = None):
     await websocket.accept()
-    
+
     try:
         # Initialize session if needed
         if not session_id:
-            session = session_manager.create_session()
+            session = await session_manager.create_session()
             session_id = session.session_id
             await websocket.send_json({"type": "session_created", "session_id": str(session_id)})
         else:
-            session = session_manager.get_session(session_id)
+            session = await session_manager.get_session(session_id)
             if not session:
                 # Create a new session with the provided ID
-                session = session_manager.create_session()
+                session = await session_manager.create_session()
                 session_id = session.session_id
                 await websocket.send_json({"type": "session_created", "session_id": str(session_id)})
-        
-        # Main WebSocket loop
-        while True:
-            # Receive message from client
-            data = await websocket.receive_json()
-            message = data.get("message", "")
-            
-            # Add message to history
-            session_manager.add_message_to_history(session_id, "user", message)
-            
-            # Create workflow with existing context and itinerary if available
-            workflow = TravelItineraryWorkflow(
-                verbose=True,
-                existing_context=session.context,
-                existing_itinerary=session.itinerary
-            )
-            
-            # Process the message
-            result = await workflow.process_message(message)
-            
-            # Add response to history
-            session_manager.add_message_to_history(session_id, "assistant", result.get("message", ""))
-            
-            # Update session with new context and itinerary
-            if "context" in result:
-                session_manager.update_session(
-                    session_id=session_id,
-                    context=result["context"],
-                    current_step="extract_context"
-                )
-            
-            if "itinerary" in result:
-                session_manager.update_session(
-                    session_id=session_id,
-                    itinerary=result["itinerary"],
-                    current_step="integrate_itinerary"
+
+        # Sends from concurrent turns and their stream events go out one at a time
+        send_lock = asyncio.Lock()
+        turns: Set[asyncio.Task] = set()
+
+        async def send(payload: Dict[str, Any]) -> None:
+            async with send_lock:
+                await websocket.send_json(payload)
+
+        async def run_turn(message: str, stream: bool) -> None:
+            try:
+                response = await session_turns.run(
+                    session_id,
+                    lambda: _process_turn(session_id, message, on_event=send if stream else None)
                 )
-            
-            # Send response to client
-            await websocket.send_json({
-                "type": "response",
-                "message": result.get("message", ""),
-                "itinerary": result.get("itinerary"),
-                "status": "complete" if "itinerary" in result else "in_progress"
-            })
-            
+                payload = {"type": "response", **response}
+            except Exception as e:
+                payload = {"type": "error", "message": f"Error: {str(e)}"}
+            try:
+                await send(payload)
+            except (WebSocketDisconnect, RuntimeError):
+                pass  # The client is gone; the receive loop ends the connection
+
+        # Main WebSocket loop: keep receiving while turns run, so a new message is queued,
+        # rejected or cancels the running turn according to the session concurrency policy
+        try:
+            while True:
+                # Receive message from client
+                data = await websocket.receive_json()
+
+                # Clients opt in to step, day plan and hotel events with {"stream": true}
+                turn = asyncio.create_task(run_turn(data.get("message", ""), bool(data.get("stream"))))
+                turns.add(turn)
+                turn.add_done_callback(turns.discard)
+        finally:
+            # Cancel unfinished turns along with their workflow runs when the connection ends
+            pending = list(turns)
+            for turn in pending:
+                turn.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
     except WebSocketDisconnect:
         # Handle client disconnect
         pass
@@ -182,4 +343,4 @@ async def websocket_conversation(websocket: WebSocket, session_id: Optional[UUID
             "message": f"Error: {str(e)}"
         })
         # Close the connection
-        await websocket.close() 
\ No newline at end of file
+        await websocket.close()
@@ -1,6 +1,8 @@
-from pydantic import BaseModel
-from typing import Optional, Dict, Any, List
+from pydantic import BaseModel, Field, PrivateAttr
+from typing import Optional, Dict, Any, List, Tuple
 from uuid import UUID, uuid4
+from app.artifacts.context import ContextArtifact
+from app.artifacts.itinerary import ItineraryArtifact
 
 class ConversationRequest(BaseModel):
     """Request model for conversation API"""
@@ -16,8 +18,58 @@ class ConversationResponse(BaseModel):
     
 class SessionState(BaseModel):
     """Internal model to track session state"""
-    session_id: UUID = uuid4()
+    session_id: UUID = Field(default_factory=uuid4)  # a fresh ID per session, not one shared default
     context: Optional[Dict[str, Any]] = None
     itinerary: Optional[Dict[str, Any]] = None
-    conversation_history: List[Dict[str, str]] = []
-    current_step: str = "extract_context"  # Track workflow progress
\ No newline at end of file
+    conversation_history: List[Dict[str, str]] = []  # The most recent HISTORY_MAX_MESSAGES messages
+    history_summary: str = ""  # Rolling summary of messages older than conversation_history
+    pending_summary: List[Dict[str, str]] = []  # Evicted messages not yet folded into the summary
+    current_step: str = "extract_context"  # Track workflow progress
+    # Validated artifacts with the dict they were checked against, so a turn doesn't validate them again
+    _context_artifact: Optional[Tuple[Dict[str, Any], ContextArtifact]] = PrivateAttr(default=None)
+    _itinerary_artifact: Optional[Tuple[Dict[str, Any], ItineraryArtifact]] = PrivateAttr(default=None)
+
+    def set_artifacts(
+        self,
+        context: Optional[ContextArtifact] = None,
+        itinerary: Optional[ItineraryArtifact] = None
+    ) -> None:
+        """Store validated artifacts as JSON-safe dicts (dates as ISO strings), keeping the artifacts for reuse"""
+        if context is not None:
+            self.context = context.model_dump(mode="json")
+            self._context_artifact = (self.context, context)
+        if itinerary is not None:
+            self.itinerary = itinerary.model_dump(mode="json")
+            self._itinerary_artifact = (self.itinerary, itinerary)
+
+    def validated_artifacts(self) -> Tuple[Optional[ContextArtifact], Optional[ItineraryArtifact]]:
+        """The artifacts already validated for the stored context and itinerary, without validating any"""
+        context = self._context_artifact
+        itinerary = self._itinerary_artifact
+        return (
+            context[1] if context is not None and context[0] is self.context else None,
+            itinerary[1] if itinerary is not None and itinerary[0] is self.itinerary else None
+        )
+
+    def reuse_artifacts(self, context: Optional[ContextArtifact], itinerary: Optional[ItineraryArtifact]) -> None:
+        """Attach artifacts known to match the stored dicts, e.g. those of the snapshot the session was decoded from"""
+        if context is not None and self.context:
+            self._context_artifact = (self.context, context)
+        if itinerary is not None and self.itinerary:
+            self._itinerary_artifact = (self.itinerary, itinerary)
+
+    def context_artifact(self) -> Optional[ContextArtifact]:
+        """The stored context as an artifact, validated only if it wasn't stored as one"""
+        if not self.context:
+            return None
+        if self._context_artifact is None or self._context_artifact[0] is not self.context:
+            self._context_artifact = (self.context, ContextArtifact.model_validate(self.context))
+        return self._context_artifact[1]
+
+    def itinerary_artifact(self) -> Optional[ItineraryArtifact]:
+        """The stored itinerary as an artifact, validated only if it wasn't stored as one"""
+        if not self.itinerary:
+            return None
+        if self._itinerary_artifact is None or self._itinerary_artifact[0] is not self.itinerary:
+            self._itinerary_artifact = (self.itinerary, ItineraryArtifact.model_validate(self.itinerary))
+        return self._itinerary_artifact[1]
\ No newline at end of file
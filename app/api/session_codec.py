@@ -0,0 +1,122 @@
+import struct
+import hashlib
+from collections import OrderedDict
+from typing import Optional, Tuple, Union
+from uuid import UUID
+import msgpack
+from app.api.models import SessionState
+from app.artifacts.context import ContextArtifact
+from app.artifacts.itinerary import ItineraryArtifact
+from app.config.constants import (
+    SESSION_SCHEMA_VERSION,
+    SESSION_COMPRESSION,
+    SESSION_COMPRESSION_MIN_BYTES,
+    SESSION_COMPRESSION_LEVEL,
+    SESSION_ARTIFACT_CACHE_SIZE
+)
+
+# Snapshot header: magic, schema version, flags
+MAGIC = b"SS"
+HEADER = struct.Struct("!2sBB")
+FLAG_ZSTD = 0x01
+
+def _zstd_available() -> bool:
+    try:
+        import zstandard  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+class SessionCodec:
+    """
+    Compact binary snapshots of SessionState: msgpack with optional zstd compression.
+
+    Each snapshot starts with a header carrying SESSION_SCHEMA_VERSION. Untrusted
+    input, legacy JSON rows and older snapshots are validated. A store decoding its
+    own current-version snapshots can use the trusted path, which skips validation;
+    if this process wrote the snapshot, the validated context and itinerary artifacts
+    of the encoded session are attached again, so the next turn doesn't validate them.
+    """
+
+    def __init__(
+        self,
+        compress: bool = SESSION_COMPRESSION,
+        compression_min_bytes: int = SESSION_COMPRESSION_MIN_BYTES,
+        level: int = SESSION_COMPRESSION_LEVEL,
+        artifact_cache_size: int = SESSION_ARTIFACT_CACHE_SIZE
+    ):
+        # zstandard is optional; without it snapshots are written uncompressed
+        self.compress = compress and _zstd_available()
+        self.compression_min_bytes = compression_min_bytes
+        self.level = level
+        # Snapshot digest -> validated (context, itinerary) of the session it was encoded from, least recent first
+        self._artifacts: "OrderedDict[bytes, Tuple[Optional[ContextArtifact], Optional[ItineraryArtifact]]]" = OrderedDict()
+        self.artifact_cache_size = artifact_cache_size
+
+    def encode(self, session: SessionState) -> bytes:
+        """Serialize a session to a versioned snapshot"""
+        payload = {
+            "session_id": session.session_id.bytes,
+            "context": session.context,
+            "itinerary": session.itinerary,
+            "conversation_history": session.conversation_history,
+            "history_summary": session.history_summary,
+            "pending_summary": session.pending_summary,
+            "current_step": session.current_step
+        }
+        body = msgpack.packb(payload, use_bin_type=True)
+        flags = 0
+        if self.compress and len(body) >= self.compression_min_bytes:
+            import zstandard
+            body = zstandard.ZstdCompressor(level=self.level).compress(body)
+            flags |= FLAG_ZSTD
+        snapshot = HEADER.pack(MAGIC, SESSION_SCHEMA_VERSION, flags) + body
+
+        artifacts = session.validated_artifacts()
+        if self.artifact_cache_size and any(artifact is not None for artifact in artifacts):
+            key = self._digest(snapshot)
+            self._artifacts[key] = artifacts
+            self._artifacts.move_to_end(key)
+            while len(self._artifacts) > self.artifact_cache_size:
+                self._artifacts.popitem(last=False)
+        return snapshot
+
+    @staticmethod
+    def _digest(snapshot: bytes) -> bytes:
+        return hashlib.blake2b(snapshot, digest_size=16).digest()
+
+    def decode(self, data: Union[bytes, str], trusted: bool = False) -> SessionState:
+        """
+        Deserialize a snapshot.
+
+        Args:
+            data: A snapshot from `encode`, or a legacy JSON-encoded SessionState
+            trusted: The snapshot comes from the caller's own store; current-version snapshots skip validation
+
+        Raises:
+            ValueError: If the snapshot was written by a newer schema version
+        """
+        if isinstance(data, str) or not data.startswith(MAGIC):
+            return SessionState.model_validate_json(data)
+
+        _, version, flags = HEADER.unpack_from(data)
+        if version > SESSION_SCHEMA_VERSION:
+            raise ValueError(f"Session snapshot has schema version {version}, newer than {SESSION_SCHEMA_VERSION}")
+
+        body = data[HEADER.size:]
+        if flags & FLAG_ZSTD:
+            import zstandard
+            body = zstandard.ZstdDecompressor().decompress(body)
+        payload = msgpack.unpackb(body, raw=False)
+        payload["session_id"] = UUID(bytes=payload["session_id"])
+
+        if not trusted or version != SESSION_SCHEMA_VERSION:
+            return SessionState.model_validate(payload)
+        session = SessionState.model_construct(**payload)
+        artifacts = self._artifacts.get(self._digest(data))
+        if artifacts is not None:
+            session.reuse_artifacts(*artifacts)
+        return session
+
+# Global session codec instance
+session_codec = SessionCodec()
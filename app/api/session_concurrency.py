@@ -0,0 +1,100 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Set, TypeVar
+from uuid import UUID
+from app.config.constants import SESSION_CONCURRENCY_POLICY, SESSION_MAX_QUEUED_TURNS
+
+T = TypeVar("T")
+
+POLICIES = ("queue", "reject", "cancel_previous")
+
+class SessionBusyError(Exception):
+    """The session already has a turn running (reject policy) or too many queued"""
+
+class TurnSupersededError(Exception):
+    """The turn was cancelled because a newer message arrived for the session (cancel_previous policy)"""
+
+class SessionTurnCoordinator:
+    """
+    Runs at most one conversation turn per session at a time.
+
+    With "queue", turns run in arrival order, up to `max_queued` waiting. With "reject",
+    a turn arriving while another runs raises SessionBusyError. With "cancel_previous",
+    the running turn is cancelled (its workflow run, LLM calls and hotel requests with
+    it) and earlier queued turns are skipped, so only the latest message runs.
+
+    Coordination is per process; with several workers, route a session to one worker.
+    """
+
+    def __init__(self, policy: str = SESSION_CONCURRENCY_POLICY, max_queued: int = SESSION_MAX_QUEUED_TURNS):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown session concurrency policy: {policy}")
+        self.policy = policy
+        self.max_queued = max_queued
+        self._locks: Dict[UUID, asyncio.Lock] = {}
+        self._waiting: Dict[UUID, int] = {}
+        self._latest: Dict[UUID, int] = {}
+        self._active: Dict[UUID, asyncio.Task] = {}
+        self._superseded: Set[asyncio.Task] = set()
+        self.rejected = 0
+        self.superseded = 0
+
+    def is_busy(self, session_id: UUID) -> bool:
+        """Whether a turn is running or queued for the session"""
+        return self._waiting.get(session_id, 0) > 0
+
+    async def run(self, session_id: UUID, turn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run a turn for the session under the configured policy.
+
+        Args:
+            session_id: The session the turn belongs to
+            turn: Coroutine function running the turn
+
+        Raises:
+            SessionBusyError: The session is busy under "reject", or its queue is full under "queue"
+            TurnSupersededError: A newer turn for the session replaced this one under "cancel_previous"
+        """
+        waiting = self._waiting.get(session_id, 0)
+        if (self.policy == "reject" and waiting > 0) or (self.policy == "queue" and waiting > self.max_queued):
+            self.rejected += 1
+            raise SessionBusyError(f"Session {session_id} is already processing a message")
+
+        ticket = self._latest.get(session_id, 0) + 1
+        self._latest[session_id] = ticket
+        if self.policy == "cancel_previous":
+            previous = self._active.get(session_id)
+            if previous is not None and not previous.done():
+                self._superseded.add(previous)
+                previous.cancel()
+
+        lock = self._locks.setdefault(session_id, asyncio.Lock())
+        self._waiting[session_id] = waiting + 1
+        try:
+            async with lock:
+                if self.policy == "cancel_previous" and ticket != self._latest[session_id]:
+                    self.superseded += 1
+                    raise TurnSupersededError("Superseded by a newer message")
+
+                task = asyncio.create_task(turn())
+                self._active[session_id] = task
+                try:
+                    # Cancelling the caller cancels the turn; the turn stops its workflow run before returning
+                    return await task
+                except asyncio.CancelledError:
+                    if task in self._superseded:
+                        self.superseded += 1
+                        raise TurnSupersededError("Superseded by a newer message")
+                    raise
+                finally:
+                    self._superseded.discard(task)
+                    if self._active.get(session_id) is task:
+                        del self._active[session_id]
+        finally:
+            self._waiting[session_id] -= 1
+            if self._waiting[session_id] == 0:
+                del self._waiting[session_id]
+                del self._locks[session_id]
+                del self._latest[session_id]
+
+# Global session turn coordinator instance
+session_turns = SessionTurnCoordinator()
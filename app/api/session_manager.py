@@ -1,57 +1,130 @@
-from typing import Dict, Optional
+import asyncio
+import weakref
+from typing import Awaitable, Callable, Dict, List, Optional
 from uuid import UUID
 from app.api.models import SessionState
+from app.api.session_store import SessionStore, create_session_store
+from app.api.conversation_history import append_message
 from app.artifacts.context import ContextArtifact
 from app.artifacts.itinerary import ItineraryArtifact
+from app.utils.rate_limiter import Priority, priority_scope
+from app.config.constants import HISTORY_SUMMARY_BATCH
+
+# (current summary, evicted messages) -> updated summary, or None on failure
+Summarizer = Callable[[str, List[Dict[str, str]]], Awaitable[Optional[str]]]
 
 class SessionManager:
-    """Manages conversation sessions and their states"""
-    
-    def __init__(self):
-        self.sessions: Dict[UUID, SessionState] = {}
-    
-    def create_session(self) -> SessionState:
+    """
+    Manages conversation sessions and their states, persisted in a SessionStore.
+
+    Conversation history is bounded: messages beyond the recent ring buffer are queued
+    and folded into a rolling summary by `summarizer` in a background task, so the
+    request path never waits on it.
+
+    Every read-modify-write of a session holds that session's lock, so the background
+    summary and a concurrent turn can't overwrite each other's changes. Locks are per
+    process, like the turn coordinator.
+    """
+
+    def __init__(self, store: Optional[SessionStore] = None, summarizer: Optional[Summarizer] = None):
+        self.store = store if store is not None else create_session_store()
+        self.summarizer = summarizer
+        self._summaries: Dict[UUID, asyncio.Task] = {}
+        # Dropped once no one holds or waits for them
+        self._locks: "weakref.WeakValueDictionary[UUID, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+    def _lock(self, session_id: UUID) -> asyncio.Lock:
+        lock = self._locks.get(session_id)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._locks[session_id] = lock
+        return lock
+
+    async def create_session(self) -> SessionState:
         """Create a new session"""
         session = SessionState()
-        self.sessions[session.session_id] = session
+        await self.store.save(session)
         return session
-    
-    def get_session(self, session_id: UUID) -> Optional[SessionState]:
+
+    async def get_session(self, session_id: UUID) -> Optional[SessionState]:
         """Get an existing session by ID"""
-        return self.sessions.get(session_id)
-    
-    def update_session(self, session_id: UUID, 
+        return await self.store.get(session_id)
+
+    async def update_session(self, session_id: UUID,
                       context: Optional[ContextArtifact] = None,
                       itinerary: Optional[ItineraryArtifact] = None,
                       current_step: Optional[str] = None) -> SessionState:
         """Update session with new data"""
-        session = self.sessions[session_id]
-        
-        if context:
-            session.context = context.dict()
-        
-        if itinerary:
-            session.itinerary = itinerary.dict()
-            
-        if current_step:
-            session.current_step = current_step
-            
+        async with self._lock(session_id):
+            session = await self.store.get(session_id)
+            if session is None:
+                raise KeyError(session_id)
+
+            # Stored JSON-safe, so sessions can be encoded and sent as they are
+            session.set_artifacts(context=context, itinerary=itinerary)
+
+            if current_step:
+                session.current_step = current_step
+
+            await self.store.save(session)
         return session
-    
-    def add_message_to_history(self, session_id: UUID, role: str, content: str) -> None:
+
+    async def add_message_to_history(self, session_id: UUID, role: str, content: str) -> None:
         """Add a message to the conversation history"""
-        if session_id in self.sessions:
-            self.sessions[session_id].conversation_history.append({
-                "role": role,
-                "content": content
-            })
-    
-    def delete_session(self, session_id: UUID) -> bool:
+        async with self._lock(session_id):
+            session = await self.store.get(session_id)
+            if session is None:
+                return
+            append_message(session, role, content)
+            await self.store.save(session)
+        if len(session.pending_summary) >= HISTORY_SUMMARY_BATCH:
+            self._schedule_summary(session_id)
+
+    def _schedule_summary(self, session_id: UUID) -> None:
+        """Start a background summarization for the session unless one is already running"""
+        if self.summarizer is None or session_id in self._summaries:
+            return
+        # Summaries wait behind interactive turns for upstream capacity
+        with priority_scope(Priority.BACKGROUND):
+            task = asyncio.create_task(self._summarize(session_id))
+        self._summaries[session_id] = task
+        task.add_done_callback(lambda _: self._summaries.pop(session_id, None))
+
+    async def _summarize(self, session_id: UUID) -> None:
+        """Fold the session's queued messages into its rolling summary until fewer than a batch remain"""
+        session = await self.store.get(session_id)
+        while session is not None and len(session.pending_summary) >= HISTORY_SUMMARY_BATCH:
+            messages = list(session.pending_summary)
+            summary = await self.summarizer(session.history_summary, messages)
+            if summary is None:
+                return  # Keep the messages queued for the next attempt
+
+            # The session may have changed during the LLM call; re-read it under the lock
+            # and only drop what was summarized
+            async with self._lock(session_id):
+                session = await self.store.get(session_id)
+                if session is None:
+                    return
+                folded = 0
+                for count in range(min(len(messages), len(session.pending_summary)), 0, -1):
+                    if session.pending_summary[:count] == messages[-count:]:
+                        folded = count
+                        break
+                del session.pending_summary[:folded]
+                session.history_summary = summary
+                await self.store.save(session)
+
+    async def delete_session(self, session_id: UUID) -> bool:
         """Delete a session"""
-        if session_id in self.sessions:
-            del self.sessions[session_id]
-            return True
-        return False
+        return await self.store.delete(session_id)
+
+    async def close(self) -> None:
+        """Stop background summarizations and close the underlying store"""
+        tasks = list(self._summaries.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self.store.close()
 
 # Global session manager instance
-session_manager = SessionManager()
\ No newline at end of file
+session_manager = SessionManager()
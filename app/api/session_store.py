@@ -0,0 +1,230 @@
+import os
+import time
+import sqlite3
+import asyncio
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Callable, Optional, Tuple
+from uuid import UUID
+from app.api.models import SessionState
+from app.api.session_codec import SessionCodec, session_codec
+from app.config.constants import (
+    SESSION_STORE_BACKEND,
+    SESSION_TTL,
+    SESSION_MAX_ENTRIES,
+    SESSION_STORE_PATH,
+    SESSION_REDIS_URL
+)
+
+class SessionStore(ABC):
+    """Storage for conversation sessions. Sessions expire `ttl` seconds after their last save."""
+
+    @abstractmethod
+    async def get(self, session_id: UUID) -> Optional[SessionState]:
+        """Return the session, or None if missing or expired"""
+        pass
+
+    @abstractmethod
+    async def save(self, session: SessionState) -> None:
+        """Insert or replace a session and restart its TTL"""
+        pass
+
+    @abstractmethod
+    async def delete(self, session_id: UUID) -> bool:
+        """Remove a session, returning whether it existed"""
+        pass
+
+    async def close(self) -> None:
+        """Release connections held by the store"""
+        pass
+
+class InMemorySessionStore(SessionStore):
+    """In-process LRU store with a TTL, bounded by session count. Not shared between workers."""
+
+    def __init__(
+        self,
+        max_sessions: int = SESSION_MAX_ENTRIES,
+        ttl: float = SESSION_TTL,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._clock = clock
+        # session_id -> (expires_at, session), least recently used first
+        self._sessions: "OrderedDict[UUID, Tuple[float, SessionState]]" = OrderedDict()
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    async def get(self, session_id: UUID) -> Optional[SessionState]:
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            return None
+        expires_at, session = entry
+        if expires_at <= self._clock():
+            del self._sessions[session_id]
+            return None
+        self._sessions.move_to_end(session_id)
+        return session
+
+    async def save(self, session: SessionState) -> None:
+        self._sessions[session.session_id] = (self._clock() + self.ttl, session)
+        self._sessions.move_to_end(session.session_id)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+            self.evictions += 1
+
+    async def delete(self, session_id: UUID) -> bool:
+        return self._sessions.pop(session_id, None) is not None
+
+class SQLiteSessionStore(SessionStore):
+    """
+    SQLite store in WAL mode, so uvicorn workers on one node share sessions.
+
+    Sessions are stored as binary snapshots from `codec`. Database work runs in a
+    thread so the event loop is never blocked; expired sessions are purged on write.
+    """
+
+    def __init__(
+        self,
+        path: str = SESSION_STORE_PATH,
+        ttl: float = SESSION_TTL,
+        codec: Optional[SessionCodec] = None
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.codec = codec if codec is not None else session_codec
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        # Opened lazily so importing the module never touches the disk
+        if self._conn is None:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS sessions (
+                    session_id TEXT PRIMARY KEY,
+                    state BLOB NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS sessions_expires_at ON sessions (expires_at)")
+            self._conn = conn
+        return self._conn
+
+    def _get(self, session_id: UUID) -> Optional[bytes]:
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT state FROM sessions WHERE session_id = ? AND expires_at > ?",
+                (str(session_id), time.time())
+            ).fetchone()
+        return row[0] if row is not None else None
+
+    def _save(self, session_id: UUID, state: bytes) -> None:
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO sessions VALUES (?, ?, ?)",
+                (str(session_id), state, now + self.ttl)
+            )
+            conn.execute("DELETE FROM sessions WHERE expires_at <= ?", (now,))
+            conn.commit()
+
+    def _delete(self, session_id: UUID) -> bool:
+        with self._lock:
+            conn = self._connect()
+            deleted = conn.execute("DELETE FROM sessions WHERE session_id = ?", (str(session_id),)).rowcount
+            conn.commit()
+        return deleted > 0
+
+    def _close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    async def get(self, session_id: UUID) -> Optional[SessionState]:
+        state = await asyncio.to_thread(self._get, session_id)
+        if state is None:
+            return None
+        # Snapshots in this database were validated before they were written
+        return self.codec.decode(state, trusted=True)
+
+    async def save(self, session: SessionState) -> None:
+        await asyncio.to_thread(self._save, session.session_id, self.codec.encode(session))
+
+    async def delete(self, session_id: UUID) -> bool:
+        return await asyncio.to_thread(self._delete, session_id)
+
+    async def close(self) -> None:
+        await asyncio.to_thread(self._close)
+
+class RedisSessionStore(SessionStore):
+    """
+    Store for any Redis-compatible async client (e.g. `redis.asyncio.Redis`), shared across nodes.
+
+    The client only needs `get(key)`, `set(key, value, ex=seconds)` and `delete(key)`,
+    so tests can pass an in-memory fake. Sessions are stored as binary snapshots from
+    `codec`.
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        prefix: str = "session:",
+        ttl: float = SESSION_TTL,
+        codec: Optional[SessionCodec] = None
+    ):
+        self.client = client
+        self.prefix = prefix
+        self.ttl = ttl
+        self.codec = codec if codec is not None else session_codec
+
+    async def get(self, session_id: UUID) -> Optional[SessionState]:
+        raw = await self.client.get(f"{self.prefix}{session_id}")
+        if raw is None:
+            return None
+        return self.codec.decode(raw, trusted=True)
+
+    async def save(self, session: SessionState) -> None:
+        await self.client.set(
+            f"{self.prefix}{session.session_id}",
+            self.codec.encode(session),
+            ex=max(1, int(self.ttl))
+        )
+
+    async def delete(self, session_id: UUID) -> bool:
+        return bool(await self.client.delete(f"{self.prefix}{session_id}"))
+
+    async def close(self) -> None:
+        close = getattr(self.client, "aclose", None) or getattr(self.client, "close", None)
+        if close is not None:
+            await close()
+
+def create_session_store(backend: str = SESSION_STORE_BACKEND) -> SessionStore:
+    """
+    Build the session store named in the configuration.
+
+    Args:
+        backend: "memory", "sqlite" or "redis"; "redis" needs the optional `redis` package
+    """
+    if backend == "memory":
+        return InMemorySessionStore()
+    if backend == "sqlite":
+        return SQLiteSessionStore()
+    if backend == "redis":
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise ImportError("The redis session store requires the redis package (pip install redis)")
+        return RedisSessionStore(redis.from_url(SESSION_REDIS_URL))
+    raise ValueError(f"Unknown session store backend: {backend}")
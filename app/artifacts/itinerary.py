@@ -1,15 +1,19 @@
 # app/artifacts/itinerary.py
 from pydantic import BaseModel
 from typing import List, Optional
+from datetime import date
 from app.workflow.models import (
     DayPlan,
     TravelItinerary,
-    HotelRecommendation
+    HotelRecommendation,
+    HotelNight
 )
 
 class ItineraryArtifact(BaseModel):
     itinerary: Optional[TravelItinerary] = None
+    start_date: Optional[date] = None  # First day of the trip; hotel nights are dated from it
     hotel_recommendations: List[HotelRecommendation] = []
+    hotel_plan: List[HotelNight] = []  # Recommended hotels night by night
 
     # Additional information
     summary: str = ""
@@ -1 +1,131 @@
+import os
+
 BASE_URL = "https://k6oayrgulgb5sasvwj3tsy7l7u0tikfd.lambda-url.ap-northeast-1.on.aws"
+
+# Shared HTTP client settings for the hotel API
+HTTP_MAX_CONNECTIONS = 100
+HTTP_MAX_KEEPALIVE_CONNECTIONS = 20
+HTTP_KEEPALIVE_EXPIRY = 30.0  # seconds an idle connection stays in the pool
+HTTP_CONNECT_TIMEOUT = 5.0
+HTTP_REQUEST_TIMEOUT = 30.0
+
+# Hotel recommendation step
+HOTEL_VACANCY_CONCURRENCY = 4  # counties queried in parallel
+HOTEL_STEP_DEADLINE = 60.0  # seconds before returning partial results
+HOTEL_PREFETCH = True  # query a new trip's destination counties while its plan is generated
+
+# Hotel API response cache, TTLs in seconds per endpoint (unlisted endpoints are not cached)
+HOTEL_CACHE_TTLS = {
+    "hotel/vacancies": 60.0,
+    "plans": 300.0,
+    "hotel/fuzzy_match": 3600.0,
+    "hotel/details": 86400.0
+}
+HOTEL_CACHE_MAX_ENTRIES = 2048
+HOTEL_CACHE_MAX_BYTES = 64 * 1024 * 1024
+HOTEL_CACHE_STALE_TTL = 6 * 3600.0  # expired responses kept this long to serve while the API is down
+
+# Offline snapshot of static hotel metadata, queried in-process; the live API is only used for vacancies
+HOTEL_INVENTORY_PATH = ".cache/hotel_inventory.sqlite3"
+HOTEL_INVENTORY_COUNTIES = (1, 3, 4, 9, 15, 16, 20)  # highest-traffic counties kept in the snapshot
+HOTEL_INVENTORY_REFRESH_INTERVAL = 24 * 3600.0  # seconds between snapshot refreshes
+HOTEL_INVENTORY_MAX_AGE = 3 * 24 * 3600.0  # counties refreshed longer ago are answered by the API
+HOTEL_INVENTORY_REFRESH_CONCURRENCY = 4  # hotel/details calls in flight while refreshing
+HOTEL_INVENTORY_MMAP_BYTES = 256 * 1024 * 1024
+HOTEL_INVENTORY_SEARCH_LIMIT = 20
+HOTEL_INVENTORY_FUZZY_CUTOFF = 0.4  # name bigram similarity for a fuzzy match when no name contains the keyword
+
+# Persistent cache for structured LLM outputs
+LLM_CACHE_PATH = ".cache/llm_outputs.sqlite3"
+LLM_CACHE_TTL = 7 * 24 * 3600.0
+LLM_CACHE_MAX_ENTRIES = 50000
+LLM_CACHE_SIMILARITY_CANDIDATES = 500  # recent entries scanned by the near-duplicate tier
+LLM_CACHE_AGENTS = ("intention_detection", "context_extraction")  # agents that opt in
+
+# Server-Sent Events streaming
+SSE_HEARTBEAT_INTERVAL = 15.0  # seconds of silence before a heartbeat comment is sent
+SSE_QUEUE_SIZE = 32  # events buffered for a slow client before the workflow waits
+
+# Daily planner fan-out: trips this long are outlined first, then each day is planned in parallel
+PLANNER_FAN_OUT_MIN_DAYS = 3  # None disables fan-out
+PLANNER_MAX_PARALLEL_DAYS = 4
+
+# Start context extraction alongside intention detection and keep it when the intent is a new trip
+SPECULATIVE_CONTEXT_EXTRACTION = False
+
+# Local intention pre-classifier: analyses at least this confident skip the LLM (None disables)
+INTENT_FAST_PATH_THRESHOLD = 0.85
+
+# Conversation session storage: "memory" (per process), "sqlite" (shared by workers on one node) or "redis"
+SESSION_STORE_BACKEND = os.getenv("SESSION_STORE_BACKEND", "memory")
+SESSION_TTL = 24 * 3600.0  # seconds after the last update before a session expires
+SESSION_MAX_ENTRIES = 10000  # in-memory store only
+SESSION_STORE_PATH = ".cache/sessions.sqlite3"
+SESSION_REDIS_URL = os.getenv("SESSION_REDIS_URL", "redis://localhost:6379/0")
+
+# Binary session snapshots (msgpack); bump the version when SessionState or the artifacts change shape
+SESSION_SCHEMA_VERSION = 3
+SESSION_COMPRESSION = True  # zstd, when the zstandard package is installed
+SESSION_COMPRESSION_MIN_BYTES = 1024  # smaller snapshots are stored uncompressed
+SESSION_COMPRESSION_LEVEL = 3
+SESSION_ARTIFACT_CACHE_SIZE = 1024  # snapshots written by this process whose validated artifacts are kept for reuse
+
+# Conversation history: recent messages kept verbatim, older ones folded into a rolling summary
+HISTORY_MAX_MESSAGES = 12  # ring buffer size (user and assistant messages)
+HISTORY_SUMMARY_BATCH = 4  # evicted messages collected before a summarization runs
+HISTORY_MAX_PENDING = 40  # evicted messages kept while summarization is unavailable
+HISTORY_PROMPT_TOKENS = 800  # token budget of the history included in prompts
+
+# Concurrent messages on one session: "queue" (run in order), "reject" (HTTP 409) or "cancel_previous"
+SESSION_CONCURRENCY_POLICY = os.getenv("SESSION_CONCURRENCY_POLICY", "queue")
+SESSION_MAX_QUEUED_TURNS = 4  # turns waiting behind the running one before new ones are rejected
+
+# Upstream admission control: requests per second, burst and concurrent calls per upstream
+UPSTREAM_LIMITS = {
+    "openai:gpt-4o-mini": {"rate": 8.0, "burst": 16, "max_concurrency": 16},
+    "hotel:hotel/vacancies": {"rate": 5.0, "burst": 10, "max_concurrency": 8},
+    "hotel:hotel/details": {"rate": 10.0, "burst": 20, "max_concurrency": 8},
+    "hotel:hotel/fuzzy_match": {"rate": 10.0, "burst": 20, "max_concurrency": 8},
+    "hotel:plans": {"rate": 5.0, "burst": 10, "max_concurrency": 8}
+}
+UPSTREAM_DEFAULT_LIMIT = {"rate": 5.0, "burst": 10, "max_concurrency": 8}
+UPSTREAM_BACKOFF_BASE = 1.0  # seconds paused after a 429 without Retry-After, doubling per throttle
+UPSTREAM_BACKOFF_MAX = 30.0
+UPSTREAM_MIN_RATE_FRACTION = 0.1  # throttling never lowers the rate below this share of the configured rate
+UPSTREAM_RATE_RECOVERY = 0.05  # share of the configured rate regained per successful call
+
+# Hotel API resilience: retries with decorrelated jitter, hedged requests and a circuit breaker per endpoint
+HOTEL_RETRY_ATTEMPTS = 3
+HOTEL_RETRY_BASE_DELAY = 0.2  # seconds
+HOTEL_RETRY_MAX_DELAY = 5.0
+HOTEL_ATTEMPT_TIMEOUT = 10.0  # seconds per attempt, hedge included
+HOTEL_HEDGE_QUANTILE = 0.95  # a duplicate request is sent once the first is slower than this latency quantile (None disables)
+HOTEL_HEDGE_MIN_SAMPLES = 20  # latencies observed before hedging starts
+HOTEL_HEDGE_MIN_DELAY = 0.05
+HOTEL_HEDGE_MAX_DELAY = 5.0
+HOTEL_LATENCY_WINDOW = 200  # recent latencies per endpoint the quantile is taken over
+HOTEL_BREAKER_FAILURES = 5  # consecutive failed calls that open the circuit
+HOTEL_BREAKER_RESET = 30.0  # seconds the circuit stays open before a probe call
+
+# County name matching
+COUNTY_FUZZY_CUTOFF = 0.6  # difflib similarity a fuzzy county match must reach
+COUNTY_FUZZY_CACHE_SIZE = 4096  # distinct unmatched location strings whose fuzzy result is memoized
+
+# Bundled gazetteer of Taiwan districts, loaded on first use
+GAZETTEER_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "taiwan_districts.tsv")
+
+# Hotel ranking: weights of each score, hotels kept per night and the spatial grid
+HOTEL_RANKING_WEIGHTS = {"distance": 0.5, "price": 0.3, "room_fit": 0.2}
+HOTEL_TOP_K = 3  # hotels recommended per night
+HOTEL_DISTANCE_SCALE_KM = 5.0  # distance at which the distance score falls to 1/e
+HOTEL_SEARCH_RADIUS_KM = 15.0  # hotels considered around a night's activities before falling back to all
+HOTEL_GRID_CELL_KM = 5.0
+HOTEL_DEFAULT_ROOM_CAPACITY = 2  # guests per room when the API gives none
+# Nightly room price range (TWD) per budget tier; None is unbounded
+HOTEL_BUDGET_TIERS = {"low": (0.0, 2500.0), "medium": (2000.0, 5000.0), "high": (4500.0, None)}
+HOTEL_BUDGET_MIN_AMOUNT = 300.0  # smallest number in a budget read as a price without a currency or unit marker
+HOTEL_BUDGET_KEYWORDS = {
+    "low": ("便宜", "經濟", "小資", "平價", "省錢", "學生", "budget", "cheap", "low"),
+    "medium": ("中等", "適中", "普通", "一般", "moderate", "medium", "mid"),
+    "high": ("高級", "豪華", "奢華", "頂級", "五星", "luxury", "premium", "high")
+}
@@ -1,5 +1,7 @@
-from typing import Dict, List, Optional
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
 from difflib import get_close_matches
+from app.config.constants import COUNTY_FUZZY_CUTOFF, COUNTY_FUZZY_CACHE_SIZE
 
 COUNTY_DATA = [
     {"id": 1, "name": "臺北市"},
@@ -29,9 +31,101 @@ COUNTY_DATA = [
     {"id": 25, "name": "大阪市"}
 ]
 
-class CountyMapper:
+# Short names that identify a single county; 新竹 and 嘉義 are both a city and a county
+COUNTY_SHORT_NAMES = {
+    "臺北": "臺北市", "基隆": "基隆市", "新北": "新北市", "宜蘭": "宜蘭縣", "桃園": "桃園市",
+    "苗栗": "苗栗縣", "臺中": "臺中市", "彰化": "彰化縣", "南投": "南投縣", "雲林": "雲林縣",
+    "臺南": "臺南市", "高雄": "高雄市", "澎湖": "澎湖縣", "屏東": "屏東縣", "臺東": "臺東縣",
+    "花蓮": "花蓮縣", "金門": "金門縣", "連江": "連江縣", "馬祖": "連江縣", "大阪": "大阪市"
+}
+
+# Place names starting with a short county name that belong to another county; indexed so
+# the longest match wins over the short name, e.g. 新北投 is in 臺北市, not 新北市
+COUNTY_LANDMARK_NAMES = {
+    "新北投": "臺北市"
+}
+
+def _normalization_table() -> Dict[int, str]:
+    """Full-width ASCII and spaces to half-width, and variant characters to the forms used in COUNTY_DATA"""
+    table = {code: chr(code - 0xFEE0) for code in range(0xFF01, 0xFF5F)}
+    table[0x3000] = " "
+    variants = {
+        "台": "臺", "鎭": "鎮", "鄕": "鄉",
+        # Simplified forms of the characters in county names
+        "县": "縣", "义": "義", "兰": "蘭", "园": "園", "东": "東", "门": "門",
+        "莲": "蓮", "连": "連", "云": "雲", "诸": "諸", "边": "邊", "湾": "灣"
+    }
+    table.update({ord(variant): standard for variant, standard in variants.items()})
+    return table
+
+NORMALIZATION_TABLE = _normalization_table()
+
+def normalize_location(location: str) -> str:
+    """Normalize a location string for matching against county names"""
+    return location.translate(NORMALIZATION_TABLE).strip()
+
+class NameTrie:
+    """Character trie of normalized names, finding the leftmost, longest name in a string"""
+
     def __init__(self):
+        self._root: Dict[str, Any] = {}
+
+    def add(self, name: str, value: Any) -> None:
+        """Index a name (normalized, so 台 and 臺 spellings both match), replacing any previous value"""
+        node = self._root
+        for char in normalize_location(name):
+            node = node.setdefault(char, {})
+        # "" can never be a character of the input, so it marks the end of a name
+        node[""] = value
+
+    def find(self, text: str, start: int = 0) -> Optional[Tuple[Any, int, int]]:
+        """
+        Leftmost, longest indexed name in an already normalized string.
+
+        Args:
+            text: Normalized string
+            start: Index to start searching from
+
+        Returns:
+            (value, start, end) of the match, or None
+        """
+        root = self._root
+        for i in range(start, len(text)):
+            node = root.get(text[i])
+            if node is None:
+                continue
+            match = None
+            j = i + 1
+            while True:
+                if "" in node:
+                    match = (node[""], i, j)
+                if j == len(text):
+                    break
+                node = node.get(text[j])
+                if node is None:
+                    break
+                j += 1
+            if match is not None:
+                return match
+        return None
+
+class CountyMapper:
+    """
+    Maps free-text locations to county IDs.
+
+    County names, their 台 spellings, unambiguous short names and landmarks that
+    start with a short name are indexed in a character trie; a lookup normalizes the string once and returns the leftmost,
+    longest name in it. Strings with no indexed name fall back to fuzzy matching,
+    memoized per distinct string.
+    """
+
+    def __init__(self, extra_names: Optional[Dict[str, int]] = None):
+        """
+        Args:
+            extra_names: Further names to index, e.g. districts, mapped to their county ID
+        """
         self.county_map = {county["name"]: county["id"] for county in COUNTY_DATA}
+        self.county_names = {county["id"]: county["name"] for county in COUNTY_DATA}
         # Create alternative mappings for common variations
         self.alternative_names = {
             "台北市": "臺北市",
@@ -39,7 +133,36 @@ class CountyMapper:
             "台南市": "臺南市",
             "台東縣": "臺東縣"
         }
-        
+        self._fuzzy_match = lru_cache(maxsize=COUNTY_FUZZY_CACHE_SIZE)(self._fuzzy_county_id)
+        self._trie = NameTrie()
+        for name, county_id in self.county_map.items():
+            self.add_name(name, county_id)
+        for short_name, name in COUNTY_SHORT_NAMES.items():
+            self.add_name(short_name, self.county_map[name])
+        for landmark, name in COUNTY_LANDMARK_NAMES.items():
+            self.add_name(landmark, self.county_map[name])
+        for name, county_id in (extra_names or {}).items():
+            self.add_name(name, county_id)
+
+    def add_name(self, name: str, county_id: int) -> None:
+        """Index a name (normalized, so 台 and 臺 spellings both match) for a county"""
+        self._trie.add(name, county_id)
+        self._fuzzy_match.cache_clear()
+
+    def find(self, location: str, start: int = 0) -> Optional[Tuple[int, int, int]]:
+        """(county ID, start, end) of the leftmost, longest indexed name in a normalized string, or None"""
+        return self._trie.find(location, start)
+
+    def find_all(self, location: str) -> List[int]:
+        """County IDs of every indexed name in a location string, in order of appearance"""
+        text = normalize_location(location)
+        county_ids = []
+        start = 0
+        while (match := self.find(text, start)) is not None:
+            county_ids.append(match[0])
+            start = match[2]
+        return county_ids
+
     def get_county_id(self, location: str) -> Optional[int]:
         """
         Get county ID from location string using fuzzy matching.
@@ -50,33 +173,21 @@ class CountyMapper:
         Returns:
             Optional[int]: County ID if found, None otherwise
         """
-        # Clean up the location string
-        location = location.strip()
-        
-        # First, try direct mapping
-        for county_name in self.county_map:
-            if county_name in location:
-                return self.county_map[county_name]
-        
-        # Try alternative names
-        for alt_name, std_name in self.alternative_names.items():
-            if alt_name in location:
-                return self.county_map[std_name]
-        
+        text = normalize_location(location)
+        match = self.find(text)
+        if match is not None:
+            return match[0]
+        return self._fuzzy_match(text)
+
+    def _fuzzy_county_id(self, location: str) -> Optional[int]:
         # Extract the first part of the location (usually the county)
         county_part = location.split('區')[0].split('市')[0].split('縣')[0]
         if county_part:
-            # Try fuzzy matching
-            county_names = list(self.county_map.keys())
-            matches = get_close_matches(county_part, county_names, n=1, cutoff=0.6)
+            matches = get_close_matches(county_part, self.county_map.keys(), n=1, cutoff=COUNTY_FUZZY_CUTOFF)
             if matches:
                 return self.county_map[matches[0]]
-        
         return None
 
     def get_county_name(self, county_id: int) -> Optional[str]:
         """Get county name from ID."""
-        for county in COUNTY_DATA:
-            if county["id"] == county_id:
-                return county["name"]
-        return None
\ No newline at end of file
+        return self.county_names.get(county_id)
@@ -0,0 +1,206 @@
+import threading
+from array import array
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+from app.config.constants import GAZETTEER_PATH
+from app.utils.counties_mapper import COUNTY_DATA, COUNTY_LANDMARK_NAMES, COUNTY_SHORT_NAMES, NameTrie, normalize_location
+
+DISTRICT_SUFFIXES = "區鄉鎮市"
+
+class Place(NamedTuple):
+    """A resolved county or district with its approximate centre"""
+    county_id: int
+    district_id: Optional[int]  # None when only the county was named
+    name: str
+    latitude: float
+    longitude: float
+
+def _is_street(text: str, end: int) -> bool:
+    """Whether a short district name ending at `end` is part of a street name, e.g. 中山路 or 和平東路"""
+    following = text[end:end + 2]
+    return following[:1] in ("路", "街") or (following[:1] in "東西南北" and following[1:] == "路")
+
+class Gazetteer:
+    """
+    Offline index of Taiwan's counties and districts with centroids.
+
+    Rows from the bundled TSV are held in parallel arrays indexed by district ID
+    and loaded on first use. Names are matched with a NameTrie: full county and
+    district names, unambiguous short county names, landmarks starting with one,
+    and district names without their 區/鄉/鎮/市 suffix (ignored when part of a
+    street name). A district name shared by several counties resolves to the one
+    in the county last named in the string, then to one in any county named in it,
+    then to the first listed.
+    """
+
+    def __init__(self, path: str = GAZETTEER_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        with self._lock:
+            if not self._loaded:
+                self._load()
+                self._loaded = True
+
+    def _load(self) -> None:
+        # Index 0 is unused so district IDs index the arrays directly
+        county_ids = array("B", [0])
+        latitudes = array("d", [0.0])
+        longitudes = array("d", [0.0])
+        names = [""]
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip() or line.startswith("#"):
+                    continue
+                district_id, county_id, name, latitude, longitude = line.rstrip("\n").split("\t")
+                if int(district_id) != len(names):
+                    raise ValueError(f"District IDs in {self.path} must be consecutive, got {district_id}")
+                county_ids.append(int(county_id))
+                names.append(name)
+                latitudes.append(float(latitude))
+                longitudes.append(float(longitude))
+
+        sums: Dict[int, List[float]] = {}
+        for district_id in range(1, len(names)):
+            total = sums.setdefault(county_ids[district_id], [0.0, 0.0, 0])
+            total[0] += latitudes[district_id]
+            total[1] += longitudes[district_id]
+            total[2] += 1
+        self._county_centroids = {
+            county_id: (lat_sum / count, lon_sum / count) for county_id, (lat_sum, lon_sum, count) in sums.items()
+        }
+        self._county_names = {county["id"]: county["name"] for county in COUNTY_DATA}
+
+        # Normalized name -> (county ID or 0, district IDs sharing the name, whether it is a short form)
+        entries: Dict[str, Tuple[int, Tuple[int, ...], bool]] = {}
+        for county in COUNTY_DATA:
+            entries[normalize_location(county["name"])] = (county["id"], (), False)
+        for short_name, name in COUNTY_SHORT_NAMES.items():
+            entries[normalize_location(short_name)] = (entries[normalize_location(name)][0], (), False)
+        for landmark, name in COUNTY_LANDMARK_NAMES.items():
+            entries[normalize_location(landmark)] = (entries[normalize_location(name)][0], (), False)
+        for district_id in range(1, len(names)):
+            key = normalize_location(names[district_id])
+            _, shared, _ = entries.get(key, (0, (), False))
+            entries[key] = (0, shared + (district_id,), False)
+        for district_id in range(1, len(names)):
+            name = names[district_id]
+            if len(name) < 3 or name[-1] not in DISTRICT_SUFFIXES:
+                continue
+            key = normalize_location(name[:-1])
+            county_id, shared, short = entries.get(key, (0, (), True))
+            if short:
+                entries[key] = (0, shared + (district_id,), True)
+
+        self._trie = NameTrie()
+        for key, value in entries.items():
+            self._trie.add(key, value)
+        self._district_county_ids = county_ids
+        self._latitudes = latitudes
+        self._longitudes = longitudes
+        self._names = names
+        self._unambiguous = {
+            names[district_ids[0]]: county_ids[district_ids[0]]
+            for _, district_ids, short in entries.values()
+            if not short and len(district_ids) == 1
+        }
+
+    def __len__(self) -> int:
+        """Number of districts"""
+        self._ensure_loaded()
+        return len(self._names) - 1
+
+    @property
+    def county_ids(self) -> array:
+        """County ID per district ID (index 0 unused)"""
+        self._ensure_loaded()
+        return self._district_county_ids
+
+    @property
+    def latitudes(self) -> array:
+        """Latitude per district ID (index 0 unused)"""
+        self._ensure_loaded()
+        return self._latitudes
+
+    @property
+    def longitudes(self) -> array:
+        """Longitude per district ID (index 0 unused)"""
+        self._ensure_loaded()
+        return self._longitudes
+
+    def district(self, district_id: int) -> Place:
+        self._ensure_loaded()
+        return Place(
+            self._district_county_ids[district_id],
+            district_id,
+            self._names[district_id],
+            self._latitudes[district_id],
+            self._longitudes[district_id]
+        )
+
+    def county(self, county_id: int) -> Optional[Place]:
+        """County-level place at the mean of its district centres, None for counties without districts"""
+        self._ensure_loaded()
+        centroid = self._county_centroids.get(county_id)
+        if centroid is None:
+            return None
+        return Place(county_id, None, self._county_names[county_id], centroid[0], centroid[1])
+
+    def district_counties(self) -> Dict[str, int]:
+        """Full district names found in a single county, mapped to that county's ID"""
+        self._ensure_loaded()
+        return dict(self._unambiguous)
+
+    def resolve(self, location: str) -> List[Place]:
+        """
+        Resolve the counties and districts named in a location string.
+
+        Args:
+            location: Free-text location, e.g. "台北市信義區到萬華區"
+
+        Returns:
+            Places in order of appearance, without duplicates; a county is only
+            returned on its own when none of its districts is named
+        """
+        self._ensure_loaded()
+        text = normalize_location(location)
+        matches = []
+        start = 0
+        while (match := self._trie.find(text, start)) is not None:
+            value, _, start = match
+            if value[2] and _is_street(text, start):
+                continue
+            matches.append(value)
+
+        named_counties: Set[int] = {county_id for county_id, _, _ in matches if county_id}
+        places: List[Place] = []
+        current = None
+        for county_id, district_ids, _ in matches:
+            if county_id:
+                current = county_id
+                place = self.county(county_id)
+                if place is not None:
+                    places.append(place)
+                continue
+            district_id = (
+                next((d for d in district_ids if self._district_county_ids[d] == current), None)
+                or next((d for d in district_ids if self._district_county_ids[d] in named_counties), None)
+                or district_ids[0]
+            )
+            current = self._district_county_ids[district_id]
+            places.append(self.district(district_id))
+
+        with_districts = {place.county_id for place in places if place.district_id is not None}
+        resolved: List[Place] = []
+        for place in places:
+            if place.district_id is None and place.county_id in with_districts:
+                continue
+            if place not in resolved:
+                resolved.append(place)
+        return resolved
+
+# Global gazetteer instance, loaded on first use
+taiwan_gazetteer = Gazetteer()
@@ -0,0 +1,400 @@
+import os
+import time
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Set, Tuple
+import msgpack
+from app.config.constants import (
+    HOTEL_INVENTORY_PATH,
+    HOTEL_INVENTORY_MAX_AGE,
+    HOTEL_INVENTORY_MMAP_BYTES,
+    HOTEL_INVENTORY_SEARCH_LIMIT,
+    HOTEL_INVENTORY_FUZZY_CUTOFF
+)
+from app.utils.counties_mapper import normalize_location
+from app.utils.vacancies import attribute_names
+
+# Per-stay room lists; only their static attributes are kept in the snapshot
+ROOM_FIELDS = ("suitable_room_types", "available_rooms", "room_types")
+STATIC_ROOM_FIELDS = ("id", "name", "bed_type", "bed_types", "adults", "children", "facilities")
+
+SCHEMA = (
+    """
+    CREATE TABLE hotels (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        search_name TEXT NOT NULL,
+        county_id INTEGER NOT NULL,
+        district TEXT,
+        record BLOB NOT NULL
+    )
+    """,
+    "CREATE INDEX hotels_search_name ON hotels (search_name)",
+    "CREATE INDEX hotels_county ON hotels (county_id, district)",
+    # kind is 'facility' (hotel or room facility) or 'bed_type'
+    "CREATE TABLE attributes (hotel_id INTEGER NOT NULL, kind TEXT NOT NULL, name TEXT NOT NULL)",
+    "CREATE INDEX attributes_kind_name ON attributes (kind, name, hotel_id)",
+    # complete is 0 when only some of the county's hotels were listed, e.g. those with a vacancy
+    "CREATE TABLE counties (county_id INTEGER PRIMARY KEY, refreshed_at REAL NOT NULL, complete INTEGER NOT NULL)"
+)
+
+def search_key(text: str) -> str:
+    """Normalized form hotel names are searched by: 台/臺 and full/half-width unified, casefolded"""
+    return normalize_location(text).casefold()
+
+def static_record(record: Mapping[str, Any]) -> Dict[str, Any]:
+    """A hotel record without per-stay data: rooms keep their names, beds, capacity and facilities"""
+    static = {key: value for key, value in record.items() if key not in ROOM_FIELDS}
+    rooms = next((record[field] for field in ROOM_FIELDS if record.get(field)), [])
+    static["room_types"] = [
+        {key: room[key] for key in STATIC_ROOM_FIELDS if key in room}
+        for room in rooms if isinstance(room, dict)
+    ]
+    return static
+
+def _bigrams(text: str) -> Set[str]:
+    return {text[i:i + 2] for i in range(len(text) - 1)} or {text}
+
+class HotelInventory:
+    """
+    Offline snapshot of static hotel metadata, queried in-process.
+
+    The snapshot is an SQLite file written by `build` and swapped in atomically. It
+    is opened read-only and memory-mapped, so full records are read straight from
+    the page cache; opening it also loads compact indexes (names, name bigrams and
+    hotel IDs per county, district and attribute) that answer name searches and
+    attribute filters without touching the records. A county is only answered from
+    the snapshot while its data is younger than `max_age`; callers fall back to
+    the API otherwise. Counties whose listing is partial only answer with the hotels
+    they hold: name searches don't fall back to similar names in them, and callers
+    treat finding nothing there as unknown rather than as no such hotel.
+    """
+
+    def __init__(
+        self,
+        path: str = HOTEL_INVENTORY_PATH,
+        max_age: float = HOTEL_INVENTORY_MAX_AGE,
+        mmap_bytes: int = HOTEL_INVENTORY_MMAP_BYTES,
+        fuzzy_cutoff: float = HOTEL_INVENTORY_FUZZY_CUTOFF
+    ):
+        self.path = path
+        self.max_age = max_age
+        self.mmap_bytes = mmap_bytes
+        self.fuzzy_cutoff = fuzzy_cutoff
+        self.hits = 0
+        self.misses = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._reset_indexes()
+
+    def _reset_indexes(self) -> None:
+        self._refreshed_at: Dict[int, float] = {}
+        self._complete: Set[int] = set()
+        # Parallel lists, one entry per hotel
+        self._ids: List[int] = []
+        self._search_names: List[str] = []
+        self._bigram_counts: List[int] = []
+        self._county_ids: List[int] = []
+        self._by_search_name: Dict[str, int] = {}  # search name -> position
+        self._bigram_index: Dict[str, List[int]] = {}  # name bigram -> positions
+        self._county_hotels: Dict[int, Set[int]] = {}
+        self._district_hotels: Dict[Tuple[int, str], Set[int]] = {}
+        self._attribute_hotels: Dict[str, Dict[str, Set[int]]] = {}  # kind -> name -> hotel IDs
+
+    @staticmethod
+    def build(
+        path: str,
+        records_by_county: Mapping[int, Iterable[Mapping[str, Any]]],
+        refreshed_at: Optional[Mapping[int, float]] = None,
+        complete: Optional[Mapping[int, bool]] = None
+    ) -> int:
+        """
+        Write a snapshot file, replacing any existing one atomically.
+
+        Args:
+            path: Snapshot file to write
+            records_by_county: Hotel records from hotel/details or hotel/vacancies, per county ID
+            refreshed_at: When each county's records were fetched; defaults to now
+            complete: Whether each county's records are all of its hotels; defaults to True
+
+        Returns:
+            Number of hotels written
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        temporary = f"{path}.{os.getpid()}.tmp"
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        now = time.time()
+        count = 0
+        conn = sqlite3.connect(temporary)
+        try:
+            for statement in SCHEMA:
+                conn.execute(statement)
+            for county_id, records in records_by_county.items():
+                for record in records:
+                    static = static_record(record)
+                    hotel_id = int(static["id"])
+                    district = (static.get("district") or {}).get("name")
+                    cursor = conn.execute(
+                        "INSERT OR IGNORE INTO hotels VALUES (?, ?, ?, ?, ?, ?)",
+                        (
+                            hotel_id,
+                            static["name"],
+                            search_key(static["name"]),
+                            county_id,
+                            district,
+                            msgpack.packb(static, use_bin_type=True)
+                        )
+                    )
+                    if not cursor.rowcount:
+                        continue  # Listed under another county already
+                    count += 1
+                    facilities = set(attribute_names(static.get("facilities")))
+                    bed_types = set()
+                    for room in static["room_types"]:
+                        facilities.update(attribute_names(room.get("facilities")))
+                        bed_types.update(attribute_names(room.get("bed_types") or room.get("bed_type")))
+                    conn.executemany(
+                        "INSERT INTO attributes VALUES (?, ?, ?)",
+                        [(hotel_id, "facility", name) for name in facilities]
+                        + [(hotel_id, "bed_type", name) for name in bed_types]
+                    )
+                conn.execute(
+                    "INSERT OR REPLACE INTO counties VALUES (?, ?, ?)",
+                    (county_id, (refreshed_at or {}).get(county_id, now), int((complete or {}).get(county_id, True)))
+                )
+            conn.commit()
+            conn.execute("VACUUM")
+        finally:
+            conn.close()
+        os.replace(temporary, path)
+        return count
+
+    def open(self) -> bool:
+        """
+        (Re)open the snapshot, e.g. at startup or after a refresh rewrote it.
+
+        Returns:
+            Whether a snapshot was found
+        """
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+            self._reset_indexes()
+            if not os.path.exists(self.path):
+                return False
+            # immutable: the file is only ever replaced, never written in place, so no locking is needed
+            conn = sqlite3.connect(f"file:{os.path.abspath(self.path)}?mode=ro&immutable=1", uri=True, check_same_thread=False)
+            conn.execute(f"PRAGMA mmap_size={int(self.mmap_bytes)}")
+            try:
+                counties = conn.execute("SELECT county_id, refreshed_at, complete FROM counties").fetchall()
+            except sqlite3.OperationalError:
+                # Snapshots written before listings were flagged complete are treated as partial
+                counties = conn.execute("SELECT county_id, refreshed_at, 0 FROM counties").fetchall()
+            for county_id, refreshed_at, complete in counties:
+                self._refreshed_at[county_id] = refreshed_at
+                if complete:
+                    self._complete.add(county_id)
+            for hotel_id, search_name, county_id, district in conn.execute(
+                "SELECT id, search_name, county_id, district FROM hotels ORDER BY id"
+            ):
+                position = len(self._ids)
+                self._ids.append(hotel_id)
+                self._search_names.append(search_name)
+                self._county_ids.append(county_id)
+                self._by_search_name.setdefault(search_name, position)
+                bigrams = _bigrams(search_name)
+                self._bigram_counts.append(len(bigrams))
+                for bigram in bigrams:
+                    self._bigram_index.setdefault(bigram, []).append(position)
+                self._county_hotels.setdefault(county_id, set()).add(hotel_id)
+                if district:
+                    self._district_hotels.setdefault((county_id, district), set()).add(hotel_id)
+            for hotel_id, kind, name in conn.execute("SELECT hotel_id, kind, name FROM attributes"):
+                self._attribute_hotels.setdefault(kind, {}).setdefault(name, set()).add(hotel_id)
+            self._conn = conn
+            return True
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def refreshed_at(self) -> Dict[int, float]:
+        """When each county in the snapshot was fetched"""
+        return dict(self._refreshed_at)
+
+    def complete_county_ids(self) -> Set[int]:
+        """Counties whose records in the snapshot are all of their hotels, fresh or not"""
+        return set(self._complete)
+
+    def covers(self, county_id: Optional[int] = None, complete: bool = False) -> bool:
+        """
+        Whether the snapshot holds fresh data for a county, or for any county when none is given.
+
+        Args:
+            county_id: County to check
+            complete: Only count counties whose listing holds all of their hotels
+        """
+        if county_id is None:
+            return bool(self._fresh_county_ids(complete))
+        if complete and county_id not in self._complete:
+            return False
+        return self._refreshed_at.get(county_id, 0.0) >= time.time() - self.max_age
+
+    def _fresh_county_ids(self, complete: bool = False) -> Set[int]:
+        cutoff = time.time() - self.max_age
+        return {
+            county_id for county_id, refreshed_at in self._refreshed_at.items()
+            if refreshed_at >= cutoff and (not complete or county_id in self._complete)
+        }
+
+    def _count(self, found: bool) -> None:
+        if found:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    def hotels(self, hotel_ids: Iterable[int]) -> List[Dict[str, Any]]:
+        """Records of the given hotels, in the order given"""
+        hotel_ids = list(hotel_ids)
+        if not hotel_ids:
+            return []
+        with self._lock:
+            if self._conn is None:
+                return []
+            rows = dict(self._conn.execute(
+                f"SELECT id, record FROM hotels WHERE id IN ({', '.join('?' * len(hotel_ids))})",
+                hotel_ids
+            ).fetchall())
+        return [msgpack.unpackb(rows[hotel_id], raw=False) for hotel_id in hotel_ids if hotel_id in rows]
+
+    def county_records(self, county_id: int) -> List[Dict[str, Any]]:
+        """Every record of a county in the snapshot, fresh or not"""
+        return self.hotels(sorted(self._county_hotels.get(county_id, ())))
+
+    def search(self, keyword: str, limit: int = HOTEL_INVENTORY_SEARCH_LIMIT) -> List[Dict[str, Any]]:
+        """
+        Hotels whose name contains the keyword, earliest and shortest match first; when
+        none does, the names sharing the most character bigrams with it among counties
+        with a complete listing, since a partial one may lack the hotel actually meant.
+
+        Args:
+            keyword: Hotel name or part of it
+            limit: Most hotels returned
+        """
+        fresh = self._fresh_county_ids()
+        key = search_key(keyword).strip()
+        if not key or not fresh:
+            self._count(False)
+            return []
+        names, county_ids = self._search_names, self._county_ids
+        # Names containing the keyword contain each of its bigrams, so only the shortest posting list is scanned
+        query = _bigrams(key)
+        if len(key) >= 2:
+            candidates = min((self._bigram_index.get(bigram, []) for bigram in query), key=len)
+        else:
+            candidates = range(len(names))
+        matches = sorted(
+            (position_in_name, len(names[position]), position)
+            for position in candidates
+            if (position_in_name := names[position].find(key)) >= 0 and county_ids[position] in fresh
+        )
+        positions = [position for _, _, position in matches[:limit]]
+        if not positions:
+            complete = self._fresh_county_ids(complete=True)
+            # Jaccard similarity of name bigrams, counted over the postings of the keyword's bigrams
+            shared: Dict[int, int] = {}
+            for bigram in query:
+                for position in self._bigram_index.get(bigram, ()):
+                    shared[position] = shared.get(position, 0) + 1
+            scored = sorted(
+                (-score, position)
+                for position, count in shared.items()
+                if county_ids[position] in complete
+                and (score := count / (len(query) + self._bigram_counts[position] - count)) >= self.fuzzy_cutoff
+            )
+            positions = [position for _, position in scored[:limit]]
+        self._count(bool(positions))
+        return self.hotels(self._ids[position] for position in positions)
+
+    def details(self, hotel_name: str) -> Optional[Dict[str, Any]]:
+        """The hotel with exactly this name (after normalization), if its county is fresh"""
+        position = self._by_search_name.get(search_key(hotel_name).strip())
+        if position is None or not self.covers(self._county_ids[position]):
+            self._count(False)
+            return None
+        self._count(True)
+        records = self.hotels([self._ids[position]])
+        return records[0] if records else None
+
+    def match_attributes(self, kind: str, terms: Iterable[str]) -> Dict[str, List[str]]:
+        """
+        Attribute names in the snapshot containing each term, e.g. "停車" -> ["免費停車位（數量有限）", ...].
+
+        Args:
+            kind: "facility" or "bed_type"
+            terms: Free-text attributes, e.g. ContextArtifact.preferences
+
+        Returns:
+            The terms that match at least one attribute, with the names they match
+        """
+        vocabulary = self._attribute_hotels.get(kind, {})
+        matches = {}
+        for term in terms:
+            key = search_key(term).strip()
+            names = [name for name in vocabulary if key and key in search_key(name)]
+            if names:
+                matches[term] = names
+        return matches
+
+    def filter(
+        self,
+        county_id: int,
+        district: Optional[str] = None,
+        facilities: Sequence[Sequence[str]] = (),
+        bed_types: Sequence[Sequence[str]] = ()
+    ) -> Optional[Set[int]]:
+        """
+        IDs of a county's hotels with the given static attributes.
+
+        Args:
+            county_id: County to search
+            district: Exact district name, e.g. "信義區"
+            facilities: Alternatives per required facility, e.g. from match_attributes; each group must match once
+            bed_types: Alternatives per required bed type, as for facilities
+
+        Returns:
+            Matching hotel IDs, or None when the county isn't fresh in the snapshot
+        """
+        if not self.covers(county_id):
+            self._count(False)
+            return None
+        if district:
+            hotel_ids = set(self._district_hotels.get((county_id, district), ()))
+        else:
+            hotel_ids = set(self._county_hotels.get(county_id, ()))
+        for kind, groups in (("facility", facilities), ("bed_type", bed_types)):
+            postings = self._attribute_hotels.get(kind, {})
+            for names in groups:
+                if not names:
+                    continue
+                hotel_ids &= set().union(*(postings.get(name, ()) for name in names))
+        self._count(True)
+        return hotel_ids
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.time()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hotels": len(self._ids),
+            "partial_counties": sorted(set(self._refreshed_at) - self._complete),
+            "county_ages": {county_id: round(now - refreshed_at) for county_id, refreshed_at in self._refreshed_at.items()}
+        }
+
+# Global hotel inventory instance, opened at startup
+hotel_inventory = HotelInventory()
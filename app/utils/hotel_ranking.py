@@ -0,0 +1,250 @@
+import re
+import math
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from app.config.constants import (
+    HOTEL_RANKING_WEIGHTS,
+    HOTEL_TOP_K,
+    HOTEL_DISTANCE_SCALE_KM,
+    HOTEL_SEARCH_RADIUS_KM,
+    HOTEL_GRID_CELL_KM,
+    HOTEL_BUDGET_TIERS,
+    HOTEL_BUDGET_KEYWORDS,
+    HOTEL_BUDGET_MIN_AMOUNT
+)
+
+KM_PER_DEGREE = 111.195
+# A number with its currency, multiplier or count unit; numbers counting days, nights or people aren't amounts
+AMOUNT_PATTERN = re.compile(
+    r"(nt\$|ntd|twd|\$)?\s*(\d[\d,]*(?:\.\d+)?)\s*(k|千|萬)?\s*(元|塊|ntd|twd|dollars?)?"
+    r"\s*(天|日|夜|晚|人|位|間|房|年|月|號|歲|nights?|days?|people|persons?|pax|guests?|rooms?)?",
+    re.IGNORECASE
+)
+AMOUNT_MULTIPLIERS = {"k": 1000, "千": 1000, "萬": 10000}
+TOTAL_MARKERS = ("總", "全程", "整趟", "total")
+
+def budget_range(budget: Optional[str], nights: int = 1) -> Optional[Tuple[float, Optional[float]]]:
+    """
+    Nightly room price range for a free-text budget.
+
+    Amounts are read as a range ("3000-5000") or an upper bound ("每晚3000"), and
+    divided over the nights when the budget is for the whole trip; otherwise the
+    budget's tier keyword selects a range from HOTEL_BUDGET_TIERS. A number is an
+    amount when it carries a currency or multiplier ("2萬", "$80", "3000元") or is at
+    least HOTEL_BUDGET_MIN_AMOUNT, and never when it counts days, nights or people
+    ("5天4夜", "2人").
+
+    Args:
+        budget: ContextArtifact.budget, e.g. "中等", "每晚3000元" or "total 20k"
+        nights: Nights a whole-trip budget is spread over
+
+    Returns:
+        (minimum, maximum or None for unbounded), or None when there is no usable budget
+    """
+    if not budget:
+        return None
+    text = budget.lower()
+    amounts = []
+    for currency, number, unit, suffix, count in AMOUNT_PATTERN.findall(text):
+        amount = float(number.replace(",", "")) * AMOUNT_MULTIPLIERS.get(unit.lower(), 1)
+        if not count and (currency or unit or suffix or amount >= HOTEL_BUDGET_MIN_AMOUNT):
+            amounts.append(amount)
+    if amounts:
+        divisor = max(1, nights) if any(marker in text for marker in TOTAL_MARKERS) else 1
+        if len(amounts) >= 2:
+            low, high = sorted(amounts[:2])
+            return low / divisor, high / divisor
+        return 0.0, amounts[0] / divisor
+    for tier, keywords in HOTEL_BUDGET_KEYWORDS.items():
+        if any(keyword in text for keyword in keywords):
+            return HOTEL_BUDGET_TIERS[tier]
+    return None
+
+class VacancyTable:
+    """Columns of a vacancy list used for ranking, one row per hotel; missing values are NaN"""
+
+    def __init__(self, latitudes: np.ndarray, longitudes: np.ndarray, prices: np.ndarray, capacities: np.ndarray):
+        """
+        Args:
+            latitudes: Hotel latitudes
+            longitudes: Hotel longitudes
+            prices: Lowest nightly room price
+            capacities: Guests the largest room holds
+        """
+        self.latitudes = latitudes
+        self.longitudes = longitudes
+        self.prices = prices
+        self.capacities = capacities
+
+    def __len__(self) -> int:
+        return len(self.latitudes)
+
+def distances_km(latitudes: np.ndarray, longitudes: np.ndarray, latitude: float, longitude: float) -> np.ndarray:
+    """Equirectangular distances from one point, accurate to well under 1% at city scale"""
+    dx = (longitudes - longitude) * math.cos(math.radians(latitude))
+    dy = latitudes - latitude
+    return np.hypot(dx, dy) * KM_PER_DEGREE
+
+class GeoGrid:
+    """
+    Uniform grid over points, for radius queries without scanning every point.
+
+    Points are bucketed into cells of about `cell_km` and sorted by cell, so the
+    cells of each grid row intersecting a query are one contiguous slice.
+    """
+
+    def __init__(self, latitudes: np.ndarray, longitudes: np.ndarray, cell_km: float = HOTEL_GRID_CELL_KM):
+        self.cell_km = cell_km
+        valid = np.flatnonzero(~(np.isnan(latitudes) | np.isnan(longitudes)))
+        self._lat_step = cell_km / KM_PER_DEGREE
+        reference = float(np.mean(latitudes[valid])) if len(valid) else 0.0
+        self._lon_step = self._lat_step / max(0.01, math.cos(math.radians(reference)))
+        rows = np.floor(latitudes[valid] / self._lat_step).astype(np.int64)
+        cols = np.floor(longitudes[valid] / self._lon_step).astype(np.int64)
+        self._row_min = int(rows.min()) if len(valid) else 0
+        self._col_min = int(cols.min()) if len(valid) else 0
+        self._cols = (int(cols.max()) - self._col_min + 1) if len(valid) else 1
+        self._rows = (int(rows.max()) - self._row_min + 1) if len(valid) else 0
+        keys = (rows - self._row_min) * self._cols + (cols - self._col_min)
+        order = np.argsort(keys, kind="stable")
+        self._keys = keys[order]
+        self._indices = valid[order]
+
+    def query(self, latitude: float, longitude: float, radius_km: float) -> np.ndarray:
+        """Indices of the points in cells within `radius_km` of a point (a superset of those within the radius)"""
+        reach = math.ceil(radius_km / self.cell_km)
+        row = math.floor(latitude / self._lat_step) - self._row_min
+        col = math.floor(longitude / self._lon_step) - self._col_min
+        col_low, col_high = max(0, col - reach), min(self._cols - 1, col + reach)
+        if col_low > col_high:
+            return self._indices[:0]
+        slices = []
+        for grid_row in range(max(0, row - reach), min(self._rows - 1, row + reach) + 1):
+            start = np.searchsorted(self._keys, grid_row * self._cols + col_low, side="left")
+            end = np.searchsorted(self._keys, grid_row * self._cols + col_high, side="right")
+            if end > start:
+                slices.append(self._indices[start:end])
+        return np.concatenate(slices) if slices else self._indices[:0]
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Positions of the k highest scores, best first; ties keep input order"""
+    if len(scores) > k:
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(len(scores))
+    return candidates[np.lexsort((candidates, -scores[candidates]))]
+
+class HotelRanker:
+    """
+    Ranks vacancies for each night of a stay with vectorized scores.
+
+    A hotel's score is the weighted sum of its distance score (exp(-km / scale)
+    from the night's activity centroid), price score against the budget range and
+    room fit for the group; hotels without coordinates or prices get neutral scores.
+    Only hotels in grid cells within `radius_km` of the centroid are scored, unless
+    fewer than k are.
+    """
+
+    def __init__(
+        self,
+        weights: Optional[Dict[str, float]] = None,
+        k: int = HOTEL_TOP_K,
+        distance_scale_km: float = HOTEL_DISTANCE_SCALE_KM,
+        radius_km: float = HOTEL_SEARCH_RADIUS_KM,
+        cell_km: float = HOTEL_GRID_CELL_KM
+    ):
+        self.weights = dict(HOTEL_RANKING_WEIGHTS if weights is None else weights)
+        self.k = k
+        self.distance_scale_km = distance_scale_km
+        self.radius_km = radius_km
+        self.cell_km = cell_km
+
+    @staticmethod
+    def price_scores(prices: np.ndarray, budget: Optional[Tuple[float, Optional[float]]]) -> np.ndarray:
+        """1 inside the budget range, decaying with the relative distance outside it; 0.5 when unknown"""
+        if budget is None:
+            return np.full(len(prices), 0.5)
+        low, high = budget
+        scores = np.ones(len(prices))
+        if low > 0:
+            below = prices < low
+            scores[below] = np.exp(-(low - prices[below]) / low)
+        if high is not None and high > 0:
+            above = prices > high
+            scores[above] = np.exp(-(prices[above] - high) / high)
+        scores[np.isnan(prices)] = 0.5
+        return scores
+
+    @staticmethod
+    def room_fit_scores(capacities: np.ndarray, group_size: Optional[int]) -> np.ndarray:
+        """1 when one room holds the group, 1/n when it takes n rooms"""
+        if not group_size:
+            return np.ones(len(capacities))
+        return 1.0 / np.ceil(group_size / np.maximum(capacities, 1.0))
+
+    def rank(
+        self,
+        table: VacancyTable,
+        centroids: Sequence[Optional[Tuple[float, float]]],
+        budget: Optional[str] = None,
+        group_size: Optional[int] = None,
+        nights: Optional[int] = None
+    ) -> List[np.ndarray]:
+        """
+        Top-k vacancy indices per night.
+
+        Args:
+            table: Vacancies to rank
+            centroids: (latitude, longitude) of each night's activities, None where unknown;
+                an empty sequence ranks once without distance
+            budget: ContextArtifact.budget
+            group_size: Guests to accommodate
+            nights: Nights of the whole trip, over which a trip budget is spread; defaults to one per centroid
+
+        Returns:
+            One array of indices into the table per centroid, best first
+        """
+        if len(table) == 0:
+            return [np.arange(0) for _ in centroids] or [np.arange(0)]
+        price_range = budget_range(budget, nights=nights or max(1, len(centroids)))
+        base = (
+            self.weights.get("price", 0.0) * self.price_scores(table.prices, price_range)
+            + self.weights.get("room_fit", 0.0) * self.room_fit_scores(table.capacities, group_size)
+        )
+        if not centroids:
+            return [_top_k(base, self.k)]
+
+        grid = None
+        everything = np.arange(len(table))
+        rankings = []
+        for centroid in centroids:
+            if centroid is None:
+                rankings.append(_top_k(base, self.k))
+                continue
+            if grid is None:
+                grid = GeoGrid(table.latitudes, table.longitudes, self.cell_km)
+            candidates = grid.query(centroid[0], centroid[1], self.radius_km)
+            if len(candidates) < self.k:
+                candidates = everything
+            distance = distances_km(table.latitudes[candidates], table.longitudes[candidates], *centroid)
+            distance_scores = np.nan_to_num(np.exp(-distance / self.distance_scale_km), nan=0.0)
+            scores = base[candidates] + self.weights.get("distance", 0.0) * distance_scores
+            rankings.append(candidates[_top_k(scores, self.k)])
+        return rankings
+
+    def select(
+        self,
+        table: VacancyTable,
+        centroids: Sequence[Optional[Tuple[float, float]]],
+        budget: Optional[str] = None,
+        group_size: Optional[int] = None,
+        nights: Optional[int] = None
+    ) -> List[int]:
+        """Union of the top-k vacancy indices of every night, in night and rank order"""
+        selected: Dict[int, None] = {}
+        for ranking in self.rank(table, centroids, budget, group_size, nights):
+            selected.update(dict.fromkeys(ranking.tolist()))
+        return list(selected)
+
+# Global hotel ranker with the configured weights
+hotel_ranker = HotelRanker()
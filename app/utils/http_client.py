@@ -0,0 +1,70 @@
+from typing import Optional
+import httpx
+from app.config.constants import (
+    HTTP_MAX_CONNECTIONS,
+    HTTP_MAX_KEEPALIVE_CONNECTIONS,
+    HTTP_KEEPALIVE_EXPIRY,
+    HTTP_CONNECT_TIMEOUT,
+    HTTP_REQUEST_TIMEOUT
+)
+
+def _http2_available() -> bool:
+    """HTTP/2 needs the optional `h2` package (httpx[http2])."""
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+def create_http_client(
+    max_connections: int = HTTP_MAX_CONNECTIONS,
+    max_keepalive_connections: int = HTTP_MAX_KEEPALIVE_CONNECTIONS,
+    keepalive_expiry: float = HTTP_KEEPALIVE_EXPIRY,
+    connect_timeout: float = HTTP_CONNECT_TIMEOUT,
+    timeout: float = HTTP_REQUEST_TIMEOUT
+) -> httpx.AsyncClient:
+    """
+    Create a pooled AsyncClient with keep-alive and HTTP/2 when available.
+
+    Args:
+        max_connections (int): Maximum number of concurrent connections
+        max_keepalive_connections (int): Maximum number of idle connections kept in the pool
+        keepalive_expiry (float): Seconds an idle connection is kept alive
+        connect_timeout (float): Timeout for establishing a connection
+        timeout (float): Default timeout for reads, writes and pool acquisition
+    """
+    return httpx.AsyncClient(
+        http2=_http2_available(),
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        ),
+        timeout=httpx.Timeout(timeout, connect=connect_timeout)
+    )
+
+class HTTPClientManager:
+    """Owns the app-scoped AsyncClient shared by all agents"""
+
+    def __init__(self):
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> Optional[httpx.AsyncClient]:
+        """The shared client, or None if the manager has not been started"""
+        return self._client
+
+    async def start(self, **kwargs) -> httpx.AsyncClient:
+        """Create the shared client; keyword arguments are passed to create_http_client"""
+        if self._client is None or self._client.is_closed:
+            self._client = create_http_client(**kwargs)
+        return self._client
+
+    async def close(self) -> None:
+        """Close the shared client and release its pooled connections"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+# Global HTTP client manager instance
+http_client_manager = HTTPClientManager()
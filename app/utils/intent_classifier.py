@@ -0,0 +1,192 @@
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+from app.workflow.models import IntentionAnalysis, IntentType
+from app.utils.counties_mapper import CountyMapper
+from app.utils.llm_cache import normalize_query
+from app.config.constants import INTENT_FAST_PATH_THRESHOLD
+
+# (pattern, weight) evidence for each intent; weights combine as independent probabilities
+NEW_TRIP_RULES = [
+    (re.compile(r"\b(plan|planning|organi[sz]e|arrange|book)\b.*\b(trip|itinerary|vacation|holiday|getaway|tour)\b"), 0.8),
+    (re.compile(r"\b(trip|travel|vacation|holiday|itinerary)\b.*\b(to|in|around)\b"), 0.6),
+    (re.compile(r"\b(want|like|going|hoping) to (visit|travel|go)\b"), 0.6),
+    (re.compile(r"\b\d+\s*(day|days|night|nights)\b"), 0.5),
+    (re.compile(r"(規劃|安排|計畫|計劃).*(行程|旅遊|旅行)"), 0.8),
+    (re.compile(r"(想|要|打算).*去.*(玩|旅遊|旅行|走走)"), 0.7),
+    (re.compile(r"(\d+|[一二三四五六七八九十兩])\s*天(\d+|[一二三四五六七八九十兩])?\s*夜?"), 0.5),
+]
+
+UPDATE_RULES = [
+    (re.compile(r"\b(change|update|modify|replace|swap|switch|instead|remove|drop|extend|shorten|reschedule|move)\b"), 0.8),
+    (re.compile(r"\b(different|another|other|cheaper|more|less|fewer)\b.*\b(hotel|hotels|activity|activities|restaurant|day)\b"), 0.6),
+    (re.compile(r"(改|換|更改|修改|取代|刪除|刪掉|延長|縮短|不要|調整)"), 0.8),
+]
+
+UNRELATED_RULES = [
+    (re.compile(r"\b(joke|poem|song|riddle|recipe|homework|stock|stocks|bitcoin)\b"), 0.9),
+    (re.compile(r"^(hi|hello|hey|thanks|thank you|good (morning|afternoon|evening)|who are you|what can you do)$"), 0.9),
+    (re.compile(r"(笑話|講個故事|寫一首詩|股票|比特幣)"), 0.9),
+    (re.compile(r"^(你好|嗨|哈囉|謝謝|你是誰)$"), 0.9),
+]
+
+# Update targets named in the intention prompt, with the words that point at them
+UPDATE_TARGET_RULES = [
+    ("hotels", re.compile(r"\b(hotel|hotels|accommodation|stay|room|rooms)\b|住宿|飯店|旅館|民宿|酒店|房間")),
+    ("dates", re.compile(r"\b(date|dates|depart|departure|start on|leave on)\b|日期|出發|哪天")),
+    ("budget", re.compile(r"\b(budget|cheaper|expensive|price)\b|預算|便宜|貴")),
+    ("duration", re.compile(r"\b(extend|shorten|longer|shorter)\b|延長|縮短|多一天|少一天")),
+    ("activities", re.compile(r"\b(activity|activities|attraction|attractions|restaurant|restaurants|sightseeing|day)\b|景點|餐廳|活動|行程")),
+]
+
+COUNTY_WEIGHT = 0.5
+
+def _combine(weights: Sequence[float]) -> float:
+    remaining = 1.0
+    for weight in weights:
+        remaining *= 1.0 - weight
+    return 1.0 - remaining
+
+def _sklearn_available() -> bool:
+    try:
+        import sklearn  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+class TfidfIntentModel:
+    """
+    Character n-gram TF-IDF plus logistic regression over logged intention analyses.
+
+    Requires scikit-learn, which is an optional dependency. Train it with `fit` on
+    queries and the `IntentionAnalysis` the LLM returned for them, e.g. the entries
+    from `StructuredOutputCache.logged_outputs`.
+    """
+
+    def __init__(self):
+        if not _sklearn_available():
+            raise ImportError("TfidfIntentModel requires scikit-learn (pip install scikit-learn)")
+        from sklearn.pipeline import make_pipeline
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        from sklearn.linear_model import LogisticRegression
+
+        # Character n-grams work for both English and Chinese without a tokenizer
+        self.pipeline = make_pipeline(
+            TfidfVectorizer(analyzer="char_wb", ngram_range=(1, 3), sublinear_tf=True),
+            LogisticRegression(max_iter=1000)
+        )
+        self.fitted = False
+
+    def fit(self, samples: Sequence[Tuple[str, IntentionAnalysis]]) -> "TfidfIntentModel":
+        """
+        Train on (query, analysis) pairs.
+
+        Args:
+            samples: Queries and the analyses the LLM produced for them
+        """
+        queries = [normalize_query(query) for query, _ in samples]
+        labels = [analysis.intent_type.value for _, analysis in samples]
+        if len(set(labels)) < 2:
+            raise ValueError("Need logged analyses for at least two intent types to train")
+        self.pipeline.fit(queries, labels)
+        self.fitted = True
+        return self
+
+    def predict(self, query: str) -> Tuple[IntentType, float]:
+        """Most likely intent for a query and its probability"""
+        probabilities = self.pipeline.predict_proba([normalize_query(query)])[0]
+        best = probabilities.argmax()
+        return IntentType(self.pipeline.classes_[best]), float(probabilities[best])
+
+class RuleIntentClassifier:
+    """
+    Local pre-classifier that decides clear-cut intentions without calling the LLM.
+
+    Keyword and regex rules, county names known to CountyMapper and, optionally, a
+    TfidfIntentModel each contribute evidence. `classify` returns an analysis only
+    when its confidence reaches `threshold`; everything else goes to the LLM.
+    """
+
+    def __init__(
+        self,
+        threshold: float = INTENT_FAST_PATH_THRESHOLD,
+        county_mapper: Optional[CountyMapper] = None,
+        model: Optional[TfidfIntentModel] = None
+    ):
+        self.threshold = threshold
+        self.model = model
+        mapper = county_mapper if county_mapper is not None else CountyMapper()
+        # Match "花蓮" as well as "花蓮縣"
+        names = set(mapper.county_map) | set(mapper.alternative_names)
+        names |= {name[:-1] for name in names if len(name) > 2 and name[-1] in "市縣"}
+        self.county_pattern = re.compile("|".join(sorted(map(re.escape, names), key=len, reverse=True)))
+        self.queries = 0
+        self.hits = 0
+
+    def _update_target(self, text: str) -> Optional[str]:
+        for target, pattern in UPDATE_TARGET_RULES:
+            if pattern.search(text):
+                return target
+        return None
+
+    def predict(self, query: str) -> Optional[IntentionAnalysis]:
+        """
+        Best local guess for a query's intention, whatever its confidence.
+
+        Args:
+            query: The user's message
+
+        Returns:
+            The analysis, or None if no rule matched and there is no model
+        """
+        text = normalize_query(query)
+        evidence: Dict[IntentType, List[float]] = {
+            IntentType.NEW_TRIP: [weight for pattern, weight in NEW_TRIP_RULES if pattern.search(text)],
+            IntentType.UPDATE_ITINERARY: [weight for pattern, weight in UPDATE_RULES if pattern.search(text)],
+            IntentType.UNRELATED: [weight for pattern, weight in UNRELATED_RULES if pattern.search(text)],
+        }
+        if self.county_pattern.search(text):
+            evidence[IntentType.NEW_TRIP].append(COUNTY_WEIGHT)
+
+        scores = sorted(
+            ((_combine(weights), intent) for intent, weights in evidence.items() if weights),
+            key=lambda item: item[0],
+            reverse=True
+        )
+        if scores:
+            confidence, intent = scores[0]
+            # Conflicting evidence (e.g. an update that names a county) lowers confidence
+            if len(scores) > 1:
+                confidence -= scores[1][0]
+        else:
+            confidence, intent = 0.0, None
+
+        if self.model is not None and confidence < self.threshold:
+            model_intent, model_confidence = self.model.predict(query)
+            if model_confidence > confidence:
+                intent, confidence = model_intent, model_confidence
+
+        if intent is None:
+            return None
+        update_target = self._update_target(text) if intent == IntentType.UPDATE_ITINERARY else None
+        return IntentionAnalysis(
+            intent_type=intent,
+            confidence=round(max(confidence, 0.0), 3),
+            update_target=update_target
+        )
+
+    def classify(self, query: str) -> Optional[IntentionAnalysis]:
+        """Return the local analysis if it is confident enough to skip the LLM, else None"""
+        self.queries += 1
+        analysis = self.predict(query)
+        if analysis is None or analysis.confidence < self.threshold:
+            return None
+        self.hits += 1
+        return analysis
+
+    def stats(self) -> Dict[str, float]:
+        """Queries seen, fast-path hits and the hit rate"""
+        return {
+            "queries": self.queries,
+            "hits": self.hits,
+            "hit_rate": self.hits / self.queries if self.queries else 0.0
+        }
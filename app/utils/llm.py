@@ -0,0 +1,127 @@
+import json
+import hashlib
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional, Type
+from pydantic import BaseModel
+from llama_index.core import BasePromptTemplate
+from llama_index.core.llms import LLM
+from app.utils.single_flight import SingleFlight
+from app.utils.llm_cache import StructuredOutputCache
+from app.utils.rate_limiter import UpstreamLimiter, retry_after_seconds
+
+# Process-wide in-flight registry shared by every agent's LLM
+llm_single_flight = SingleFlight()
+
+def _jsonable(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    return str(value)
+
+class SingleFlightLLM:
+    """
+    Wraps an LLM so that concurrent identical `astructured_predict` calls share one request.
+
+    Calls are identified by model, temperature, prompt template, prompt variables and
+    output class. When a `cache` is given, outputs are also served from and stored in
+    the persistent structured output cache. When a `limiter` is given, requests that
+    reach the model (not cache hits or shared calls) go through its admission control,
+    and 429 responses feed its backoff. Everything else is delegated to the wrapped LLM.
+    """
+
+    def __init__(
+        self,
+        llm: LLM,
+        group: Optional[SingleFlight] = None,
+        cache: Optional[StructuredOutputCache] = None,
+        limiter: Optional[UpstreamLimiter] = None
+    ):
+        self.llm = llm
+        self.group = group if group is not None else llm_single_flight
+        self.cache = cache
+        self.limiter = limiter
+        self.calls = 0
+        self.shared = 0
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.llm, name)
+
+    @asynccontextmanager
+    async def _admission(self) -> AsyncIterator[None]:
+        """Hold a limiter slot for one model request and report throttling to the limiter"""
+        if self.limiter is None:
+            yield
+            return
+        async with self.limiter.acquire():
+            try:
+                yield
+            except Exception as e:
+                if getattr(e, "status_code", None) == 429:
+                    self.limiter.record_throttle(retry_after_seconds(getattr(getattr(e, "response", None), "headers", None)))
+                raise
+            self.limiter.record_success()
+
+    def _make_key(self, output_cls: Type[BaseModel], prompt: BasePromptTemplate, prompt_args: Dict[str, Any]) -> str:
+        model = getattr(self.llm, "model", None) or self.llm.metadata.model_name
+        payload = json.dumps(
+            {
+                "model": model,
+                "temperature": getattr(self.llm, "temperature", None),
+                "template": prompt.get_template(),
+                "variables": prompt_args,
+                "output_cls": f"{output_cls.__module__}.{output_cls.__qualname__}"
+            },
+            sort_keys=True,
+            ensure_ascii=False,
+            default=_jsonable
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    async def astructured_predict(
+        self,
+        output_cls: Type[BaseModel],
+        prompt: BasePromptTemplate,
+        **prompt_args: Any
+    ) -> BaseModel:
+        """Structured prediction, joining an identical in-flight call when there is one."""
+        self.calls += 1
+        if self.cache is not None:
+            cached = await self.cache.get(output_cls, prompt, prompt_args)
+            if cached is not None:
+                return cached
+
+        async def predict() -> BaseModel:
+            async with self._admission():
+                output = await self.llm.astructured_predict(output_cls, prompt, **prompt_args)
+            if self.cache is not None:
+                await self.cache.set(output_cls, prompt, prompt_args, output)
+            return output
+
+        key = self._make_key(output_cls, prompt, prompt_args)
+        result, shared = await self.group.do(key, predict)
+        if shared:
+            self.shared += 1
+            # Callers mutate their artifacts, so each gets its own copy
+            return result.model_copy(deep=True)
+        return result
+
+    async def astream_structured_predict(
+        self,
+        output_cls: Type[BaseModel],
+        prompt: BasePromptTemplate,
+        **prompt_args: Any
+    ) -> AsyncIterator[BaseModel]:
+        """Streaming structured prediction, holding a limiter slot until the stream ends."""
+        if self.limiter is None:
+            return await self.llm.astream_structured_predict(output_cls, prompt, **prompt_args)
+
+        async def stream() -> AsyncIterator[BaseModel]:
+            async with self._admission():
+                partials = await self.llm.astream_structured_predict(output_cls, prompt, **prompt_args)
+                async for partial in partials:
+                    yield partial
+        return stream()
+
+    async def apredict(self, prompt: BasePromptTemplate, **prompt_args: Any) -> str:
+        """Text prediction through the limiter."""
+        async with self._admission():
+            return await self.llm.apredict(prompt, **prompt_args)
@@ -0,0 +1,238 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import asyncio
+import hashlib
+import threading
+import unicodedata
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Set, Tuple, Type
+from pydantic import BaseModel
+from llama_index.core import BasePromptTemplate
+from app.config.constants import (
+    LLM_CACHE_PATH,
+    LLM_CACHE_TTL,
+    LLM_CACHE_MAX_ENTRIES,
+    LLM_CACHE_SIMILARITY_CANDIDATES
+)
+
+@lru_cache(maxsize=None)
+def schema_hash(output_cls: Type[BaseModel]) -> str:
+    """Hash of the output model's JSON schema, so schema changes invalidate old entries"""
+    schema = json.dumps(output_cls.model_json_schema(), sort_keys=True)
+    return hashlib.sha256(schema.encode("utf-8")).hexdigest()
+
+def normalize_query(text: str) -> str:
+    """Casefold, unify full/half-width forms and collapse punctuation and whitespace"""
+    text = unicodedata.normalize("NFKC", text).casefold()
+    text = re.sub(r"[^\w\s]", " ", text)
+    return " ".join(text.split())
+
+def _trigrams(text: str) -> Set[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def similarity(a: str, b: str) -> float:
+    """Jaccard similarity of character trigrams of two normalized queries"""
+    grams_a, grams_b = _trigrams(a), _trigrams(b)
+    if not grams_a or not grams_b:
+        return 0.0
+    return len(grams_a & grams_b) / len(grams_a | grams_b)
+
+class StructuredOutputCache:
+    """
+    Persistent SQLite cache for `astructured_predict` outputs.
+
+    The exact tier is keyed on the rendered prompt plus the output schema hash. The
+    optional near-duplicate tier matches the normalized `query` variable against
+    earlier queries rendered with the same template, schema and other variables.
+    Entries expire after `ttl` seconds; the least recently used entries are evicted
+    beyond `max_entries`.
+    """
+
+    def __init__(
+        self,
+        path: str = LLM_CACHE_PATH,
+        ttl: float = LLM_CACHE_TTL,
+        max_entries: int = LLM_CACHE_MAX_ENTRIES,
+        similarity_threshold: Optional[float] = None,
+        query_field: str = "query"
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.similarity_threshold = similarity_threshold
+        self.query_field = query_field
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        # Opened lazily so importing the module never touches the disk
+        if self._conn is None:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    namespace TEXT NOT NULL,
+                    query TEXT,
+                    value TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_namespace ON llm_cache (namespace, last_access)")
+            conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_last_access ON llm_cache (last_access)")
+            self._conn = conn
+        return self._conn
+
+    def _keys(self, output_cls: Type[BaseModel], prompt: BasePromptTemplate, prompt_args: Dict[str, Any]):
+        """Exact key, near-duplicate namespace and normalized query for a call"""
+        schema = schema_hash(output_cls)
+        rendered = prompt.format(**prompt_args)
+        key = hashlib.sha256(f"{schema}\n{rendered}".encode("utf-8")).hexdigest()
+
+        query = prompt_args.get(self.query_field)
+        other_args = {k: v for k, v in prompt_args.items() if k != self.query_field}
+        namespace_payload = json.dumps(
+            {"schema": schema, "template": prompt.get_template(), "args": other_args},
+            sort_keys=True,
+            ensure_ascii=False,
+            default=str
+        )
+        namespace = hashlib.sha256(namespace_payload.encode("utf-8")).hexdigest()
+        normalized = normalize_query(query) if isinstance(query, str) else None
+        return key, namespace, normalized
+
+    def _lookup(self, key: str, namespace: str, query: Optional[str]) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT value FROM llm_cache WHERE key = ? AND expires_at > ?",
+                (key, now)
+            ).fetchone()
+            if row is not None:
+                conn.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key))
+                conn.commit()
+                self.hits += 1
+                return row[0]
+
+            if self.similarity_threshold is not None and query:
+                candidates = conn.execute(
+                    """
+                    SELECT key, query, value FROM llm_cache
+                    WHERE namespace = ? AND expires_at > ? AND query IS NOT NULL
+                    ORDER BY last_access DESC LIMIT ?
+                    """,
+                    (namespace, now, LLM_CACHE_SIMILARITY_CANDIDATES)
+                ).fetchall()
+                best_key, best_value, best_score = None, None, 0.0
+                for candidate_key, candidate_query, value in candidates:
+                    score = similarity(query, candidate_query)
+                    if score > best_score:
+                        best_key, best_value, best_score = candidate_key, value, score
+                if best_key is not None and best_score >= self.similarity_threshold:
+                    conn.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, best_key))
+                    conn.commit()
+                    self.near_hits += 1
+                    return best_value
+
+            self.misses += 1
+            return None
+
+    def _store(self, key: str, namespace: str, query: Optional[str], value: str) -> None:
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?, ?, ?, ?)",
+                (key, namespace, query, value, now + self.ttl, now)
+            )
+            conn.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (now,))
+            conn.execute(
+                """
+                DELETE FROM llm_cache WHERE key IN (
+                    SELECT key FROM llm_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.max_entries,)
+            )
+            conn.commit()
+
+    async def get(
+        self,
+        output_cls: Type[BaseModel],
+        prompt: BasePromptTemplate,
+        prompt_args: Dict[str, Any]
+    ) -> Optional[BaseModel]:
+        """Return a cached output for this call, or None on a miss"""
+        key, namespace, query = self._keys(output_cls, prompt, prompt_args)
+        value = await asyncio.to_thread(self._lookup, key, namespace, query)
+        if value is None:
+            return None
+        return output_cls.model_validate_json(value)
+
+    async def set(
+        self,
+        output_cls: Type[BaseModel],
+        prompt: BasePromptTemplate,
+        prompt_args: Dict[str, Any],
+        output: BaseModel
+    ) -> None:
+        """Store the output of this call"""
+        key, namespace, query = self._keys(output_cls, prompt, prompt_args)
+        await asyncio.to_thread(self._store, key, namespace, query, output.model_dump_json())
+
+    def _select_namespace(self, namespace: str) -> List[Tuple[str, str]]:
+        with self._lock:
+            return self._connect().execute(
+                "SELECT query, value FROM llm_cache WHERE namespace = ? AND query IS NOT NULL",
+                (namespace,)
+            ).fetchall()
+
+    async def logged_outputs(
+        self,
+        output_cls: Type[BaseModel],
+        prompt: BasePromptTemplate,
+        prompt_args: Optional[Dict[str, Any]] = None
+    ) -> List[Tuple[str, BaseModel]]:
+        """
+        Normalized queries and the outputs stored for them under one prompt.
+
+        Args:
+            output_cls: The output model the entries were stored with
+            prompt: The prompt template the entries were rendered with
+            prompt_args: Prompt variables other than the query, if the template has any
+        """
+        args = dict(prompt_args or {})
+        args[self.query_field] = ""
+        _, namespace, _ = self._keys(output_cls, prompt, args)
+        rows = await asyncio.to_thread(self._select_namespace, namespace)
+        return [(query, output_cls.model_validate_json(value)) for query, value in rows]
+
+    def stats(self) -> Dict[str, int]:
+        """Exact hit, near-duplicate hit and miss counters"""
+        return {
+            "hits": self.hits,
+            "near_hits": self.near_hits,
+            "misses": self.misses
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+# Global structured output cache instance
+llm_output_cache = StructuredOutputCache()
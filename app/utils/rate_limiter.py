@@ -0,0 +1,258 @@
+import time
+import heapq
+import asyncio
+import itertools
+from enum import IntEnum
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from email.utils import parsedate_to_datetime
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Mapping, Optional
+from app.config.constants import (
+    UPSTREAM_LIMITS,
+    UPSTREAM_DEFAULT_LIMIT,
+    UPSTREAM_BACKOFF_BASE,
+    UPSTREAM_BACKOFF_MAX,
+    UPSTREAM_MIN_RATE_FRACTION,
+    UPSTREAM_RATE_RECOVERY
+)
+
+class Priority(IntEnum):
+    """Admission priority of an upstream call; lower values are admitted first"""
+    INTERACTIVE = 0  # A user is waiting on the turn
+    PREFETCH = 1  # Speculative work that may be needed by a turn
+    BACKGROUND = 2  # Work no request waits on, e.g. conversation summarization
+
+_current_priority: ContextVar[Priority] = ContextVar("upstream_priority", default=Priority.INTERACTIVE)
+
+@contextmanager
+def priority_scope(priority: Priority) -> Iterator[None]:
+    """Run upstream calls made in this block (and tasks it starts) at the given priority"""
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+def retry_after_seconds(headers: Optional[Mapping[str, str]]) -> Optional[float]:
+    """Parse a Retry-After header given in seconds or as an HTTP date"""
+    value = (headers or {}).get("retry-after") or (headers or {}).get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+class TokenBucket:
+    """Token bucket refilled at `rate` tokens per second up to `burst`"""
+
+    def __init__(self, rate: float, burst: float, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self._clock = clock
+        self._updated = clock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        if now > self._updated:
+            self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+    def delay(self) -> float:
+        """Seconds until a token is available, 0 if one is available now"""
+        self._refill()
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self) -> None:
+        self._refill()
+        self.tokens -= 1
+
+    def drain(self, until: float) -> None:
+        """Empty the bucket and accrue nothing before `until`, so calls resume at `rate` rather than in a burst"""
+        self._refill()
+        self.tokens = min(self.tokens, 0.0)
+        self._updated = max(self._updated, until)
+
+class UpstreamLimiter:
+    """
+    Admission control for one upstream: a token bucket, a concurrency limit and a
+    priority queue, with adaptive backoff on throttling.
+
+    `record_throttle` (a 429, honouring Retry-After) pauses admissions and halves the
+    rate, down to `min_rate_fraction` of the configured rate; each `record_success`
+    recovers `recovery` of the configured rate.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        rate: float,
+        burst: float,
+        max_concurrency: int,
+        backoff_base: float = UPSTREAM_BACKOFF_BASE,
+        backoff_max: float = UPSTREAM_BACKOFF_MAX,
+        min_rate_fraction: float = UPSTREAM_MIN_RATE_FRACTION,
+        recovery: float = UPSTREAM_RATE_RECOVERY,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.name = name
+        self.rate = rate
+        self.max_concurrency = max_concurrency
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.min_rate_fraction = min_rate_fraction
+        self.recovery = recovery
+        self.bucket = TokenBucket(rate, burst, clock)
+        self._clock = clock
+        # Heap of [priority, sequence, wake-up future]; the head is the next to be admitted
+        self._queue: List[List[Any]] = []
+        self._sequence = itertools.count()
+        self._blocked_until = 0.0
+        self._backoff = 0.0
+        self.in_flight = 0
+        self.admitted = {priority.name.lower(): 0 for priority in Priority}
+        self.throttled = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    @asynccontextmanager
+    async def acquire(self, priority: Optional[Priority] = None) -> AsyncIterator[None]:
+        """
+        Hold an admission slot for one upstream call.
+
+        Args:
+            priority: Admission priority, defaults to the one set by `priority_scope`
+        """
+        await self._admit(priority if priority is not None else _current_priority.get())
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._wake_head()
+
+    def _admission_delay(self, entry: List[Any]) -> Optional[float]:
+        """Seconds the entry must wait before admission, or None to wait for a wake-up"""
+        if self._queue[0] is not entry or self.in_flight >= self.max_concurrency:
+            return None
+        now = self._clock()
+        if now < self._blocked_until:
+            return self._blocked_until - now
+        return self.bucket.delay()
+
+    async def _admit(self, priority: Priority) -> None:
+        loop = asyncio.get_running_loop()
+        entry = [int(priority), next(self._sequence), None]
+        heapq.heappush(self._queue, entry)
+        started = self._clock()
+        try:
+            while True:
+                delay = self._admission_delay(entry)
+                if delay == 0:
+                    break
+                entry[2] = loop.create_future()
+                try:
+                    await asyncio.wait_for(entry[2], timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                finally:
+                    entry[2] = None
+        except BaseException:
+            self._queue.remove(entry)
+            heapq.heapify(self._queue)
+            self._wake_head()
+            raise
+
+        heapq.heappop(self._queue)
+        self.bucket.take()
+        self.in_flight += 1
+        waited = self._clock() - started
+        self.admitted[Priority(priority).name.lower()] += 1
+        self.wait_total += waited
+        self.wait_max = max(self.wait_max, waited)
+        # The next waiter may be admissible right away
+        self._wake_head()
+
+    def _wake_head(self) -> None:
+        if self._queue:
+            waiter = self._queue[0][2]
+            if waiter is not None and not waiter.done():
+                waiter.set_result(None)
+
+    def record_throttle(self, retry_after: Optional[float] = None) -> None:
+        """
+        The upstream throttled a call: pause admissions and lower the rate.
+
+        Args:
+            retry_after: Seconds from the Retry-After header; exponential backoff when absent
+        """
+        self.throttled += 1
+        now = self._clock()
+        if now < self._blocked_until:
+            # Calls admitted before the pause report the same throttling; back off once per pause
+            if retry_after is not None:
+                self._blocked_until = max(self._blocked_until, now + retry_after)
+            return
+        self._backoff = min(self.backoff_max, self._backoff * 2 if self._backoff else self.backoff_base)
+        pause = retry_after if retry_after is not None else self._backoff
+        self._blocked_until = now + pause
+        self.bucket.rate = max(self.rate * self.min_rate_fraction, self.bucket.rate / 2)
+        self.bucket.drain(self._blocked_until)
+
+    def record_success(self) -> None:
+        """The upstream accepted a call: reset the backoff and recover some of the rate"""
+        self._backoff = 0.0
+        if self.bucket.rate < self.rate:
+            self.bucket.rate = min(self.rate, self.bucket.rate + self.rate * self.recovery)
+
+    def stats(self) -> Dict[str, Any]:
+        """Admissions per priority, throttles, queueing and current rate"""
+        admitted = sum(self.admitted.values())
+        return {
+            "rate": round(self.bucket.rate, 3),
+            "configured_rate": self.rate,
+            "in_flight": self.in_flight,
+            "queued": len(self._queue),
+            "admitted": dict(self.admitted),
+            "throttled": self.throttled,
+            "mean_wait": self.wait_total / admitted if admitted else 0.0,
+            "max_wait": self.wait_max
+        }
+
+class UpstreamLimiters:
+    """Registry of limiters per upstream, configured from UPSTREAM_LIMITS"""
+
+    def __init__(
+        self,
+        limits: Optional[Dict[str, Dict[str, float]]] = None,
+        default: Optional[Dict[str, float]] = None
+    ):
+        self.limits = limits if limits is not None else UPSTREAM_LIMITS
+        self.default = default if default is not None else UPSTREAM_DEFAULT_LIMIT
+        self._limiters: Dict[str, UpstreamLimiter] = {}
+
+    def get(self, name: str) -> UpstreamLimiter:
+        """Limiter for an upstream, e.g. "openai:gpt-4o-mini" or "hotel:hotel/vacancies" """
+        limiter = self._limiters.get(name)
+        if limiter is None:
+            config = self.limits.get(name, self.default)
+            limiter = UpstreamLimiter(
+                name,
+                rate=config["rate"],
+                burst=config["burst"],
+                max_concurrency=int(config["max_concurrency"])
+            )
+            self._limiters[name] = limiter
+        return limiter
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: limiter.stats() for name, limiter in self._limiters.items()}
+
+# Global upstream limiter registry
+upstream_limiters = UpstreamLimiters()
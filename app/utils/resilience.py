@@ -0,0 +1,269 @@
+import time
+import random
+import asyncio
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, TypeVar
+import httpx
+from app.config.constants import (
+    HOTEL_RETRY_ATTEMPTS,
+    HOTEL_RETRY_BASE_DELAY,
+    HOTEL_RETRY_MAX_DELAY,
+    HOTEL_ATTEMPT_TIMEOUT,
+    HOTEL_HEDGE_QUANTILE,
+    HOTEL_HEDGE_MIN_SAMPLES,
+    HOTEL_HEDGE_MIN_DELAY,
+    HOTEL_HEDGE_MAX_DELAY,
+    HOTEL_LATENCY_WINDOW,
+    HOTEL_BREAKER_FAILURES,
+    HOTEL_BREAKER_RESET
+)
+
+T = TypeVar("T")
+
+class UpstreamStatusError(ValueError):
+    """Non-200 response from an upstream API"""
+
+    def __init__(self, message: str, status_code: int):
+        super().__init__(message)
+        self.status_code = status_code
+
+class CircuitOpenError(Exception):
+    """The endpoint's circuit breaker is open, so the call was not attempted"""
+
+def is_retryable(error: BaseException) -> bool:
+    """Timeouts, transport errors, throttling and server errors are worth retrying; other 4xx are not"""
+    if isinstance(error, UpstreamStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return isinstance(error, (httpx.TransportError, asyncio.TimeoutError))
+
+def decorrelated_jitter(previous: float, base: float, cap: float) -> float:
+    """Next retry delay: uniform between `base` and three times the previous delay, capped"""
+    return min(cap, random.uniform(base, max(base, previous * 3)))
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    Opens after `failure_threshold` consecutive failed calls and fails fast for
+    `reset_timeout` seconds, then lets a single probe through (half-open); the probe's
+    outcome closes or reopens the circuit.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = HOTEL_BREAKER_FAILURES,
+        reset_timeout: float = HOTEL_BREAKER_RESET,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if self._clock() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        """Whether a call may go upstream now"""
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def release(self) -> None:
+        """Free the half-open probe slot without an outcome, e.g. when the probe was cancelled"""
+        self._probing = False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self._probing or self.failures >= self.failure_threshold:
+            self.opened_at = self._clock()
+        self._probing = False
+
+class LatencyTracker:
+    """Sliding window of recent successful call latencies"""
+
+    def __init__(self, window: int = HOTEL_LATENCY_WINDOW):
+        self._samples: Deque[float] = deque(maxlen=window)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+class ResilienceLayer:
+    """
+    Retries, hedging and circuit breaking for idempotent upstream GETs, per endpoint.
+
+    Each attempt is bounded by `attempt_timeout`. Once an endpoint has
+    `hedge_min_samples` latencies, a duplicate request is sent if the first has not
+    answered within its `hedge_quantile` latency (clamped to the hedge delay bounds),
+    and the first response wins. Retryable failures are retried with decorrelated
+    jitter; calls that still fail count towards the endpoint's circuit breaker.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = HOTEL_RETRY_ATTEMPTS,
+        base_delay: float = HOTEL_RETRY_BASE_DELAY,
+        max_delay: float = HOTEL_RETRY_MAX_DELAY,
+        attempt_timeout: Optional[float] = HOTEL_ATTEMPT_TIMEOUT,
+        hedge_quantile: Optional[float] = HOTEL_HEDGE_QUANTILE,
+        hedge_min_samples: int = HOTEL_HEDGE_MIN_SAMPLES,
+        hedge_min_delay: float = HOTEL_HEDGE_MIN_DELAY,
+        hedge_max_delay: float = HOTEL_HEDGE_MAX_DELAY,
+        breaker_failures: int = HOTEL_BREAKER_FAILURES,
+        breaker_reset: float = HOTEL_BREAKER_RESET
+    ):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.attempt_timeout = attempt_timeout
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_max_delay = hedge_max_delay
+        self.breaker_failures = breaker_failures
+        self.breaker_reset = breaker_reset
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._latencies: Dict[str, LatencyTracker] = {}
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.rejected = 0
+
+    def breaker(self, endpoint: str) -> CircuitBreaker:
+        if endpoint not in self._breakers:
+            self._breakers[endpoint] = CircuitBreaker(self.breaker_failures, self.breaker_reset)
+        return self._breakers[endpoint]
+
+    def latencies(self, endpoint: str) -> LatencyTracker:
+        if endpoint not in self._latencies:
+            self._latencies[endpoint] = LatencyTracker()
+        return self._latencies[endpoint]
+
+    def hedge_delay(self, endpoint: str) -> Optional[float]:
+        """Seconds to wait before hedging, or None while there are too few samples"""
+        tracker = self.latencies(endpoint)
+        if self.hedge_quantile is None or len(tracker) < self.hedge_min_samples:
+            return None
+        return min(self.hedge_max_delay, max(self.hedge_min_delay, tracker.quantile(self.hedge_quantile)))
+
+    async def call(self, endpoint: str, fetch: Callable[[], Awaitable[T]]) -> T:
+        """
+        Call an endpoint through the breaker, with hedging and retries.
+
+        Args:
+            endpoint: Endpoint name, keying the breaker and latency statistics
+            fetch: Coroutine factory performing one idempotent request
+
+        Raises:
+            CircuitOpenError: The endpoint's breaker is open
+        """
+        breaker = self.breaker(endpoint)
+        probe = breaker.state == "half_open"
+        if not breaker.allow():
+            self.rejected += 1
+            raise CircuitOpenError(f"Circuit open for {endpoint}")
+
+        try:
+            delay = self.base_delay
+            for attempt in range(1, self.max_attempts + 1):
+                try:
+                    if self.attempt_timeout is None:
+                        result = await self._hedged(endpoint, fetch)
+                    else:
+                        result = await asyncio.wait_for(self._hedged(endpoint, fetch), self.attempt_timeout)
+                except Exception as e:
+                    if not is_retryable(e):
+                        # The request itself is bad; the endpoint is not unhealthy
+                        breaker.record_success()
+                        raise
+                    if attempt == self.max_attempts:
+                        breaker.record_failure()
+                        raise
+                    delay = decorrelated_jitter(delay, self.base_delay, self.max_delay)
+                    self.retries += 1
+                    await asyncio.sleep(delay)
+                    continue
+                breaker.record_success()
+                return result
+        except asyncio.CancelledError:
+            # A cancelled probe says nothing about the endpoint; let the next call probe instead
+            if probe:
+                breaker.release()
+            raise
+
+    async def _timed(self, endpoint: str, fetch: Callable[[], Awaitable[T]]) -> T:
+        started = time.monotonic()
+        result = await fetch()
+        self.latencies(endpoint).record(time.monotonic() - started)
+        return result
+
+    async def _hedged(self, endpoint: str, fetch: Callable[[], Awaitable[T]]) -> T:
+        """One attempt; sends a duplicate request if the first is slower than the hedge delay"""
+        hedge_delay = self.hedge_delay(endpoint)
+        if hedge_delay is None:
+            return await self._timed(endpoint, fetch)
+
+        primary = asyncio.create_task(self._timed(endpoint, fetch))
+        tasks = [primary]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=hedge_delay)
+            if not done:
+                self.hedges += 1
+                tasks.append(asyncio.create_task(self._timed(endpoint, fetch)))
+            # First success wins; a failure only counts once every request has failed
+            pending = set(tasks)
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self.hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """Retry, hedge and breaker counters, and per-endpoint breaker state and hedge delay"""
+        return {
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "rejected": self.rejected,
+            "endpoints": {
+                endpoint: {"breaker": breaker.state, "hedge_delay": self.hedge_delay(endpoint)}
+                for endpoint, breaker in self._breakers.items()
+            }
+        }
+
+# Global resilience policy for hotel API calls
+hotel_api_resilience = ResilienceLayer()
@@ -0,0 +1,257 @@
+import json
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from app.utils.single_flight import SingleFlight
+from app.config.constants import (
+    HOTEL_CACHE_TTLS,
+    HOTEL_CACHE_MAX_ENTRIES,
+    HOTEL_CACHE_MAX_BYTES,
+    HOTEL_CACHE_STALE_TTL
+)
+
+class CacheBackend(ABC):
+    """Storage for cached API responses. Values must be JSON-serializable."""
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[Any]:
+        """Return the cached value, or None if missing or expired"""
+        pass
+
+    @abstractmethod
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        """Store a value for `ttl` seconds"""
+        pass
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        """Remove a value if present"""
+        pass
+
+    async def get_stale(self, key: str) -> Optional[Any]:
+        """Return the value even if expired, while it is still retained; None if not supported"""
+        return None
+
+    @property
+    def evictions(self) -> int:
+        """Number of entries evicted to stay under the memory cap"""
+        return 0
+
+class InMemoryCacheBackend(CacheBackend):
+    """
+    In-process LRU cache with per-entry TTL, bounded by entry count and approximate bytes.
+
+    Expired entries are retained for `stale_ttl` more seconds for `get_stale`.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = HOTEL_CACHE_MAX_ENTRIES,
+        max_bytes: int = HOTEL_CACHE_MAX_BYTES,
+        stale_ttl: float = HOTEL_CACHE_STALE_TTL,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.stale_ttl = stale_ttl
+        self._clock = clock
+        # key -> (expires_at, size, value), least recently used first
+        self._entries: "OrderedDict[str, Tuple[float, int, Any]]" = OrderedDict()
+        self._bytes = 0
+        self._evictions = 0
+
+    @property
+    def evictions(self) -> int:
+        return self._evictions
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, _, value = entry
+        now = self._clock()
+        if expires_at <= now:
+            if expires_at + self.stale_ttl <= now:
+                self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def get_stale(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, _, value = entry
+        if expires_at + self.stale_ttl <= self._clock():
+            self._remove(key)
+            return None
+        return value
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        size = len(json.dumps(value, ensure_ascii=False, default=str).encode("utf-8"))
+        if size > self.max_bytes:
+            return  # Larger than the whole cache; don't flush everything for it
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (self._clock() + ttl, size, value)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key)
+            self._evictions += 1
+
+    async def delete(self, key: str) -> None:
+        if key in self._entries:
+            self._remove(key)
+
+    def _remove(self, key: str) -> None:
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Backend for any Redis-compatible async client (e.g. `redis.asyncio.Redis`).
+
+    The client only needs `get(key)`, `set(key, value, ex=seconds)` and `delete(key)`.
+    Eviction is left to the server's maxmemory policy. Values are stored with their
+    expiry time and kept by Redis for `stale_ttl` more seconds for `get_stale`.
+    """
+
+    def __init__(self, client: Any, prefix: str = "hotel_api:", stale_ttl: float = HOTEL_CACHE_STALE_TTL):
+        self.client = client
+        self.prefix = prefix
+        self.stale_ttl = stale_ttl
+
+    async def _load(self, key: str) -> Optional[Dict[str, Any]]:
+        raw = await self.client.get(self.prefix + key)
+        if raw is None:
+            return None
+        return json.loads(raw)
+
+    async def get(self, key: str) -> Optional[Any]:
+        entry = await self._load(key)
+        if entry is None or entry["expires_at"] <= time.time():
+            return None
+        return entry["value"]
+
+    async def get_stale(self, key: str) -> Optional[Any]:
+        entry = await self._load(key)
+        return None if entry is None else entry["value"]
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        await self.client.set(
+            self.prefix + key,
+            json.dumps({"expires_at": time.time() + ttl, "value": value}, ensure_ascii=False, default=str),
+            ex=max(1, int(ttl + self.stale_ttl))
+        )
+
+    async def delete(self, key: str) -> None:
+        await self.client.delete(self.prefix + key)
+
+class ResponseCache:
+    """
+    Caches API responses keyed on endpoint plus normalized params.
+
+    Only endpoints listed in `ttls` are cached. Concurrent misses for the same
+    key share a single upstream call.
+    """
+
+    def __init__(
+        self,
+        backend: Optional[CacheBackend] = None,
+        ttls: Optional[Dict[str, float]] = None
+    ):
+        self.backend = backend if backend is not None else InMemoryCacheBackend()
+        self.ttls = dict(HOTEL_CACHE_TTLS if ttls is None else ttls)
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.stale_hits = 0
+        self._single_flight = SingleFlight()
+
+    @staticmethod
+    def make_key(endpoint: str, params: Optional[dict] = None) -> str:
+        """Build a cache key that ignores param order and list order"""
+        normalized = {}
+        for name, value in (params or {}).items():
+            if value is None:
+                continue
+            if isinstance(value, (list, tuple, set)):
+                value = sorted(str(item) for item in value)
+            else:
+                value = str(value).strip()
+            normalized[name] = value
+        return f"{endpoint}?{json.dumps(normalized, sort_keys=True, ensure_ascii=False)}"
+
+    async def get_or_fetch(
+        self,
+        endpoint: str,
+        params: Optional[dict],
+        fetch: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """
+        Return the cached response for this request, calling `fetch` on a miss.
+
+        Args:
+            endpoint (str): API endpoint path, used to look up the TTL
+            params (dict): Query parameters
+            fetch (Callable): Coroutine factory that performs the upstream call
+        """
+        ttl = self.ttls.get(endpoint)
+        if not ttl:
+            return await fetch()
+
+        key = self.make_key(endpoint, params)
+        cached = await self.backend.get(key)
+        if cached is not None:
+            self.hits += 1
+            return cached
+
+        self.misses += 1
+
+        async def fetch_and_store() -> Any:
+            value = await fetch()
+            await self.backend.set(key, value, ttl)
+            return value
+
+        value, shared = await self._single_flight.do(key, fetch_and_store)
+        if shared:
+            self.coalesced += 1
+        return value
+
+    async def get_stale(self, endpoint: str, params: Optional[dict]) -> Optional[Any]:
+        """
+        Return the last cached response for this request even if expired, e.g. while the
+        upstream is unavailable; None if there is none.
+
+        Args:
+            endpoint (str): API endpoint path
+            params (dict): Query parameters
+        """
+        if not self.ttls.get(endpoint):
+            return None
+        value = await self.backend.get_stale(self.make_key(endpoint, params))
+        if value is not None:
+            self.stale_hits += 1
+        return value
+
+    def stats(self) -> Dict[str, int]:
+        """Hit, miss, coalesced, stale and eviction counters"""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "stale_hits": self.stale_hits,
+            "evictions": self.backend.evictions
+        }
+
+# Global hotel API response cache instance
+hotel_response_cache = ResponseCache()
@@ -0,0 +1,50 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+class SingleFlight:
+    """
+    Deduplicates concurrent async calls: callers using the same key while a call
+    is in flight share its result instead of starting their own.
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[str, asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        return len(self._in_flight)
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        Run `fn` unless a call with the same key is already in flight.
+
+        Args:
+            key (str): Identity of the call
+            fn (Callable): Coroutine factory performing the call
+
+        Returns:
+            Tuple of the result and whether it was shared from another caller
+        """
+        while (in_flight := self._in_flight.get(key)) is not None:
+            try:
+                return await asyncio.shield(in_flight), True
+            except asyncio.CancelledError:
+                if not in_flight.cancelled():
+                    raise  # This caller was cancelled, not the shared call
+                # The leading call was cancelled; take over
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            value = await fn()
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                future.exception()  # Mark retrieved when nobody else is waiting
+            raise
+        else:
+            future.set_result(value)
+            return value, False
+        finally:
+            self._in_flight.pop(key, None)
@@ -0,0 +1,219 @@
+import math
+import asyncio
+import numpy as np
+from datetime import datetime
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Union
+from typing_extensions import NotRequired, TypedDict
+from pydantic import TypeAdapter, ValidationError
+from app.config.constants import HOTEL_DEFAULT_ROOM_CAPACITY
+from app.utils.hotel_ranking import VacancyTable
+from app.workflow.models import HotelRecommendation
+
+# Only the fields ranking needs are validated up front; everything else in the
+# payload (intros, notices, facilities) is ignored until a hotel is selected.
+
+class VacancyPrice(TypedDict):
+    price: float
+
+class VacancyRoom(TypedDict):
+    price: NotRequired[Optional[float]]
+    adults: NotRequired[Optional[int]]
+    prices: NotRequired[Optional[List[VacancyPrice]]]  # Price per night of the stay
+
+class VacancyRecord(TypedDict):
+    id: Union[int, str]
+    name: str
+    latitude: NotRequired[Optional[float]]
+    longitude: NotRequired[Optional[float]]
+    available_rooms: NotRequired[Optional[List[VacancyRoom]]]
+    suitable_room_types: NotRequired[Optional[List[VacancyRoom]]]
+
+VACANCIES_ADAPTER = TypeAdapter(List[VacancyRecord])
+HOTEL_RECOMMENDATION_ADAPTER = TypeAdapter(HotelRecommendation)
+
+class VacancyError(NamedTuple):
+    """A vacancy record that could not be used"""
+    index: int  # Position in the payload, -1 when the payload itself is malformed
+    hotel_id: Optional[Any]
+    message: str
+
+def vacancy_rooms(record: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Rooms of a vacancy record, under either of the endpoint's field names"""
+    return record.get("available_rooms") or record.get("suitable_room_types") or []
+
+def room_price(room: Dict[str, Any]) -> Optional[float]:
+    """Mean nightly price of a room for the stay, falling back to its list price"""
+    prices = room.get("prices")
+    if prices:
+        return sum(float(night["price"]) for night in prices) / len(prices)
+    price = room.get("price")
+    return float(price) if price is not None else None
+
+def attribute_names(values: Any) -> List[str]:
+    """Facility or bed type names, given as strings or {"name": ...} objects"""
+    if isinstance(values, str):
+        return [values]
+    return [value["name"] if isinstance(value, dict) else str(value) for value in values or []]
+
+def table_from_records(records: Sequence[Dict[str, Any]]) -> VacancyTable:
+    """Columns for ranking: coordinates, lowest nightly room price and largest room capacity"""
+    nan = math.nan
+    latitudes, longitudes, prices, capacities = [], [], [], []
+    for record in records:
+        latitude, longitude = record.get("latitude"), record.get("longitude")
+        latitudes.append(nan if latitude is None else latitude)
+        longitudes.append(nan if longitude is None else longitude)
+        lowest, capacity = nan, 0
+        for room in vacancy_rooms(record):
+            price = room_price(room)
+            if price is not None and (math.isnan(lowest) or price < lowest):
+                lowest = price
+            capacity = max(capacity, room.get("adults") or 0)
+        prices.append(lowest)
+        capacities.append(capacity or HOTEL_DEFAULT_ROOM_CAPACITY)
+    return VacancyTable(
+        np.array(latitudes, dtype=np.float64),
+        np.array(longitudes, dtype=np.float64),
+        np.array(prices, dtype=np.float64),
+        np.array(capacities, dtype=np.float64)
+    )
+
+def build_recommendation(record: Dict[str, Any]) -> HotelRecommendation:
+    """
+    Build the recommendation model for one vacancy record.
+
+    Raises:
+        ValidationError, AttributeError, KeyError, TypeError, ValueError: The record is malformed
+    """
+    data = {
+        "hotel_id": str(record["id"]),
+        "name": record["name"],
+        "location": {
+            "county": (record.get("county") or {}).get("name", ""),
+            "district": (record.get("district") or {}).get("name", ""),
+            "latitude": record.get("latitude"),
+            "longitude": record.get("longitude")
+        },
+        "rooms": [
+            {
+                "room_name": room.get("name", ""),
+                "bed_types": attribute_names(room.get("bed_types") or room.get("bed_type")),
+                "facilities": attribute_names(room.get("facilities")),
+                "price": room_price(room) or 0.0
+            }
+            for room in vacancy_rooms(record)
+        ]
+    }
+    return HOTEL_RECOMMENDATION_ADAPTER.validate_python(data)
+
+class VacancyBatch:
+    """
+    A validated vacancy payload: the usable records, their ranking columns and the
+    errors of the records that were dropped. Recommendations are only built for
+    the records asked for, typically the top ranked ones.
+    """
+
+    def __init__(self, records: List[Dict[str, Any]], validated: List[VacancyRecord], errors: List[VacancyError]):
+        """
+        Args:
+            records: Usable records as received, to build recommendations from
+            validated: The same records with the ranking fields validated and coerced
+            errors: Records that were dropped
+        """
+        self.records = records
+        self.errors = errors
+        self.table = table_from_records(validated)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def recommendations(self, indices: Sequence[int]) -> List[HotelRecommendation]:
+        """
+        Build recommendations for the given records; records that fail are added to `errors`.
+
+        Args:
+            indices: Positions in `records`, e.g. from HotelRanker.select
+        """
+        recommendations = []
+        for index in indices:
+            record = self.records[index]
+            try:
+                recommendations.append(build_recommendation(record))
+            except (ValidationError, AttributeError, KeyError, TypeError, ValueError) as e:
+                self.errors.append(VacancyError(index, record.get("id"), str(e)))
+        return recommendations
+
+def parse_vacancies(payload: Any) -> VacancyBatch:
+    """
+    Validate a /hotel/vacancies payload in bulk.
+
+    The whole list is validated in one pass; if some records are invalid, their
+    errors are collected from that pass and the remaining records are validated
+    once more, so the cost does not depend on how many records fail.
+
+    Args:
+        payload: Decoded response of the vacancies endpoint
+    """
+    if not isinstance(payload, list):
+        return VacancyBatch([], [], [VacancyError(-1, None, f"Expected a list of vacancies, got {type(payload).__name__}")])
+    try:
+        validated = VACANCIES_ADAPTER.validate_python(payload)
+    except ValidationError as e:
+        messages: Dict[int, List[str]] = {}
+        for error in e.errors(include_url=False):
+            index, *field = error["loc"]
+            messages.setdefault(index, []).append(f"{'.'.join(map(str, field))}: {error['msg']}")
+    else:
+        return VacancyBatch(payload, validated, [])
+
+    errors = [
+        VacancyError(index, payload[index].get("id") if isinstance(payload[index], dict) else None, "; ".join(found))
+        for index, found in sorted(messages.items())
+    ]
+    records = [record for index, record in enumerate(payload) if index not in messages]
+    return VacancyBatch(records, VACANCIES_ADAPTER.validate_python(records), errors)
+
+class VacancyPrefetch:
+    """
+    Vacancy queries started ahead of the plan, one task per county for a single stay window.
+
+    Tasks are handed over with `take` to the step that needs them; whatever is left is
+    cancelled by `cancel`. `stats` counts started, used and wasted county queries.
+    """
+
+    def __init__(
+        self,
+        check_in_date: datetime,
+        check_out_date: datetime,
+        tasks: Dict[int, asyncio.Task],
+        stats: Dict[str, int]
+    ):
+        self.check_in_date = check_in_date
+        self.check_out_date = check_out_date
+        self.tasks = tasks
+        self.stats = stats
+        stats["started"] += len(tasks)
+
+    def take(
+        self,
+        county_id: int,
+        check_in_date: datetime,
+        check_out_date: datetime
+    ) -> Optional[asyncio.Task]:
+        """The prefetch for a county's stay, if one was started for the same window and is still usable"""
+        if (check_in_date, check_out_date) != (self.check_in_date, self.check_out_date):
+            return None
+        task = self.tasks.pop(county_id, None)
+        if task is None or task.cancelled():
+            return None
+        self.stats["used"] += 1
+        return task
+
+    def cancel(self) -> None:
+        """Cancel the prefetches nobody took"""
+        for task in self.tasks.values():
+            if task.done() and not task.cancelled():
+                task.exception()  # Retrieved so a failed prefetch isn't reported as unhandled
+            task.cancel()
+        self.stats["wasted"] += len(self.tasks)
+        self.tasks.clear()
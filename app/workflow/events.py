@@ -1,7 +1,8 @@
 from typing import Optional, List
 from pydantic import BaseModel, Field
-from llama_index.core.workflow import Event
+from llama_index.core.workflow import Event, StopEvent
 from app.artifacts import ContextArtifact, ItineraryArtifact
+from app.workflow.models import DayPlan, HotelRecommendation
 
 class IntentionEvent(Event):
     """Event containing detected user intention."""
@@ -27,5 +28,17 @@ class EvaluationEvent(Event):
     content: ItineraryArtifact
     status: str
 
-class StopEvent(Event):
-    result: dict
\ No newline at end of file
+# Events written to the workflow's event stream for streaming clients
+class StepProgressEvent(Event):
+    """Streamed when a workflow step starts or completes."""
+    step: str = Field(..., description="Name of the workflow step")
+    status: str = Field(..., description="Either 'started' or 'completed'")
+
+class DayPlanEvent(Event):
+    """Streamed as soon as one day of the itinerary has been generated."""
+    day_plan: DayPlan
+
+class HotelBatchEvent(Event):
+    """Streamed when the hotel recommendations for one county are ready."""
+    county_id: int
+    recommendations: List[HotelRecommendation]
@@ -0,0 +1,26 @@
+from typing import Any, Optional
+from app.workflow.travel_itinerary import TravelItineraryWorkflow
+
+class WorkflowFactory:
+    """Builds the TravelItineraryWorkflow and its agents once per process"""
+
+    def __init__(self):
+        self._workflow: Optional[TravelItineraryWorkflow] = None
+
+    def build(self, **kwargs: Any) -> TravelItineraryWorkflow:
+        """(Re)build the shared workflow; keyword arguments go to TravelItineraryWorkflow"""
+        self._workflow = TravelItineraryWorkflow(**kwargs)
+        return self._workflow
+
+    def get(self) -> TravelItineraryWorkflow:
+        """Return the shared workflow, building it with defaults on first use"""
+        if self._workflow is None:
+            self.build()
+        return self._workflow
+
+    def reset(self) -> None:
+        """Drop the shared workflow so the next get() rebuilds it"""
+        self._workflow = None
+
+# Global workflow factory instance
+workflow_factory = WorkflowFactory()
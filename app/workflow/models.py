@@ -41,6 +41,14 @@ class DayPlan(BaseModel):
     def transits(self) -> List[Dict[str, str]]:
         """Get all transit events for the day"""
         return [item for item in self.schedule if item.get("type") == "transit"]
+
+class DaySkeleton(BaseModel):
+    day: int
+    location: Location  # Main location for the day
+    theme: Optional[str] = None  # Short focus of the day, e.g. "night markets and street food"
+
+class TripSkeleton(BaseModel):
+    days: List[DaySkeleton]  # Outline used to generate each day's schedule in parallel
     
 # class DayPlan(BaseModel):
 #     day: int
@@ -100,5 +108,12 @@ class HotelRecommendation(BaseModel):
     location: Location
     rooms: List[HotelRoom]
 
+class HotelNight(BaseModel):
+    day: int  # Day of the itinerary the night follows
+    night_date: date
+    county_id: int
+    county: str
+    hotel_ids: List[str] = []  # Best first; details are in ItineraryArtifact.hotel_recommendations
+
 class TravelItinerary(BaseModel):
     daily_plans: List[DayPlan]
\ No newline at end of file
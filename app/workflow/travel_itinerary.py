@@ -1,6 +1,10 @@
-from typing import Any, Union, Optional, Dict
+from typing import Any, Union, Optional, Dict, Iterator
+from contextlib import contextmanager
+import asyncio
+import httpx
 from llama_index.llms.openai import OpenAI
 from llama_index.core.workflow import Workflow, Context, StartEvent, StopEvent, step
+from llama_index.core.workflow.handler import WorkflowHandler
 from app.workflow.models import (
     IntentType
 )
@@ -8,6 +12,7 @@ from app.agents import (
     IntentionDetectionAgent,
     ContextExtractionAgent,
     DailyPlannerAgent,
+    ConversationSummaryAgent,
     HotelRecommenderAgent,
     # ItineraryIntegratorAgent,
     # ItineraryEvaluatorAgent
@@ -16,18 +21,33 @@ from app.workflow.events import (
     IntentionEvent,
     ContextExtractionEvent,
     PlanGenerationEvent,
+    StepProgressEvent,
+    DayPlanEvent,
+    HotelBatchEvent,
     # HotelRecommendationEvent,
     # IntegrationEvent
 )
 from app.artifacts.context import ContextArtifact
 from app.artifacts.itinerary import ItineraryArtifact
+from app.utils.response_cache import ResponseCache
+from app.utils.llm import SingleFlightLLM
+from app.utils.llm_cache import StructuredOutputCache
+from app.utils.rate_limiter import UpstreamLimiters, upstream_limiters
+from app.utils.intent_classifier import RuleIntentClassifier, TfidfIntentModel
+from app.config.constants import LLM_CACHE_AGENTS, SPECULATIVE_CONTEXT_EXTRACTION, INTENT_FAST_PATH_THRESHOLD, HOTEL_PREFETCH
 
 class TravelItineraryWorkflow(Workflow):
     def __init__(
         self,
         *args: Any,
-        existing_context: Optional[Dict] = None,
-        existing_itinerary: Optional[Dict] = None,
+        http_client: Optional[httpx.AsyncClient] = None,
+        response_cache: Optional[ResponseCache] = None,
+        llm_cache: Optional[StructuredOutputCache] = None,
+        limiters: Optional[UpstreamLimiters] = None,
+        speculative_context: bool = SPECULATIVE_CONTEXT_EXTRACTION,
+        prefetch_hotels: bool = HOTEL_PREFETCH,
+        intent_threshold: Optional[float] = INTENT_FAST_PATH_THRESHOLD,
+        intent_model: Optional[TfidfIntentModel] = None,
         verbose: bool = False,
         timeout: float = 200.0,    
         **kwargs: Any
@@ -35,36 +55,212 @@ class TravelItineraryWorkflow(Workflow):
         """
         Initialize the TravelItineraryWorkflow.
 
+        The workflow holds no per-session state, so one instance can serve concurrent
+        sessions; existing context and itinerary are passed to each run instead.
+
         Args:
             *args: Additional arguments to pass to the Workflow constructor.
-            existing_context: Existing context for the workflow.
-            existing_itinerary: Existing itinerary for the workflow.
+            http_client: Shared HTTP client injected into the hotel agent.
+            response_cache: Shared hotel API response cache injected into the hotel agent.
+            llm_cache: Persistent structured output cache, used by agents listed in LLM_CACHE_AGENTS.
+            limiters: Upstream admission control for OpenAI and hotel API calls; defaults to the process-wide registry.
+            speculative_context: Run context extraction alongside intention detection on turns without a context, keeping it for new trips.
+            prefetch_hotels: Query vacancies for a new trip's destination while its plan is being generated.
+            intent_threshold: Confidence at which the local intention classifier skips the LLM; None disables it.
+            intent_model: Optional trained model consulted by the local intention classifier.
             verbose: Whether to print verbose output.
             timeout: Timeout in seconds for workflow execution. Default is 200 seconds.
             **kwargs: Additional keyword arguments to pass to the Workflow constructor.
         """
         super().__init__(*args, timeout=timeout, **kwargs)
         self.verbose = verbose
+        self.speculative_context = speculative_context
+        self.prefetch_hotels = prefetch_hotels
+        self.speculation_stats = {"started": 0, "used": 0, "wasted": 0}
         
+        limiters = limiters if limiters is not None else upstream_limiters
+
         # Initialize agents
-        self.intention_agent = IntentionDetectionAgent(llm=OpenAI(model="gpt-4o-mini", temperature=0.7), verbose=verbose)
-        self.context_agent = ContextExtractionAgent(llm=OpenAI(model="gpt-4o-mini", temperature=0.7), verbose=verbose)
-        self.planner_agent = DailyPlannerAgent(llm=OpenAI(model="gpt-4o-mini", temperature=0.7), verbose=verbose)
-        self.hotel_agent = HotelRecommenderAgent(llm=OpenAI(model="gpt-4o-mini", temperature=0.7), verbose=verbose)
+        # Identical concurrent LLM calls across requests share a single OpenAI request
+        def agent_llm(agent_name: str) -> SingleFlightLLM:
+            cache = llm_cache if agent_name in LLM_CACHE_AGENTS else None
+            return SingleFlightLLM(
+                OpenAI(model="gpt-4o-mini", temperature=0.7),
+                cache=cache,
+                limiter=limiters.get("openai:gpt-4o-mini")
+            )
+
+        self.intent_classifier = None
+        if intent_threshold is not None:
+            self.intent_classifier = RuleIntentClassifier(threshold=intent_threshold, model=intent_model)
+        self.intention_agent = IntentionDetectionAgent(
+            llm=agent_llm("intention_detection"),
+            verbose=verbose,
+            classifier=self.intent_classifier
+        )
+        self.context_agent = ContextExtractionAgent(llm=agent_llm("context_extraction"), verbose=verbose)
+        self.planner_agent = DailyPlannerAgent(llm=agent_llm("daily_planner"), verbose=verbose)
+        self.summary_agent = ConversationSummaryAgent(llm=agent_llm("conversation_summary"), verbose=verbose)
+        self.hotel_agent = HotelRecommenderAgent(
+            llm=OpenAI(model="gpt-4o-mini", temperature=0.7),
+            verbose=verbose,
+            http_client=http_client,
+            response_cache=response_cache,
+            limiters=limiters
+        )
         # self.integrator_agent = ItineraryIntegratorAgent(llm=OpenAI(model="gpt-4o-mini", temperature=0.7), verbose=verbose)
 
-        # Set existing artifacts if provided
-        self.existing_context = ContextArtifact(**existing_context) if existing_context else None
-        self.existing_itinerary = ItineraryArtifact(**existing_itinerary) if existing_itinerary else None
+    async def process_message(
+        self,
+        message: str,
+        existing_context: Optional[Union[ContextArtifact, Dict]] = None,
+        existing_itinerary: Optional[Union[ItineraryArtifact, Dict]] = None,
+        conversation: str = ""
+    ) -> Dict[str, Any]:
+        """
+        Run the workflow for a single conversation message.
+
+        Args:
+            message: The user's message.
+            existing_context: Session context from previous turns, if any; artifacts are used as they are.
+            existing_itinerary: Session itinerary from previous turns, if any; artifacts are used as they are.
+            conversation: Token-budgeted view of the earlier conversation, included in update prompts.
+        """
+        handler = self.run(
+            query=message,
+            existing_context=existing_context,
+            existing_itinerary=existing_itinerary,
+            conversation=conversation
+        )
+        try:
+            # Shielded so that cancelling the caller stops the run below instead of orphaning it
+            return await asyncio.shield(handler)
+        except asyncio.CancelledError:
+            await self.cancel(handler)
+            raise
+
+    def stream_message(
+        self,
+        message: str,
+        existing_context: Optional[Union[ContextArtifact, Dict]] = None,
+        existing_itinerary: Optional[Union[ItineraryArtifact, Dict]] = None,
+        conversation: str = ""
+    ) -> WorkflowHandler:
+        """
+        Run the workflow in streaming mode for a single conversation message.
+
+        Step progress, the detected intention, the extracted context, each generated day
+        and each county's hotels are available from `handler.stream_events()` as they
+        happen; awaiting the handler gives the result.
+
+        Args:
+            message: The user's message.
+            existing_context: Session context from previous turns, if any; artifacts are used as they are.
+            existing_itinerary: Session itinerary from previous turns, if any; artifacts are used as they are.
+            conversation: Token-budgeted view of the earlier conversation, included in update prompts.
+        """
+        return self.run(
+            query=message,
+            existing_context=existing_context,
+            existing_itinerary=existing_itinerary,
+            conversation=conversation,
+            stream=True
+        )
+
+    async def cancel(self, handler: WorkflowHandler) -> None:
+        """
+        Stop a run and wait until its steps have been cancelled.
+
+        Cancelling the steps cancels their in-flight LLM and hotel API calls, and the
+        speculative context extraction and hotel prefetch the run started but no step
+        has taken over yet, so nothing from the run keeps spending tokens or writes
+        results after this returns.
+
+        Args:
+            handler: The handler returned by `run` or `stream_message`.
+        """
+        await handler.cancel_run()
+        await asyncio.gather(handler, return_exceptions=True)
+        if handler.ctx is not None:
+            await self._cancel_background_work(handler.ctx)
+
+    async def _cancel_background_work(self, ctx: Context) -> None:
+        """Cancel the tasks a run left on its context for a later step, e.g. when cancelled between steps."""
+        speculation = await ctx.get("speculative_context", default=None)
+        # Once extract_context awaits it, the speculation finishes or is cancelled with that step
+        if speculation is not None and not speculation.done():
+            speculation.cancel()
+            self.speculation_stats["wasted"] += 1
+            await ctx.set("speculative_context", None)
+        prefetch = await ctx.get("hotel_prefetch", default=None)
+        if prefetch is not None:
+            prefetch.cancel()
+            await ctx.set("hotel_prefetch", None)
+
+    def speculation_metrics(self) -> Dict[str, float]:
+        """Counters for speculative context extraction and the share of speculations wasted."""
+        stats = dict(self.speculation_stats)
+        stats["waste_rate"] = stats["wasted"] / stats["started"] if stats["started"] else 0.0
+        return stats
+
+    @contextmanager
+    def _step_progress(self, ctx: Context, step_name: str) -> Iterator[None]:
+        """Write step start and completion events to the event stream."""
+        ctx.write_event_to_stream(StepProgressEvent(step=step_name, status="started"))
+        try:
+            yield
+        finally:
+            ctx.write_event_to_stream(StepProgressEvent(step=step_name, status="completed"))
+
+    async def _publish(self, ctx: Context, event: Any) -> Any:
+        """In streaming mode, also write an intermediate result to the event stream."""
+        if await ctx.get("stream") and not isinstance(event, StopEvent):
+            ctx.write_event_to_stream(event)
+        return event
 
     @step
     async def detect_intention(self, ctx: Context, ev: StartEvent) -> Union[IntentionEvent, StopEvent]:
         """Detect the intention of the user's query."""
-        # Store original query
-        await ctx.set("original_query", ev.query)
-        
-        # Detect intention
-        return await self.intention_agent.process(ev.query)
+        with self._step_progress(ctx, "detect_intention"):
+            # Store original query and the session's existing artifacts for this run
+            await ctx.set("original_query", ev.query)
+            await ctx.set("stream", bool(ev.get("stream")))
+            await ctx.set("conversation", ev.get("conversation") or "")
+            existing_context = ev.get("existing_context")
+            existing_itinerary = ev.get("existing_itinerary")
+            # Sessions pass their already validated artifacts; they are read, never modified
+            if existing_context and not isinstance(existing_context, ContextArtifact):
+                existing_context = ContextArtifact(**existing_context)
+            if existing_itinerary and not isinstance(existing_itinerary, ItineraryArtifact):
+                existing_itinerary = ItineraryArtifact(**existing_itinerary)
+            await ctx.set("existing_context", existing_context or None)
+            await ctx.set("existing_itinerary", existing_itinerary or None)
+
+            # Most first turns are new trips, so context extraction can start before the intention is known;
+            # turns of a session that already has a context are mostly updates and clarifications
+            speculation = None
+            if self.speculative_context and not existing_context:
+                speculation = asyncio.create_task(self.context_agent.process(ev.query))
+                self.speculation_stats["started"] += 1
+            await ctx.set("speculative_context", speculation)
+
+            # Detect intention
+            try:
+                intention = await self.intention_agent.process(ev.query)
+            except BaseException:
+                if speculation is not None:
+                    speculation.cancel()
+                    self.speculation_stats["wasted"] += 1
+                    await ctx.set("speculative_context", None)
+                raise
+
+            is_new_trip = isinstance(intention, IntentionEvent) and intention.intent_type == IntentType.NEW_TRIP.value
+            if speculation is not None and not is_new_trip:
+                speculation.cancel()
+                self.speculation_stats["wasted"] += 1
+                await ctx.set("speculative_context", None)
+
+            return await self._publish(ctx, intention)
     
     @step
     async def extract_context(
@@ -73,59 +269,124 @@ class TravelItineraryWorkflow(Workflow):
         ev: IntentionEvent
     ) -> Union[ContextExtractionEvent, StopEvent]:
         """Extract or update context based on detected intention."""
-        original_query = await ctx.get("original_query")
-        
-        if ev.intent_type == IntentType.NEW_TRIP.value:
-            return await self.context_agent.process(original_query)
-            
-        elif ev.intent_type == IntentType.UPDATE_ITINERARY.value:
-            if not self.existing_context:
+        with self._step_progress(ctx, "extract_context"):
+            original_query = await ctx.get("original_query")
+            await ctx.set("update_target", ev.update_target)
+
+            if ev.intent_type == IntentType.NEW_TRIP.value:
+                speculation = await ctx.get("speculative_context", default=None)
+                if speculation is not None:
+                    self.speculation_stats["used"] += 1
+                    return await self._publish(ctx, await speculation)
+                return await self._publish(ctx, await self.context_agent.process(original_query))
+
+            elif ev.intent_type == IntentType.UPDATE_ITINERARY.value:
+                existing_context = await ctx.get("existing_context")
+                if not existing_context:
+                    return StopEvent(
+                        result={
+                            "status": "error",
+                            "message": "No existing itinerary to update. Would you like to create a new trip plan?"
+                        }
+                    )
+
+                return await self._publish(ctx, await self.context_agent.update_context(
+                    existing_context,
+                    original_query,
+                    ev.update_target or "general",
+                    conversation=await ctx.get("conversation")
+                ))
+
+            else:
                 return StopEvent(
                     result={
-                        "status": "error",
-                        "message": "No existing itinerary to update. Would you like to create a new trip plan?"
+                        "status": "unrelated",
+                        "message": "I can help you plan a trip or update your existing travel plans. What would you like to do?"
                     }
                 )
-            
-            return await self.context_agent.update_context(
-                self.existing_context,
-                original_query,
-                ev.update_target or "general"
-            )
-            
-        else:
-            return StopEvent(
-                result={
-                    "status": "unrelated",
-                    "message": "I can help you plan a trip or update your existing travel plans. What would you like to do?"
-                }
-            )
     
     @step
-    async def generate_daily_plans(self, ctx: Context, ev: ContextExtractionEvent) -> PlanGenerationEvent:
+    async def generate_daily_plans(self, ctx: Context, ev: ContextExtractionEvent) -> Union[PlanGenerationEvent, StopEvent]:
         """Generate daily itinerary plans or update existing plans."""
-        if self.existing_itinerary:
-            # Update existing itinerary with new context
-            return await self.planner_agent.update_plans(
-                self.existing_itinerary,
-                ev.context
-            )
-        else:
-            # Generate new plans from scratch
-            return await self.planner_agent.process(ev.context)
+        with self._step_progress(ctx, "generate_daily_plans"):
+            await ctx.set("context", ev.context)
+            existing_itinerary = await ctx.get("existing_itinerary")
+
+            # In streaming mode each day is pushed to the event stream as soon as it is parsed
+            on_day_plan = None
+            if await ctx.get("stream"):
+                on_day_plan = lambda day_plan: ctx.write_event_to_stream(DayPlanEvent(day_plan=day_plan))
+
+            # A new trip's destination and dates are known now, so hotel vacancies are queried while it is planned
+            prefetch = None
+            if self.prefetch_hotels and not existing_itinerary:
+                prefetch = self.hotel_agent.prefetch_vacancies(ev.context)
+            await ctx.set("hotel_prefetch", prefetch)
+
+            try:
+                if existing_itinerary:
+                    # Update existing itinerary, regenerating only the days the update affects
+                    result = await self.planner_agent.update_plans(
+                        existing_itinerary,
+                        ev.context,
+                        previous_context=await ctx.get("existing_context"),
+                        query=await ctx.get("original_query"),
+                        update_target=await ctx.get("update_target"),
+                        on_day_plan=on_day_plan
+                    )
+                else:
+                    # Generate new plans from scratch
+                    result = await self.planner_agent.process(ev.context, on_day_plan=on_day_plan)
+            except BaseException:
+                if prefetch is not None:
+                    prefetch.cancel()
+                raise
+            if prefetch is not None and not isinstance(result, PlanGenerationEvent):
+                prefetch.cancel()
+            return result
 
     @step
     async def recommend_hotels(self, ctx: Context, ev: PlanGenerationEvent) -> StopEvent:
         """Generate hotel recommendations based on itinerary."""
-        if self.existing_itinerary and self.existing_itinerary.hotel_recommendations:
-            # Update existing hotel recommendations
-            updated_itinerary = await self.hotel_agent.update_recommendations(
-                ev.content
+        with self._step_progress(ctx, "recommend_hotels"):
+            on_recommendations = None
+            if await ctx.get("stream"):
+                on_recommendations = lambda county_id, recommendations: ctx.write_event_to_stream(
+                    HotelBatchEvent(county_id=county_id, recommendations=recommendations)
+                )
+
+            existing_itinerary = await ctx.get("existing_itinerary")
+            update_target = await ctx.get("update_target") or ""
+            prefetch = await ctx.get("hotel_prefetch", default=None)
+            try:
+                if existing_itinerary and existing_itinerary.hotel_recommendations and "hotel" not in update_target.lower():
+                    # Only query counties the update added
+                    hotel_event = await self.hotel_agent.update_recommendations(
+                        ev.content,
+                        existing_itinerary,
+                        on_recommendations=on_recommendations,
+                        context=await ctx.get("context"),
+                        prefetch=prefetch
+                    )
+                else:
+                    hotel_event = await self.hotel_agent.process(
+                        ev.content,
+                        on_recommendations=on_recommendations,
+                        context=await ctx.get("context"),
+                        prefetch=prefetch
+                    )
+            finally:
+                # Prefetched counties the plan doesn't visit
+                if prefetch is not None:
+                    prefetch.cancel()
+            return StopEvent(
+                result={
+                    "status": "complete",
+                    "message": "Your travel itinerary is ready.",
+                    "context": await ctx.get("context"),
+                    "itinerary": hotel_event.content
+                }
             )
-            return StopEvent(result=updated_itinerary.dict())
-        else:
-            # Generate new hotel recommendations
-            return await self.hotel_agent.process(ev.content)
 
     # @step
     # async def integrate_itinerary(self, ctx: Context, ev: HotelRecommendationEvent) -> StopEvent:
@@ -0,0 +1,119 @@
+"""
+CountyMapper.get_county_id over generated location strings like the planner
+writes them (county plus district or landmark, 台/臺 and full-width variants,
+short names, foreign and unknown places), against the previous linear-scan
+implementation. Reports per-call latency, where the two disagree and any
+labelled location the trie maps wrongly.
+
+    python -m benchmarks.county_mapper --strings 5000
+"""
+import time
+import random
+import argparse
+from collections import Counter
+from difflib import get_close_matches
+from typing import Callable, List, Optional, Tuple
+
+from app.utils.counties_mapper import COUNTY_DATA, CountyMapper
+
+PLACES = ["信義區", "中正區", "車站", "夜市", "老街", "國家公園", "文化園區", "觀光工廠", "港", "溫泉", "101", "美術館"]
+# Locations labelled with the county ID they should map to
+LABELLED_LOCATIONS: List[Tuple[str, Optional[int]]] = [
+    ("台北101", 1),
+    ("臺北市信義區", 1),
+    ("新北投溫泉", 1),
+    ("新北市板橋區", 3),
+    ("新北淡水老街", 3),
+    ("台中逢甲夜市", 9),
+    ("臺南安平老街", 15),
+    ("高雄港", 16),
+    ("花蓮太魯閣國家公園", 20),
+    ("馬祖", 22),
+    ("日本東京", None)
+]
+UNKNOWN = ["日本東京", "Osaka Castle", "香港", "飯店附近", "市區", "機場", "海邊", "首爾明洞", "新竹", "嘉義"]
+
+class LegacyCountyMapper:
+    """The linear-scan mapper this benchmark compares against"""
+
+    def __init__(self):
+        self.county_map = {county["name"]: county["id"] for county in COUNTY_DATA}
+        self.alternative_names = {"台北市": "臺北市", "台中市": "臺中市", "台南市": "臺南市", "台東縣": "臺東縣"}
+
+    def get_county_id(self, location: str) -> Optional[int]:
+        location = location.strip()
+        for county_name in self.county_map:
+            if county_name in location:
+                return self.county_map[county_name]
+        for alt_name, std_name in self.alternative_names.items():
+            if alt_name in location:
+                return self.county_map[std_name]
+        county_part = location.split('區')[0].split('市')[0].split('縣')[0]
+        if county_part:
+            matches = get_close_matches(county_part, list(self.county_map.keys()), n=1, cutoff=0.6)
+            if matches:
+                return self.county_map[matches[0]]
+        return None
+
+def _to_full_width(text: str) -> str:
+    return "".join(chr(ord(char) + 0xFEE0) if "!" <= char <= "~" else char for char in text)
+
+def generate(count: int, seed: int = 0) -> List[str]:
+    rng = random.Random(seed)
+    names = [county["name"] for county in COUNTY_DATA]
+    strings = []
+    for _ in range(count):
+        roll = rng.random()
+        if roll < 0.1:
+            strings.append(rng.choice(UNKNOWN))
+            continue
+        name = rng.choice(names)
+        if roll < 0.4:
+            name = name.replace("臺", "台")
+        elif roll < 0.55 and name[-1] in "市縣":
+            name = name[:-1]
+        location = name + rng.choice(PLACES)
+        if rng.random() < 0.1:
+            location = _to_full_width(location)
+        strings.append(location)
+    return strings
+
+def _time(get_county_id: Callable[[str], Optional[int]], strings: List[str]) -> float:
+    start = time.perf_counter()
+    for location in strings:
+        get_county_id(location)
+    return (time.perf_counter() - start) / len(strings) * 1e6
+
+def main(args: argparse.Namespace) -> None:
+    strings = generate(args.strings)
+    legacy, mapper = LegacyCountyMapper(), CountyMapper()
+
+    print(f"{'legacy linear scan':<24} {_time(legacy.get_county_id, strings):8.2f} us/call")
+    print(f"{'trie, cold fuzzy cache':<24} {_time(mapper.get_county_id, strings):8.2f} us/call")
+    print(f"{'trie, warm fuzzy cache':<24} {_time(mapper.get_county_id, strings):8.2f} us/call")
+
+    outcomes = Counter()
+    for location in strings:
+        before, after = legacy.get_county_id(location), mapper.get_county_id(location)
+        if before == after:
+            outcomes["same"] += 1
+        elif before is None:
+            outcomes["newly matched"] += 1
+        elif after is None:
+            outcomes["no longer matched"] += 1
+        else:
+            outcomes["different county"] += 1
+            if args.show:
+                print(f"  {location}: {before} -> {after}")
+    print(", ".join(f"{outcome}={count}" for outcome, count in outcomes.most_common()))
+
+    for location, expected in LABELLED_LOCATIONS:
+        before, after = legacy.get_county_id(location), mapper.get_county_id(location)
+        if after != expected:
+            print(f"  labelled {location}: expected {expected}, legacy {before}, trie {after}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--strings", type=int, default=5000)
+    parser.add_argument("--show", action="store_true", help="print strings mapped to a different county")
+    main(parser.parse_args())
@@ -0,0 +1,63 @@
+"""
+Gazetteer load time and Gazetteer.resolve latency over generated itinerary
+location strings (county plus one or two districts, 台/臺 spellings, short
+district names), with the share resolved to the intended districts. A seat
+named by its short form, e.g. 南投 for 南投市, is read as the county.
+
+    python -m benchmarks.gazetteer --strings 5000
+"""
+import time
+import random
+import argparse
+from typing import List, Tuple
+
+from app.utils.counties_mapper import COUNTY_DATA
+from app.utils.gazetteer import Gazetteer
+
+def generate(gazetteer: Gazetteer, count: int, seed: int = 0) -> List[Tuple[str, List[int]]]:
+    """(location string, intended district IDs) pairs"""
+    rng = random.Random(seed)
+    county_names = {county["id"]: county["name"] for county in COUNTY_DATA}
+    by_county = {}
+    for district_id in range(1, len(gazetteer) + 1):
+        by_county.setdefault(gazetteer.county_ids[district_id], []).append(district_id)
+
+    samples = []
+    for _ in range(count):
+        county_id = rng.choice(list(by_county))
+        district_ids = rng.sample(by_county[county_id], min(len(by_county[county_id]), rng.choice([1, 1, 2])))
+        names = [gazetteer.district(district_id).name for district_id in district_ids]
+        if rng.random() < 0.3:
+            names = [name[:-1] if len(name) > 2 else name for name in names]
+        location = county_names[county_id] + "到".join(names) + rng.choice(["", "一日遊", "老街", "附近"])
+        if rng.random() < 0.4:
+            location = location.replace("臺", "台")
+        samples.append((location, district_ids))
+    return samples
+
+def main(args: argparse.Namespace) -> None:
+    start = time.perf_counter()
+    gazetteer = Gazetteer()
+    print(f"{'load':<10} {len(gazetteer)} districts in {(time.perf_counter() - start) * 1000:.2f} ms")
+
+    samples = generate(gazetteer, args.strings)
+    start = time.perf_counter()
+    results = [gazetteer.resolve(location) for location, _ in samples]
+    elapsed = time.perf_counter() - start
+    print(f"{'resolve':<10} {elapsed / len(samples) * 1e6:.2f} us/call")
+
+    correct = sum(
+        [place.district_id for place in places] == district_ids
+        for places, (_, district_ids) in zip(results, samples)
+    )
+    print(f"{'accuracy':<10} {correct / len(samples):.2%} resolved to the intended districts")
+    if args.show:
+        for places, (location, district_ids) in zip(results, samples):
+            if [place.district_id for place in places] != district_ids:
+                print(f"  {location}: {[place.name for place in places]}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--strings", type=int, default=5000)
+    parser.add_argument("--show", action="store_true", help="print strings resolved to other districts")
+    main(parser.parse_args())
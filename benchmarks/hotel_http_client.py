@@ -0,0 +1,97 @@
+"""
+Per-request latency of HotelRecommenderAgent._make_api_request against a local
+stub of the hotels API, with a client per call versus the shared pooled client.
+
+The stub sleeps once per new TCP connection (--connect-delay-ms) to stand in for
+the TCP+TLS handshake to the Lambda URL; pooled connections only pay it once.
+
+    python -m benchmarks.hotel_http_client --requests 500 --concurrency 10
+"""
+import os
+import json
+import time
+import asyncio
+import argparse
+import statistics
+from typing import List
+
+os.environ.setdefault("JTCG_API_KEY", "benchmark")
+
+from app.agents.hotel_recommender import HotelRecommenderAgent
+from app.utils.http_client import create_http_client
+from app.utils.rate_limiter import UpstreamLimiters
+
+# Measure connection reuse only, without admission control
+UNLIMITED = UpstreamLimiters(limits={}, default={"rate": 1e9, "burst": 1e9, "max_concurrency": 10**6})
+
+VACANCIES = json.dumps([
+    {"id": i, "name": f"Hotel {i}", "available_rooms": []} for i in range(3)
+]).encode()
+
+async def _serve_connection(reader, writer, connect_delay: float) -> None:
+    """Minimal HTTP/1.1 keep-alive responder."""
+    await asyncio.sleep(connect_delay)
+    try:
+        while True:
+            request = await reader.readuntil(b"\r\n\r\n")
+            keep_alive = b"connection: close" not in request.lower()
+            writer.write(
+                b"HTTP/1.1 200 OK\r\n"
+                b"Content-Type: application/json\r\n"
+                + f"Content-Length: {len(VACANCIES)}\r\n".encode()
+                + (b"Connection: keep-alive\r\n\r\n" if keep_alive else b"Connection: close\r\n\r\n")
+                + VACANCIES
+            )
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (asyncio.IncompleteReadError, ConnectionResetError):
+        pass
+    finally:
+        writer.close()
+
+async def _run(agent: HotelRecommenderAgent, requests: int, concurrency: int) -> List[float]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+
+    async def one() -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            await agent._make_api_request("hotel/vacancies", params={"county_ids": [1]})
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    await asyncio.gather(*(one() for _ in range(requests)))
+    return latencies
+
+def _report(label: str, latencies: List[float]) -> None:
+    latencies = sorted(latencies)
+    p50 = statistics.median(latencies)
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"{label:<22} n={len(latencies):<5} p50={p50:7.2f} ms  p99={p99:7.2f} ms")
+
+async def main(args: argparse.Namespace) -> None:
+    server = await asyncio.start_server(
+        lambda r, w: _serve_connection(r, w, args.connect_delay_ms / 1000),
+        "127.0.0.1",
+        0
+    )
+    port = server.sockets[0].getsockname()[1]
+
+    per_call_agent = HotelRecommenderAgent(llm=None, limiters=UNLIMITED)
+    per_call_agent.api_base_url = f"http://127.0.0.1:{port}"
+    _report("client per call", await _run(per_call_agent, args.requests, args.concurrency))
+
+    async with create_http_client() as client:
+        pooled_agent = HotelRecommenderAgent(llm=None, http_client=client, limiters=UNLIMITED)
+        pooled_agent.api_base_url = f"http://127.0.0.1:{port}"
+        _report("shared pooled client", await _run(pooled_agent, args.requests, args.concurrency))
+
+    server.close()
+    await server.wait_closed()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--connect-delay-ms", type=float, default=20.0)
+    asyncio.run(main(parser.parse_args()))
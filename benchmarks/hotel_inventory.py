@@ -0,0 +1,69 @@
+"""
+HotelInventory over a generated snapshot in the recorded hotel record shape:
+snapshot size and build time, time to open and memory-map it, and per-query
+latency of name search (substring and fuzzy fallback), exact-name details and
+static attribute filters. Each of these queries is a hotel API round trip
+without the snapshot.
+
+    python -m benchmarks.hotel_inventory --hotels 5000
+"""
+import os
+import time
+import random
+import argparse
+import tempfile
+from collections import defaultdict
+from typing import Callable, List
+
+from app.utils.hotel_inventory import HotelInventory
+from benchmarks.vacancy_parsing import generate
+
+def _time_us(function: Callable[[str], object], inputs: List[str]) -> float:
+    start = time.perf_counter()
+    for value in inputs:
+        function(value)
+    return (time.perf_counter() - start) / len(inputs) * 1e6
+
+def main(args: argparse.Namespace) -> None:
+    rng = random.Random(2)
+    records = generate(args.hotels, nights=1, malformed=0.0)
+    by_county = defaultdict(list)
+    for record in records:
+        record["name"] = f"{rng.choice(['福華', '晶華', '老爺', '承億', '雀客', '福容'])}大飯店{record['id']}"
+        by_county[record["county"]["id"]].append(record)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "hotel_inventory.sqlite3")
+        start = time.perf_counter()
+        HotelInventory.build(path, by_county)
+        print(f"built {args.hotels} hotels in {(time.perf_counter() - start) * 1000:.0f} ms, "
+              f"{os.path.getsize(path) / 1024:.0f} KiB")
+
+        inventory = HotelInventory(path)
+        start = time.perf_counter()
+        inventory.open()
+        print(f"{'open and map':<24} {(time.perf_counter() - start) * 1000:8.2f} ms")
+
+        names = [rng.choice(records)["name"] for _ in range(args.queries)]
+        keywords = [name[:2] for name in names]
+        typos = [name.replace("大飯店", "大飯館") for name in names[:max(1, args.queries // 10)]]
+        county_ids = [rng.choice(list(by_county)) for _ in range(args.queries)]
+        print(f"{'search, substring':<24} {_time_us(inventory.search, keywords):8.1f} us")
+        print(f"{'search, fuzzy fallback':<24} {_time_us(inventory.search, typos):8.1f} us")
+        print(f"{'details':<24} {_time_us(inventory.details, names):8.1f} us")
+
+        parking = list(inventory.match_attributes("facility", ["停車"]).values())
+        breakfast_pool = list(inventory.match_attributes("facility", ["早餐", "游泳"]).values())
+        beds = list(inventory.match_attributes("bed_type", ["雙人"]).values())
+        county_inputs = [str(county_id) for county_id in county_ids]
+        print(f"{'filter, one facility':<24} "
+              f"{_time_us(lambda county_id: inventory.filter(int(county_id), facilities=parking), county_inputs):8.1f} us")
+        print(f"{'filter, two + bed type':<24} "
+              f"{_time_us(lambda county_id: inventory.filter(int(county_id), facilities=breakfast_pool, bed_types=beds), county_inputs):8.1f} us")
+        inventory.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hotels", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=2000)
+    main(parser.parse_args())
@@ -0,0 +1,123 @@
+"""
+Hotel API latency and success rate against a local stub with a slow tail
+(--slow-rate of responses take --slow-ms) and transient 503s (--error-rate),
+without resilience, with retries only, and with retries plus hedged requests.
+A last run takes the stub down to show the circuit breaker failing fast and
+stale cached responses being served.
+
+    python -m benchmarks.hotel_resilience --requests 1000 --concurrency 8
+"""
+import os
+import json
+import time
+import random
+import asyncio
+import argparse
+import statistics
+from typing import Dict, List
+
+os.environ.setdefault("JTCG_API_KEY", "benchmark")
+
+from app.agents.hotel_recommender import HotelRecommenderAgent
+from app.utils.http_client import create_http_client
+from app.utils.rate_limiter import UpstreamLimiters
+from app.utils.resilience import ResilienceLayer
+from app.utils.response_cache import ResponseCache, InMemoryCacheBackend
+
+BODY = json.dumps([{"id": 1, "name": "Hotel 1", "available_rooms": []}]).encode()
+UNLIMITED = UpstreamLimiters(limits={}, default={"rate": 1e9, "burst": 1e9, "max_concurrency": 10**6})
+
+async def _serve_connection(reader, writer, behaviour: Dict[str, float]) -> None:
+    """HTTP/1.1 keep-alive responder with a slow tail, transient errors and an outage switch."""
+    try:
+        while True:
+            await reader.readuntil(b"\r\n\r\n")
+            roll = random.random()
+            if behaviour["down"] or roll < behaviour["error_rate"]:
+                await asyncio.sleep(0.002)
+                head, body = b"HTTP/1.1 503 Service Unavailable\r\n", b"{}"
+            else:
+                slow = roll < behaviour["error_rate"] + behaviour["slow_rate"]
+                await asyncio.sleep(behaviour["slow"] if slow else random.uniform(0.005, 0.015))
+                head, body = b"HTTP/1.1 200 OK\r\n", BODY
+            writer.write(
+                head
+                + b"Content-Type: application/json\r\n"
+                + f"Content-Length: {len(body)}\r\n\r\n".encode()
+                + body
+            )
+            await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionResetError):
+        pass
+    finally:
+        writer.close()
+
+async def _run(agent: HotelRecommenderAgent, requests: int, concurrency: int) -> Dict[str, List[float]]:
+    semaphore = asyncio.Semaphore(concurrency)
+    results: Dict[str, List[float]] = {"ok": [], "failed": []}
+
+    async def one() -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await agent._make_api_request("hotel/vacancies", {"county_ids": [1]})
+                outcome = "ok"
+            except Exception:
+                outcome = "failed"
+            results[outcome].append((time.perf_counter() - start) * 1000)
+
+    await asyncio.gather(*(one() for _ in range(requests)))
+    return results
+
+def _report(label: str, results: Dict[str, List[float]]) -> None:
+    latencies = sorted(results["ok"] + results["failed"])
+    p50 = statistics.median(latencies)
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    success = len(results["ok"]) / len(latencies)
+    print(f"{label:<22} success={success:7.2%}  p50={p50:7.1f} ms  p99={p99:7.1f} ms")
+
+async def main(args: argparse.Namespace) -> None:
+    behaviour = {"down": False, "error_rate": args.error_rate, "slow_rate": args.slow_rate, "slow": args.slow_ms / 1000}
+    server = await asyncio.start_server(lambda r, w: _serve_connection(r, w, behaviour), "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+
+    never_open = 10**9
+    runs = [
+        ("no resilience", ResilienceLayer(max_attempts=1, hedge_quantile=None, breaker_failures=never_open)),
+        ("retries", ResilienceLayer(base_delay=0.01, hedge_quantile=None, breaker_failures=never_open)),
+        ("retries + hedging", ResilienceLayer(base_delay=0.01, breaker_failures=never_open)),
+    ]
+    async with create_http_client() as client:
+        for label, resilience in runs:
+            agent = HotelRecommenderAgent(llm=None, http_client=client, limiters=UNLIMITED, resilience=resilience)
+            agent.api_base_url = f"http://127.0.0.1:{port}"
+            _report(label, await _run(agent, args.requests, args.concurrency))
+            stats = resilience.stats()
+            print(f"{'':<22} retries={stats['retries']} hedges={stats['hedges']} hedge_wins={stats['hedge_wins']}")
+
+        # Outage: warm the cache, let the entry expire, then take the stub down
+        cache = ResponseCache(backend=InMemoryCacheBackend(), ttls={"hotel/vacancies": 0.1})
+        resilience = ResilienceLayer(base_delay=0.01, breaker_failures=5, breaker_reset=60.0)
+        agent = HotelRecommenderAgent(
+            llm=None, http_client=client, response_cache=cache, limiters=UNLIMITED, resilience=resilience
+        )
+        agent.api_base_url = f"http://127.0.0.1:{port}"
+        behaviour.update(error_rate=0.0, slow_rate=0.0)
+        await agent._make_api_request("hotel/vacancies", {"county_ids": [1]})
+        await asyncio.sleep(0.2)
+        behaviour["down"] = True
+        _report("outage", await _run(agent, args.requests, args.concurrency))
+        print(f"{'':<22} breaker={resilience.breaker('hotel/vacancies').state} "
+              f"fail-fast={resilience.stats()['rejected']} stale_hits={cache.stats()['stale_hits']}")
+
+    server.close()
+    await server.wait_closed()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--slow-rate", type=float, default=0.03, help="share of responses in the slow tail")
+    parser.add_argument("--slow-ms", type=float, default=500.0)
+    parser.add_argument("--error-rate", type=float, default=0.02, help="share of transient 503s")
+    asyncio.run(main(parser.parse_args()))
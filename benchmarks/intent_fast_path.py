@@ -0,0 +1,117 @@
+"""
+Fast-path hit rate and accuracy of the local intention pre-classifier on a labelled
+set of messages, and optionally its agreement with the LLM on the same messages.
+
+    python -m benchmarks.intent_fast_path
+    python -m benchmarks.intent_fast_path --llm              # also ask gpt-4o-mini (needs OPENAI_API_KEY)
+    python -m benchmarks.intent_fast_path --train-from-cache # add a TF-IDF model trained on logged outputs
+"""
+import os
+import time
+import asyncio
+import argparse
+from typing import Dict, List, Optional, Tuple
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+from app.workflow.models import IntentionAnalysis, IntentType
+from app.utils.intent_classifier import RuleIntentClassifier, TfidfIntentModel
+from app.utils.llm_cache import llm_output_cache
+from app.config.constants import INTENT_FAST_PATH_THRESHOLD
+
+NEW, UPDATE, CLARIFY, UNRELATED = (
+    IntentType.NEW_TRIP, IntentType.UPDATE_ITINERARY, IntentType.CLARIFICATION_RESPONSE, IntentType.UNRELATED
+)
+
+# Messages labelled with the intent the LLM is expected to return
+LABELLED_MESSAGES: List[Tuple[str, IntentType]] = [
+    ("Plan a 3-day trip to Taipei for two people", NEW),
+    ("Can you plan a weekend itinerary in Hualien?", NEW),
+    ("I want to visit Tainan for 4 days with my family", NEW),
+    ("Help me organize a 5 day vacation around Taiwan", NEW),
+    ("Planning a trip to Kaohsiung next month, budget is moderate", NEW),
+    ("我想去花蓮玩三天", NEW),
+    ("幫我規劃台南兩天一夜的行程", NEW),
+    ("計畫去宜蘭旅遊，四個人，預算中等", NEW),
+    ("想和朋友去台中玩2天", NEW),
+    ("安排一個臺東五天的旅行行程", NEW),
+    ("Taipei 3 days", NEW),
+    ("2 nights in Kenting with kids", NEW),
+    ("Change the hotel on day 2", UPDATE),
+    ("Can you replace the museum visit with something outdoors?", UPDATE),
+    ("Extend the trip by one more day", UPDATE),
+    ("Switch to cheaper hotels please", UPDATE),
+    ("Move the night market to day 3 instead", UPDATE),
+    ("Remove the hiking activity", UPDATE),
+    ("把第二天的行程改成室內活動", UPDATE),
+    ("飯店換便宜一點的", UPDATE),
+    ("行程縮短成兩天", UPDATE),
+    ("不要安排太早的活動", UPDATE),
+    ("Change Taipei to Taichung", UPDATE),
+    ("I'd prefer a different restaurant on the last day", UPDATE),
+    ("Yes, that works", CLARIFY),
+    ("Two adults and one child", CLARIFY),
+    ("Around 3000 NTD per night", CLARIFY),
+    ("好，就這樣", CLARIFY),
+    ("Tell me a joke", UNRELATED),
+    ("hello", UNRELATED),
+    ("What is the price of bitcoin today?", UNRELATED),
+    ("Write a poem about cats", UNRELATED),
+    ("講個笑話", UNRELATED),
+    ("你好", UNRELATED),
+    ("thanks", UNRELATED),
+    ("Who are you?", UNRELATED),
+]
+
+def _fast_path(classifier: RuleIntentClassifier) -> Tuple[List[Optional[IntentionAnalysis]], float]:
+    start = time.perf_counter()
+    decisions = [classifier.classify(message) for message, _ in LABELLED_MESSAGES]
+    return decisions, (time.perf_counter() - start) / len(LABELLED_MESSAGES) * 1e6
+
+async def _llm_labels() -> List[IntentType]:
+    from llama_index.llms.openai import OpenAI
+    from app.agents.intention_detection import IntentionDetectionAgent
+
+    agent = IntentionDetectionAgent(llm=OpenAI(model="gpt-4o-mini", temperature=0.7))
+    analyses = await asyncio.gather(*(
+        agent.llm.astructured_predict(IntentionAnalysis, agent.intent_prompt, query=message)
+        for message, _ in LABELLED_MESSAGES
+    ))
+    return [analysis.intent_type for analysis in analyses]
+
+def _agreement(decisions: List[Optional[IntentionAnalysis]], labels: List[IntentType]) -> Dict[str, float]:
+    decided = [(decision.intent_type, label) for decision, label in zip(decisions, labels) if decision is not None]
+    agreed = sum(1 for predicted, label in decided if predicted == label)
+    return {"decided": len(decided), "agreed": agreed, "agreement": agreed / len(decided) if decided else 0.0}
+
+async def main(args: argparse.Namespace) -> None:
+    model = None
+    if args.train_from_cache:
+        from app.agents.intention_detection import IntentionDetectionAgent
+        prompt = IntentionDetectionAgent(llm=None).intent_prompt
+        samples = await llm_output_cache.logged_outputs(IntentionAnalysis, prompt)
+        print(f"training TF-IDF model on {len(samples)} logged analyses")
+        model = TfidfIntentModel().fit(samples)
+
+    classifier = RuleIntentClassifier(threshold=args.threshold, model=model)
+    decisions, per_message_us = _fast_path(classifier)
+    stats = classifier.stats()
+    print(f"fast path: {stats['hits']}/{stats['queries']} messages decided locally "
+          f"(hit rate {stats['hit_rate']:.0%}), {per_message_us:.1f} us per message")
+
+    labelled = _agreement(decisions, [label for _, label in LABELLED_MESSAGES])
+    print(f"vs labels: {labelled['agreed']}/{labelled['decided']} agree ({labelled['agreement']:.0%})")
+    for (message, label), decision in zip(LABELLED_MESSAGES, decisions):
+        if decision is not None and decision.intent_type != label:
+            print(f"  mismatch: {message!r} -> {decision.intent_type.value} (labelled {label.value})")
+
+    if args.llm:
+        llm = _agreement(decisions, await _llm_labels())
+        print(f"vs LLM:    {llm['agreed']}/{llm['decided']} agree ({llm['agreement']:.0%})")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threshold", type=float, default=INTENT_FAST_PATH_THRESHOLD)
+    parser.add_argument("--llm", action="store_true", help="measure agreement with gpt-4o-mini")
+    parser.add_argument("--train-from-cache", action="store_true", help="train a TF-IDF model on the LLM output cache")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,129 @@
+"""
+Bytes per session and serialize/deserialize time for a 7-day itinerary with hotel
+results and a night-by-night hotel plan: JSON with full validation (the previous
+format) versus msgpack snapshots, with and without zstd, decoded with validation or
+on the trusted path a store uses for its own snapshots. Deserialization includes
+getting the ContextArtifact and ItineraryArtifact the workflow runs on.
+
+    python -m benchmarks.session_codec --iterations 2000
+"""
+import time
+import argparse
+import statistics
+from datetime import date, timedelta
+from typing import Callable, List
+
+from app.api.models import SessionState
+from app.api.session_codec import SessionCodec, _zstd_available
+from app.artifacts.context import ContextArtifact
+from app.artifacts.itinerary import ItineraryArtifact
+from app.workflow.models import TravelItinerary, DayPlan, Location, HotelRecommendation, HotelRoom, HotelNight
+
+COUNTIES = ["臺北市", "新北市", "宜蘭縣", "花蓮縣", "臺東縣", "高雄市", "臺南市"]
+
+def _sample_session() -> SessionState:
+    context = ContextArtifact(
+        destination="Taiwan east coast loop",
+        duration=7,
+        group_size=4,
+        budget="moderate",
+        preferences=["night markets", "hiking", "hot springs", "local food"],
+        additional_info={"travel_month": "November", "transport": "train"}
+    )
+    daily_plans = []
+    for day, county in enumerate(COUNTIES, start=1):
+        schedule = []
+        for hour, kind in [(8, "meal"), (9, "transit"), (10, "activity"), (12, "meal"),
+                           (14, "activity"), (16, "activity"), (18, "meal"), (20, "activity")]:
+            schedule.append({
+                "time": f"{hour:02d}:00",
+                "type": kind,
+                "description": f"Day {day} {kind} around {county}, with time to explore the neighbourhood",
+                "location": f"{county}中正區"
+            })
+        daily_plans.append(DayPlan(
+            day=day,
+            location=Location(county=county, district="中正區", latitude=25.03 - day * 0.3, longitude=121.5 + day * 0.05),
+            schedule=schedule
+        ))
+    hotels = [
+        HotelRecommendation(
+            hotel_id=f"H{day:04d}{n}",
+            name=f"{county}溫泉飯店 {n}",
+            location=Location(county=county, district="中正區", latitude=25.0, longitude=121.5),
+            rooms=[
+                HotelRoom(room_name=f"Family room {r}", bed_types=["雙人床", "單人床"],
+                          facilities=["Wi-Fi", "浴缸", "冰箱", "吹風機"], price=3200.0 + r * 400)
+                for r in range(3)
+            ]
+        )
+        for day, county in enumerate(COUNTIES, start=1)
+        for n in range(3)
+    ]
+    hotel_plan = [
+        HotelNight(
+            day=day,
+            night_date=date(2026, 11, 1) + timedelta(days=day - 1),
+            county_id=day,
+            county=county,
+            hotel_ids=[f"H{day:04d}{n}" for n in range(3)]
+        )
+        for day, county in enumerate(COUNTIES[:-1], start=1)
+    ]
+    itinerary = ItineraryArtifact(
+        itinerary=TravelItinerary(daily_plans=daily_plans),
+        hotel_recommendations=hotels,
+        hotel_plan=hotel_plan
+    )
+    history = [{"role": role, "content": f"Turn {i} message about the trip"} for i in range(10) for role in ("user", "assistant")]
+    session = SessionState(conversation_history=history)
+    session.set_artifacts(context=context, itinerary=itinerary)
+    return session
+
+def _measure(fn: Callable[[], object], iterations: int) -> List[float]:
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1e6)
+    return timings
+
+def _report(label: str, size: int, encode: List[float], decode: List[float]) -> None:
+    print(f"{label:<28} {size:>7} B  encode p50={statistics.median(encode):8.1f} us  decode p50={statistics.median(decode):8.1f} us")
+
+def main(args: argparse.Namespace) -> None:
+    session = _sample_session()
+
+    def rehydrate(state: SessionState) -> None:
+        state.context_artifact()
+        state.itinerary_artifact()
+
+    data = session.model_dump_json()
+    _report(
+        "json",
+        len(data.encode("utf-8")),
+        _measure(session.model_dump_json, args.iterations),
+        _measure(lambda: rehydrate(SessionState.model_validate_json(data)), args.iterations)
+    )
+
+    codecs = [("msgpack", SessionCodec(compress=False))]
+    if _zstd_available():
+        codecs.append(("msgpack + zstd", SessionCodec(compress=True)))
+    for label, codec in codecs:
+        snapshot = codec.encode(session)
+        encode = _measure(lambda: codec.encode(session), args.iterations)
+        _report(
+            label,
+            len(snapshot),
+            encode,
+            _measure(lambda: rehydrate(codec.decode(snapshot)), args.iterations)
+        )
+        _report(
+            f"{label} trusted", len(snapshot), encode,
+            _measure(lambda: rehydrate(codec.decode(snapshot, trusted=True)), args.iterations)
+        )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    main(parser.parse_args())
@@ -0,0 +1,115 @@
+"""
+Hotel API calls against a local stub that throttles above --capacity requests per
+second (429 with Retry-After), without admission control, with a limiter set at the
+stub's capacity, and with one set too high that has to adapt to the 429s. A last run
+mixes interactive and background calls to show priority admission.
+
+    python -m benchmarks.upstream_limiter --requests 200 --capacity 50
+"""
+import os
+import json
+import time
+import asyncio
+import argparse
+import statistics
+from typing import Dict, List
+
+os.environ.setdefault("JTCG_API_KEY", "benchmark")
+
+from app.agents.hotel_recommender import HotelRecommenderAgent
+from app.utils.http_client import create_http_client
+from app.utils.rate_limiter import TokenBucket, UpstreamLimiters, Priority, priority_scope
+
+BODY = json.dumps([{"id": 1, "name": "Hotel 1", "available_rooms": []}]).encode()
+UNLIMITED = {"rate": 1e9, "burst": 1e9, "max_concurrency": 10**6}
+
+async def _serve_connection(reader, writer, bucket: TokenBucket, counts: Dict[str, int]) -> None:
+    """HTTP/1.1 keep-alive responder that throttles beyond the bucket's rate."""
+    try:
+        while True:
+            await reader.readuntil(b"\r\n\r\n")
+            await asyncio.sleep(0.005)
+            if bucket.delay() == 0:
+                bucket.take()
+                counts["ok"] += 1
+                head, body = b"HTTP/1.1 200 OK\r\n", BODY
+            else:
+                counts["throttled"] += 1
+                head, body = b"HTTP/1.1 429 Too Many Requests\r\nRetry-After: 1\r\n", b"{}"
+            writer.write(
+                head
+                + b"Content-Type: application/json\r\n"
+                + f"Content-Length: {len(body)}\r\n\r\n".encode()
+                + body
+            )
+            await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionResetError):
+        pass
+    finally:
+        writer.close()
+
+async def _run(agent: HotelRecommenderAgent, requests: int) -> float:
+    async def one() -> None:
+        try:
+            await agent._fetch_api_response("hotel/vacancies", {"county_ids": [1]})
+        except ValueError:
+            pass
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    return time.perf_counter() - start
+
+async def _run_priorities(agent: HotelRecommenderAgent, requests: int) -> Dict[str, List[float]]:
+    latencies: Dict[str, List[float]] = {"interactive": [], "background": []}
+
+    async def one(priority: Priority) -> None:
+        with priority_scope(priority):
+            start = time.perf_counter()
+            await agent._fetch_api_response("hotel/vacancies", {"county_ids": [1]})
+            latencies[priority.name.lower()].append((time.perf_counter() - start) * 1000)
+
+    # Background work is queued first; interactive calls arriving later still go ahead of it
+    background = [asyncio.create_task(one(Priority.BACKGROUND)) for _ in range(requests // 2)]
+    await asyncio.sleep(0)
+    interactive = [asyncio.create_task(one(Priority.INTERACTIVE)) for _ in range(requests // 2)]
+    await asyncio.gather(*background, *interactive)
+    return latencies
+
+async def main(args: argparse.Namespace) -> None:
+    counts = {"ok": 0, "throttled": 0}
+    bucket = TokenBucket(args.capacity, burst=max(1, args.capacity // 10))
+    server = await asyncio.start_server(lambda r, w: _serve_connection(r, w, bucket, counts), "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+
+    runs = [
+        ("no admission control", UNLIMITED),
+        ("limit at capacity", {"rate": args.capacity, "burst": max(1, args.capacity // 10), "max_concurrency": 16}),
+        ("limit 2x capacity", {"rate": args.capacity * 2, "burst": args.capacity // 5, "max_concurrency": 16}),
+    ]
+    async with create_http_client() as client:
+        for label, limit in runs:
+            limiters = UpstreamLimiters(limits={}, default=limit)
+            agent = HotelRecommenderAgent(llm=None, http_client=client, limiters=limiters)
+            agent.api_base_url = f"http://127.0.0.1:{port}"
+            counts.update(ok=0, throttled=0)
+            await asyncio.sleep(1.0)  # Let the stub's bucket refill between runs
+            elapsed = await _run(agent, args.requests)
+            stats = limiters.get("hotel:hotel/vacancies").stats()
+            print(f"{label:<22} ok={counts['ok']:<5} 429s={counts['throttled']:<5} "
+                  f"elapsed={elapsed:6.2f} s  final rate={stats['rate']}")
+
+        limiters = UpstreamLimiters(limits={}, default={"rate": args.capacity, "burst": 1, "max_concurrency": 4})
+        agent = HotelRecommenderAgent(llm=None, http_client=client, limiters=limiters)
+        agent.api_base_url = f"http://127.0.0.1:{port}"
+        await asyncio.sleep(1.0)
+        for priority, latencies in (await _run_priorities(agent, args.requests)).items():
+            print(f"{priority:<22} n={len(latencies):<5} p50={statistics.median(latencies):8.1f} ms")
+
+    server.close()
+    await server.wait_closed()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--capacity", type=int, default=50, help="requests per second the stub accepts")
+    asyncio.run(main(parser.parse_args()))
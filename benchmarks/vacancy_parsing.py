@@ -0,0 +1,119 @@
+"""
+Turning a /hotel/vacancies payload into recommendations, for generated payloads
+in the recorded response shape (suitable_room_types with nightly prices, facility
+objects, long intro and notice texts) with a share of malformed records:
+
+- per record: build a HotelRecommendation for every hotel, catching the
+  exception of each bad record, then rank
+- batch: parse_vacancies validates the ranking fields in one pass, ranks the
+  columns and builds models for the top-k only
+
+    python -m benchmarks.vacancy_parsing --hotels 500 --malformed 0.05
+"""
+import time
+import random
+import argparse
+from typing import Callable, List
+
+from pydantic import ValidationError
+
+from app.utils.gazetteer import taiwan_gazetteer
+from app.utils.hotel_ranking import hotel_ranker
+from app.utils.vacancies import build_recommendation, parse_vacancies
+from app.workflow.models import HotelRecommendation
+
+FACILITIES = ["無線網路", "停車場", "早餐", "健身房", "游泳池", "吹風機", "浴缸", "電視", "冰箱", "保險箱"]
+BED_TYPES = ["雙人床", "兩張單人床", "加大雙人床", "四人房"]
+INTRO = "位於市中心，交通便利，鄰近捷運站與商圈，提供舒適的住宿環境與親切的服務。" * 8
+NOTICE = "入住時間為下午三點後，退房時間為上午十一點前，全館禁菸，寵物請勿攜帶入內。" * 6
+
+def generate(count: int, nights: int, malformed: float, seed: int = 0) -> List[dict]:
+    rng = random.Random(seed)
+    vacancies = []
+    for hotel_id in range(count):
+        place = taiwan_gazetteer.district(rng.randint(1, len(taiwan_gazetteer)))
+        record = {
+            "id": hotel_id,
+            "name": f"Hotel {hotel_id}",
+            "latitude": place.latitude + rng.gauss(0, 0.02),
+            "longitude": place.longitude + rng.gauss(0, 0.02),
+            "county": {"id": place.county_id, "name": ""},
+            "district": {"id": place.district_id, "name": place.name},
+            "intro": INTRO,
+            "notice": NOTICE,
+            "facilities": [{"name": name, "is_popular": rng.random() < 0.3} for name in rng.sample(FACILITIES, 6)],
+            "suitable_room_types": [
+                {
+                    "id": room_id,
+                    "name": f"Room {room_id}",
+                    "price": (price := rng.choice([1500, 2400, 3200, 4800, 7600])),
+                    "bed_type": rng.choice(BED_TYPES),
+                    "adults": rng.choice([2, 2, 4]),
+                    "children": 0,
+                    "facilities": [{"name": name, "is_popular": False} for name in rng.sample(FACILITIES, 5)],
+                    "prices": [
+                        {"price": price * rng.choice([0.9, 1.0, 1.2]), "rooms": rng.randint(1, 5), "date": f"2026-11-{night + 1:02d}", "plan": "standard"}
+                        for night in range(nights)
+                    ]
+                }
+                for room_id in range(rng.randint(1, 4))
+            ]
+        }
+        if rng.random() < malformed:
+            broken = rng.choice(["latitude", "prices", "name"])
+            if broken == "latitude":
+                record["latitude"] = "unknown"
+            elif broken == "prices":
+                record["suitable_room_types"][0]["prices"][0]["price"] = None
+            else:
+                del record["name"]
+        vacancies.append(record)
+    return vacancies
+
+def per_record(vacancies: List[dict], centroids: list) -> List[HotelRecommendation]:
+    """Build every hotel as a model, one exception per bad record, then rank the survivors"""
+    hotels, usable = [], []
+    for record in vacancies:
+        try:
+            hotels.append(build_recommendation(record))
+        except (ValidationError, AttributeError, KeyError, TypeError, ValueError):
+            continue
+        usable.append(record)
+    # Rank the built hotels' records so both paths choose among the same hotels
+    table = parse_vacancies(usable).table
+    return [hotels[index] for index in hotel_ranker.select(table, centroids, "每晚3000", 4)]
+
+def batched(vacancies: List[dict], centroids: list) -> List[HotelRecommendation]:
+    batch = parse_vacancies(vacancies)
+    return batch.recommendations(hotel_ranker.select(batch.table, centroids, "每晚3000", 4))
+
+def _time_ms(function: Callable[[], object], repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - start) / repeat * 1000
+
+def main(args: argparse.Namespace) -> None:
+    vacancies = generate(args.hotels, args.nights, args.malformed)
+    rng = random.Random(1)
+    centroids = [
+        (place.latitude, place.longitude)
+        for place in (taiwan_gazetteer.district(rng.randint(1, 12)) for _ in range(args.nights))
+    ]
+
+    batch = parse_vacancies(vacancies)
+    print(f"{args.hotels} hotels, {args.nights} nights, {len(batch.errors)} malformed records reported")
+    print(f"{'per record':<12} {_time_ms(lambda: per_record(vacancies, centroids), args.repeat):8.2f} ms")
+    print(f"{'batch':<12} {_time_ms(lambda: batched(vacancies, centroids), args.repeat):8.2f} ms")
+
+    same = [hotel.hotel_id for hotel in per_record(vacancies, centroids)] == \
+        [hotel.hotel_id for hotel in batched(vacancies, centroids)]
+    print(f"both pick the same hotels: {same}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hotels", type=int, default=500)
+    parser.add_argument("--nights", type=int, default=3)
+    parser.add_argument("--malformed", type=float, default=0.05, help="share of records with a bad field")
+    parser.add_argument("--repeat", type=int, default=20)
+    main(parser.parse_args())
@@ -0,0 +1,42 @@
+"""
+Per-request setup cost of the conversation endpoints: building a new
+TravelItineraryWorkflow (four OpenAI clients, prompt templates, hotel tools)
+for every message versus fetching the shared instance from the factory.
+
+    python -m benchmarks.workflow_setup --iterations 200
+"""
+import os
+import time
+import argparse
+import statistics
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ.setdefault("JTCG_API_KEY", "benchmark")
+
+from app.workflow.travel_itinerary import TravelItineraryWorkflow
+from app.workflow.factory import WorkflowFactory
+
+def _measure(fn, iterations: int):
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1e6)
+    return timings
+
+def _report(label: str, timings) -> None:
+    timings = sorted(timings)
+    p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+    print(f"{label:<26} mean={statistics.mean(timings):10.1f} us  p50={statistics.median(timings):10.1f} us  p99={p99:10.1f} us")
+
+def main(args: argparse.Namespace) -> None:
+    _report("workflow per request", _measure(lambda: TravelItineraryWorkflow(), args.iterations))
+
+    factory = WorkflowFactory()
+    factory.build()
+    _report("shared workflow (factory)", _measure(factory.get, args.iterations))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200)
+    main(parser.parse_args())
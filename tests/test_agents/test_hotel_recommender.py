@@ -0,0 +1,133 @@
+import asyncio
+from datetime import date, timedelta
+
+import pytest
+
+from app.agents.hotel_recommender import HotelRecommenderAgent
+from app.artifacts.context import ContextArtifact
+from app.artifacts.itinerary import ItineraryArtifact
+from app.utils.hotel_inventory import HotelInventory
+from app.workflow.models import DayPlan, Location, TravelItinerary
+
+TAIPEI, YILAN, HUALIEN = 1, 4, 20
+COUNTIES = {TAIPEI: ("臺北市", 25.03, 121.56), YILAN: ("宜蘭縣", 24.75, 121.75), HUALIEN: ("花蓮縣", 23.98, 121.6)}
+
+def _vacancies(county_id):
+    name, latitude, longitude = COUNTIES[county_id]
+    return [
+        {
+            "id": county_id * 100 + n,
+            "name": f"{name}飯店{n}",
+            "latitude": latitude + n * 0.001,
+            "longitude": longitude,
+            "county": {"id": county_id, "name": name},
+            "suitable_room_types": [{"name": "雙人房", "bed_type": "雙人床", "adults": 2, "price": 2000 + n * 100}]
+        }
+        for n in range(5)
+    ]
+
+def _day(day, county_id):
+    name, latitude, longitude = COUNTIES[county_id]
+    return DayPlan(day=day, location=Location(county=name, latitude=latitude, longitude=longitude))
+
+def _itinerary(*county_ids):
+    return ItineraryArtifact(
+        itinerary=TravelItinerary(daily_plans=[_day(day, county_id) for day, county_id in enumerate(county_ids, start=1)]),
+        start_date=date(2026, 11, 1)
+    )
+
+@pytest.fixture
+def agent(monkeypatch, tmp_path):
+    monkeypatch.setenv("JTCG_API_KEY", "test")
+    agent = HotelRecommenderAgent(llm=None, inventory=HotelInventory(path=str(tmp_path / "inventory.sqlite3")))
+    agent.queries = []
+
+    async def check_hotel_vacancies(check_in_date, check_out_date, county_ids):
+        agent.queries.append((check_in_date.date(), county_ids[0]))
+        return _vacancies(county_ids[0])
+
+    agent.check_hotel_vacancies = check_hotel_vacancies
+    return agent
+
+def test_one_query_per_stay(agent):
+    event = asyncio.run(agent.process(_itinerary(TAIPEI, TAIPEI, YILAN, YILAN), context=ContextArtifact(duration=4)))
+
+    assert agent.queries == [(date(2026, 11, 1), TAIPEI), (date(2026, 11, 3), YILAN)]
+    plan = event.content.hotel_plan
+    assert [(night.night_date, night.county_id) for night in plan] == [
+        (date(2026, 11, 1), TAIPEI), (date(2026, 11, 2), TAIPEI), (date(2026, 11, 3), YILAN)
+    ]
+    assert all(night.hotel_ids for night in plan)
+
+def test_failing_stay_leaves_the_others(agent):
+    reported = []
+    rank = agent.ranker.rank
+
+    def failing_rank(table, centroids, **kwargs):
+        if table.latitudes[0] > 25:  # Taipei's hotels
+            raise RuntimeError("ranking failed")
+        return rank(table, centroids, **kwargs)
+
+    agent.ranker = type(agent.ranker)()
+    agent.ranker.rank = failing_rank
+    event = asyncio.run(agent.process(
+        _itinerary(TAIPEI, YILAN, YILAN),
+        on_recommendations=lambda county_id, hotels: reported.append((county_id, len(hotels))),
+        context=ContextArtifact(duration=3)
+    ))
+
+    assert [(night.county_id, bool(night.hotel_ids)) for night in event.content.hotel_plan] == [(TAIPEI, False), (YILAN, True)]
+    assert sorted(reported) == [(TAIPEI, 0), (YILAN, 3)]
+
+def test_update_on_a_later_day_only_queries_changed_stays(agent, monkeypatch):
+    previous = asyncio.run(agent.process(_itinerary(TAIPEI, TAIPEI, YILAN, YILAN), context=ContextArtifact(duration=4))).content
+    agent.queries.clear()
+
+    # The user comes back two days later and moves the last night to Hualien
+    class Later(date):
+        @classmethod
+        def today(cls):
+            return date(2026, 11, 1) + timedelta(days=2)
+
+    monkeypatch.setattr("app.agents.hotel_recommender.date", Later)
+    updated = previous.model_copy(deep=True)
+    updated.itinerary.daily_plans[2] = _day(3, HUALIEN)
+    event = asyncio.run(agent.update_recommendations(updated, previous, context=ContextArtifact(duration=4)))
+
+    assert agent.queries == [(date(2026, 11, 3), HUALIEN)]
+    assert event.content.start_date == date(2026, 11, 1)
+    assert event.content.hotel_plan[:2] == previous.hotel_plan[:2]
+
+def test_itinerary_without_start_date_is_dated_from_its_hotel_plan(agent):
+    previous = asyncio.run(agent.process(_itinerary(TAIPEI, YILAN, YILAN), context=ContextArtifact(duration=3))).content
+    previous.start_date = None
+    agent.queries.clear()
+
+    event = asyncio.run(agent.update_recommendations(previous.model_copy(deep=True), previous, context=ContextArtifact(duration=3)))
+
+    assert agent.queries == []
+    assert event.content.start_date == date(2026, 11, 1)
+
+def test_partial_inventory_falls_back_to_the_api(agent, monkeypatch):
+    api_calls = []
+
+    async def fetch_hotel_details(hotel_name):
+        raise RuntimeError("details unavailable")
+
+    async def make_api_request(endpoint, params=None):
+        api_calls.append(endpoint)
+        return [{"id": 999, "name": "臺北大飯店"}]
+
+    monkeypatch.setattr(agent, "_fetch_hotel_details", fetch_hotel_details)
+    monkeypatch.setattr(agent, "_make_api_request", make_api_request)
+    # Only hotels with a vacancy tomorrow are listed, so Taipei's listing is partial
+    asyncio.run(agent.refresh_inventory([TAIPEI]))
+
+    assert agent.inventory.covers(TAIPEI) and not agent.inventory.covers(TAIPEI, complete=True)
+    assert len(asyncio.run(agent.find_hotels(TAIPEI))) == 5
+    assert asyncio.run(agent.find_hotels(TAIPEI, district="信義區")) is None
+    assert [hotel["id"] for hotel in asyncio.run(agent.search_hotels_by_name("臺北市飯店3"))] == [TAIPEI * 100 + 3]
+    assert api_calls == []
+    # No listed name contains the keyword; a similar name in a partial listing isn't the answer
+    assert asyncio.run(agent.search_hotels_by_name("臺北大飯店")) == [{"id": 999, "name": "臺北大飯店"}]
+    assert api_calls == ["hotel/fuzzy_match"]
@@ -0,0 +1,125 @@
+import json
+import asyncio
+from datetime import date
+
+import pytest
+
+from app.api.models import SessionState
+from app.api.session_codec import HEADER, MAGIC, SessionCodec, _zstd_available
+from app.api.session_manager import SessionManager
+from app.api.session_store import InMemorySessionStore, SQLiteSessionStore
+from app.artifacts.context import ContextArtifact
+from app.artifacts.itinerary import ItineraryArtifact
+from app.config.constants import SESSION_SCHEMA_VERSION
+from app.workflow.models import DayPlan, HotelNight, HotelRecommendation, HotelRoom, Location, TravelItinerary
+
+CODECS = [SessionCodec(compress=False)]
+if _zstd_available():
+    CODECS.append(SessionCodec(compress=True, compression_min_bytes=0))
+
+def _itinerary() -> ItineraryArtifact:
+    location = Location(county="臺北市", district="信義區", latitude=25.03, longitude=121.56)
+    return ItineraryArtifact(
+        itinerary=TravelItinerary(daily_plans=[DayPlan(day=day, location=location) for day in (1, 2, 3)]),
+        start_date=date(2026, 11, 1),
+        hotel_recommendations=[
+            HotelRecommendation(
+                hotel_id="101",
+                name="信義飯店",
+                location=location,
+                rooms=[HotelRoom(room_name="雙人房", bed_types=["雙人床"], facilities=["Wi-Fi"], price=3200.0)]
+            )
+        ],
+        hotel_plan=[
+            HotelNight(day=1, night_date=date(2026, 11, 1), county_id=1, county="臺北市", hotel_ids=["101"]),
+            HotelNight(day=2, night_date=date(2026, 11, 2), county_id=1, county="臺北市", hotel_ids=["101"])
+        ]
+    )
+
+async def _stored_session() -> SessionState:
+    """A session with a hotel plan, stored the way the conversation endpoints store it"""
+    manager = SessionManager(store=InMemorySessionStore())
+    session = await manager.create_session()
+    return await manager.update_session(
+        session.session_id,
+        context=ContextArtifact(destination="台北", duration=3, group_size=2),
+        itinerary=_itinerary()
+    )
+
+def test_stored_session_is_json_safe():
+    session = asyncio.run(_stored_session())
+
+    # The WebSocket endpoint sends the stored itinerary with send_json
+    sent = json.loads(json.dumps({"type": "response", "itinerary": session.itinerary}))
+    assert sent["itinerary"]["hotel_plan"][0]["night_date"] == "2026-11-01"
+    assert sent["itinerary"]["start_date"] == "2026-11-01"
+
+@pytest.mark.parametrize("codec", CODECS)
+def test_round_trip_with_hotel_plan(codec):
+    session = asyncio.run(_stored_session())
+
+    decoded = codec.decode(codec.encode(session))
+
+    assert decoded.model_dump() == session.model_dump()
+    itinerary = ItineraryArtifact(**decoded.itinerary)
+    assert itinerary == _itinerary()
+    assert [night.night_date for night in itinerary.hotel_plan] == [date(2026, 11, 1), date(2026, 11, 2)]
+
+@pytest.mark.parametrize("codec", CODECS)
+def test_trusted_decode_reuses_validated_artifacts(codec):
+    session = asyncio.run(_stored_session())
+    context, itinerary = session.validated_artifacts()
+    snapshot = codec.encode(session)
+
+    decoded = codec.decode(snapshot, trusted=True)
+
+    assert decoded.model_dump() == session.model_dump()
+    assert decoded.context_artifact() is context
+    assert decoded.itinerary_artifact() is itinerary
+    # A validating decode of the same snapshot builds its own artifacts
+    assert codec.decode(snapshot).itinerary_artifact() == itinerary
+    assert codec.decode(snapshot).itinerary_artifact() is not itinerary
+
+def test_trusted_decode_of_another_process_snapshot_validates_artifacts_once():
+    session = asyncio.run(_stored_session())
+    snapshot = SessionCodec(compress=False).encode(session)
+
+    decoded = SessionCodec(compress=False).decode(snapshot, trusted=True)
+
+    assert decoded.validated_artifacts() == (None, None)
+    itinerary = decoded.itinerary_artifact()
+    assert itinerary == _itinerary()
+    assert decoded.itinerary_artifact() is itinerary
+
+def test_changed_fields_are_not_answered_from_stale_artifacts():
+    session = asyncio.run(_stored_session())
+    session.context = {"destination": "花蓮", "duration": 2}
+
+    assert session.context_artifact().destination == "花蓮"
+
+def test_sqlite_store_saves_session_with_hotel_plan(tmp_path):
+    async def round_trip():
+        store = SQLiteSessionStore(path=str(tmp_path / "sessions.sqlite3"))
+        try:
+            session = await _stored_session()
+            await store.save(session)
+            return session, await store.get(session.session_id)
+        finally:
+            await store.close()
+
+    session, loaded = asyncio.run(round_trip())
+
+    assert loaded.model_dump() == session.model_dump()
+
+def test_decodes_legacy_json_rows():
+    session = asyncio.run(_stored_session())
+
+    assert SessionCodec().decode(session.model_dump_json()).model_dump() == session.model_dump()
+
+def test_rejects_newer_schema_versions():
+    codec = SessionCodec(compress=False)
+    snapshot = codec.encode(SessionState())
+    newer = HEADER.pack(MAGIC, SESSION_SCHEMA_VERSION + 1, 0) + snapshot[HEADER.size:]
+
+    with pytest.raises(ValueError):
+        codec.decode(newer)
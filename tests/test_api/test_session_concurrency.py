@@ -0,0 +1,99 @@
+import asyncio
+from uuid import uuid4
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import app.api.endpoints as endpoints
+from app.api.session_concurrency import SessionBusyError, SessionTurnCoordinator, TurnSupersededError
+
+async def _turn(log, name, delay):
+    log.append(f"start {name}")
+    await asyncio.sleep(delay)
+    log.append(f"end {name}")
+    return name
+
+async def _run_overlapping(policy, max_queued=4):
+    """Start a slow turn, then two quick ones while it runs; returns each turn's outcome and the log"""
+    turns = SessionTurnCoordinator(policy=policy, max_queued=max_queued)
+    session_id = uuid4()
+    log = []
+    first = asyncio.create_task(turns.run(session_id, lambda: _turn(log, "first", 0.05)))
+    await asyncio.sleep(0.01)
+    second = asyncio.create_task(turns.run(session_id, lambda: _turn(log, "second", 0.01)))
+    await asyncio.sleep(0)
+    third = asyncio.create_task(turns.run(session_id, lambda: _turn(log, "third", 0.01)))
+    outcomes = await asyncio.gather(first, second, third, return_exceptions=True)
+    assert not turns.is_busy(session_id)
+    return [outcome if isinstance(outcome, str) else type(outcome) for outcome in outcomes], log, turns
+
+def test_queue_runs_turns_in_order():
+    outcomes, log, _ = asyncio.run(_run_overlapping("queue"))
+
+    assert outcomes == ["first", "second", "third"]
+    assert log == ["start first", "end first", "start second", "end second", "start third", "end third"]
+
+def test_queue_rejects_beyond_max_queued():
+    outcomes, _, turns = asyncio.run(_run_overlapping("queue", max_queued=1))
+
+    assert outcomes == ["first", "second", SessionBusyError]
+    assert turns.rejected == 1
+
+def test_reject_refuses_turns_while_one_runs():
+    outcomes, log, turns = asyncio.run(_run_overlapping("reject"))
+
+    assert outcomes == ["first", SessionBusyError, SessionBusyError]
+    assert log == ["start first", "end first"]
+    assert turns.rejected == 2
+
+def test_cancel_previous_runs_only_the_latest():
+    outcomes, log, turns = asyncio.run(_run_overlapping("cancel_previous"))
+
+    assert outcomes == [TurnSupersededError, TurnSupersededError, "third"]
+    assert log == ["start first", "start third", "end third"]
+    assert turns.superseded == 2
+
+def test_sessions_do_not_block_each_other():
+    async def run():
+        turns = SessionTurnCoordinator(policy="reject")
+        log = []
+        return await asyncio.gather(
+            turns.run(uuid4(), lambda: _turn(log, "a", 0.02)),
+            turns.run(uuid4(), lambda: _turn(log, "b", 0.02))
+        )
+
+    assert asyncio.run(run()) == ["a", "b"]
+
+@pytest.fixture
+def websocket_client(monkeypatch):
+    async def process_turn(session_id, message, on_event=None):
+        if on_event is not None:
+            await on_event({"type": "step", "step": message})
+        await asyncio.sleep(0.3 if message == "slow" else 0.01)
+        return {"message": message, "itinerary": None, "status": "in_progress"}
+
+    monkeypatch.setattr(endpoints, "_process_turn", process_turn)
+    api = FastAPI()
+    api.include_router(endpoints.router)
+    return TestClient(api)
+
+def _websocket_turns(client, count):
+    """Send a slow and a quick streamed message on one socket and collect `count` replies"""
+    with client.websocket_connect(f"/ws/conversation/{uuid4()}") as websocket:
+        assert websocket.receive_json()["type"] == "session_created"
+        websocket.send_json({"message": "slow"})
+        websocket.send_json({"message": "quick", "stream": True})
+        return [websocket.receive_json() for _ in range(count)]
+
+@pytest.mark.parametrize("policy, expected", [
+    ("queue", [("response", "slow"), ("step", None), ("response", "quick")]),
+    ("reject", [("error", None), ("response", "slow")]),
+    ("cancel_previous", [("error", None), ("step", None), ("response", "quick")])
+])
+def test_websocket_messages_overlap_running_turns(websocket_client, monkeypatch, policy, expected):
+    monkeypatch.setattr(endpoints, "session_turns", SessionTurnCoordinator(policy=policy))
+
+    replies = _websocket_turns(websocket_client, len(expected))
+
+    assert [(reply["type"], reply.get("message") if reply["type"] == "response" else None) for reply in replies] == expected
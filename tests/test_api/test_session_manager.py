@@ -0,0 +1,76 @@
+import asyncio
+from typing import Dict, Optional
+from uuid import UUID
+
+from app.api.models import SessionState
+from app.api.session_codec import SessionCodec
+from app.api.session_manager import SessionManager
+from app.api.session_store import SessionStore
+from app.artifacts.context import ContextArtifact
+from app.config.constants import HISTORY_SUMMARY_BATCH
+
+class SlowSnapshotStore(SessionStore):
+    """Stores snapshots like the SQLite and Redis stores do, with I/O latency between reads and writes"""
+
+    def __init__(self, latency: float = 0.01):
+        self.latency = latency
+        self.codec = SessionCodec(compress=False)
+        self._snapshots: Dict[UUID, bytes] = {}
+
+    async def get(self, session_id: UUID) -> Optional[SessionState]:
+        await asyncio.sleep(self.latency)
+        snapshot = self._snapshots.get(session_id)
+        return self.codec.decode(snapshot, trusted=True) if snapshot is not None else None
+
+    async def save(self, session: SessionState) -> None:
+        snapshot = self.codec.encode(session)
+        await asyncio.sleep(self.latency)
+        self._snapshots[session.session_id] = snapshot
+
+    async def delete(self, session_id: UUID) -> bool:
+        return self._snapshots.pop(session_id, None) is not None
+
+async def _session_with_pending_summary(manager):
+    session = await manager.create_session()
+    session.pending_summary = [{"role": "user", "content": f"old {n}"} for n in range(HISTORY_SUMMARY_BATCH)]
+    await manager.store.save(session)
+    return session.session_id
+
+def test_summary_and_concurrent_turn_keep_both_changes():
+    async def run():
+        calls = []
+
+        async def summarizer(summary, messages):
+            # Only the first summary succeeds, so a lost one isn't redone by a later run
+            calls.append(messages)
+            return f"summary of {len(messages)} messages" if len(calls) == 1 else None
+
+        manager = SessionManager(store=SlowSnapshotStore(), summarizer=summarizer)
+        session_id = await _session_with_pending_summary(manager)
+
+        async def turn():
+            # Lands while the summary re-reads and saves the session
+            await asyncio.sleep(0.012)
+            await manager.add_message_to_history(session_id, "user", "new message")
+            await manager.update_session(session_id, context=ContextArtifact(destination="花蓮"))
+
+        await asyncio.gather(manager._summarize(session_id), turn())
+        return await manager.get_session(session_id)
+
+    session = asyncio.run(run())
+
+    assert session.history_summary == f"summary of {HISTORY_SUMMARY_BATCH} messages"
+    assert session.pending_summary == []
+    assert session.conversation_history == [{"role": "user", "content": "new message"}]
+    assert session.context["destination"] == "花蓮"
+
+def test_concurrent_history_writes_are_not_lost():
+    async def run():
+        manager = SessionManager(store=SlowSnapshotStore())
+        session_id = (await manager.create_session()).session_id
+        await asyncio.gather(*(manager.add_message_to_history(session_id, "user", str(n)) for n in range(5)))
+        return await manager.get_session(session_id)
+
+    session = asyncio.run(run())
+
+    assert sorted(message["content"] for message in session.conversation_history) == ["0", "1", "2", "3", "4"]
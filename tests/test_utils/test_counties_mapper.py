@@ -0,0 +1,15 @@
+import pytest
+
+from app.utils.counties_mapper import CountyMapper
+from app.utils.gazetteer import taiwan_gazetteer
+from benchmarks.county_mapper import LABELLED_LOCATIONS
+
+@pytest.mark.parametrize("location, county_id", LABELLED_LOCATIONS)
+def test_labelled_locations(location, county_id):
+    assert CountyMapper().get_county_id(location) == county_id
+
+def test_landmark_wins_over_the_short_name_it_starts_with():
+    mapper = CountyMapper(extra_names=taiwan_gazetteer.district_counties())
+
+    assert mapper.find_all("新北投溫泉到新北淡水") == [1, 3]
+    assert [place.county_id for place in taiwan_gazetteer.resolve("新北投溫泉")] == [1]
@@ -0,0 +1,33 @@
+from app.utils.hotel_inventory import HotelInventory
+
+def _records(county_id, names):
+    return [{"id": county_id * 100 + n, "name": name, "facilities": ["免費停車"]} for n, name in enumerate(names)]
+
+def _inventory(tmp_path, complete):
+    path = str(tmp_path / "inventory.sqlite3")
+    HotelInventory.build(path, {1: _records(1, ["信義大飯店", "大安商旅"]), 20: _records(20, ["花蓮海景飯店"])}, complete=complete)
+    inventory = HotelInventory(path)
+    inventory.open()
+    return inventory
+
+def test_counties_are_complete_by_default(tmp_path):
+    inventory = _inventory(tmp_path, complete=None)
+
+    assert inventory.covers(1, complete=True) and inventory.covers(20, complete=True)
+    assert inventory.complete_county_ids() == {1, 20}
+
+def test_partial_listing_is_fresh_but_not_complete(tmp_path):
+    inventory = _inventory(tmp_path, complete={1: False})
+
+    assert inventory.covers(1) and not inventory.covers(1, complete=True)
+    assert inventory.covers(complete=True) and inventory.complete_county_ids() == {20}
+    assert inventory.stats()["partial_counties"] == [1]
+
+def test_similar_names_only_come_from_complete_listings(tmp_path):
+    inventory = _inventory(tmp_path, complete={1: False})
+
+    # Names containing the keyword are found in any fresh county
+    assert [hotel["name"] for hotel in inventory.search("信義")] == ["信義大飯店"]
+    # 信義飯店 shares bigrams with 信義大飯店, but Taipei's listing may lack the hotel meant
+    assert inventory.search("信義飯店") == []
+    assert [hotel["name"] for hotel in inventory.search("花蓮海景大飯店")] == ["花蓮海景飯店"]
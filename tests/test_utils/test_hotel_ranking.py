@@ -0,0 +1,35 @@
+import pytest
+
+from app.config.constants import HOTEL_BUDGET_TIERS
+from app.utils.hotel_ranking import budget_range
+
+@pytest.mark.parametrize("budget, nights, expected", [
+    # Upper bounds and ranges
+    ("每晚3000元", 1, (0.0, 3000.0)),
+    ("預算5000", 1, (0.0, 5000.0)),
+    ("3000-5000", 1, (3000.0, 5000.0)),
+    ("nt$2,500 per night", 1, (0.0, 2500.0)),
+    # Multipliers
+    ("每晚3k", 1, (0.0, 3000.0)),
+    ("一晚2千", 1, (0.0, 2000.0)),
+    # Whole-trip budgets are spread over the nights
+    ("total 20k", 4, (0.0, 5000.0)),
+    ("2晚 總預算8000", 2, (0.0, 4000.0)),
+    # Days, nights, people and dates are not amounts
+    ("5天4夜預算2萬", 4, (0.0, 20000.0)),
+    ("2人預算總共1萬", 4, (0.0, 2500.0)),
+    ("3 nights for 2 people, $150", 3, (0.0, 150.0)),
+    ("2026年11月 每晚2500", 1, (0.0, 2500.0)),
+])
+def test_amounts(budget, nights, expected):
+    assert budget_range(budget, nights) == expected
+
+def test_tier_keywords():
+    assert budget_range("中等") == HOTEL_BUDGET_TIERS["medium"]
+    assert budget_range("想住豪華一點") == HOTEL_BUDGET_TIERS["high"]
+    # Counts alone leave the tier keyword to decide
+    assert budget_range("3天2夜 經濟實惠") == HOTEL_BUDGET_TIERS["low"]
+
+@pytest.mark.parametrize("budget", [None, "", "2人", "5天4夜", "100"])
+def test_no_usable_budget(budget):
+    assert budget_range(budget) is None
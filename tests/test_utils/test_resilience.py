@@ -0,0 +1,97 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.utils.resilience import CircuitOpenError, ResilienceLayer, UpstreamStatusError
+
+def _layer(**overrides):
+    options = dict(
+        max_attempts=1,
+        attempt_timeout=None,
+        hedge_quantile=None,
+        breaker_failures=2,
+        breaker_reset=0.05
+    )
+    options.update(overrides)
+    return ResilienceLayer(**options)
+
+async def _fail():
+    raise httpx.ConnectError("down")
+
+async def _ok():
+    return "ok"
+
+async def _open_breaker(layer):
+    for _ in range(layer.breaker_failures):
+        with pytest.raises(httpx.ConnectError):
+            await layer.call("vacancies", _fail)
+    assert layer.breaker("vacancies").state == "open"
+    with pytest.raises(CircuitOpenError):
+        await layer.call("vacancies", _ok)
+
+def test_breaker_opens_and_a_successful_probe_closes_it():
+    async def run():
+        layer = _layer()
+        await _open_breaker(layer)
+        await asyncio.sleep(layer.breaker_reset)
+        assert await layer.call("vacancies", _ok) == "ok"
+        return layer.breaker("vacancies").state
+
+    assert asyncio.run(run()) == "closed"
+
+def test_failed_probe_reopens_the_breaker():
+    async def run():
+        layer = _layer()
+        await _open_breaker(layer)
+        await asyncio.sleep(layer.breaker_reset)
+        with pytest.raises(httpx.ConnectError):
+            await layer.call("vacancies", _fail)
+        return layer.breaker("vacancies").state
+
+    assert asyncio.run(run()) == "open"
+
+def test_only_one_probe_at_a_time():
+    async def run():
+        layer = _layer()
+        await _open_breaker(layer)
+        await asyncio.sleep(layer.breaker_reset)
+        probe = asyncio.create_task(layer.call("vacancies", lambda: asyncio.sleep(0.05, result="ok")))
+        await asyncio.sleep(0)
+        with pytest.raises(CircuitOpenError):
+            await layer.call("vacancies", _ok)
+        return await probe
+
+    assert asyncio.run(run()) == "ok"
+
+def test_cancelled_probe_frees_the_probe_slot():
+    async def run():
+        layer = _layer()
+        await _open_breaker(layer)
+        await asyncio.sleep(layer.breaker_reset)
+
+        # E.g. the hotel step deadline cancels the probe before it answers
+        probe = asyncio.create_task(layer.call("vacancies", lambda: asyncio.sleep(10)))
+        await asyncio.sleep(0.01)
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+
+        assert layer.breaker("vacancies").state == "half_open"
+        assert await layer.call("vacancies", _ok) == "ok"
+        return layer.breaker("vacancies").state
+
+    assert asyncio.run(run()) == "closed"
+
+def test_client_errors_do_not_open_the_breaker():
+    async def bad_request():
+        raise UpstreamStatusError("bad request", 400)
+
+    async def run():
+        layer = _layer(breaker_failures=1)
+        for _ in range(3):
+            with pytest.raises(UpstreamStatusError):
+                await layer.call("vacancies", bad_request)
+        return layer.breaker("vacancies").state
+
+    assert asyncio.run(run()) == "closed"
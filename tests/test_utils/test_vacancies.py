@@ -0,0 +1,80 @@
+import math
+
+from app.utils.vacancies import parse_vacancies
+
+def _vacancy(hotel_id, price=3000.0, **fields):
+    record = {
+        "id": hotel_id,
+        "name": f"Hotel {hotel_id}",
+        "latitude": 25.03,
+        "longitude": 121.56,
+        "county": {"id": 1, "name": "臺北市"},
+        "district": {"id": 1, "name": "信義區"},
+        "suitable_room_types": [
+            {
+                "name": "雙人房",
+                "bed_type": "雙人床",
+                "adults": 2,
+                "facilities": [{"name": "Wi-Fi"}],
+                "prices": [{"price": price}, {"price": price + 200}]
+            }
+        ]
+    }
+    record.update(fields)
+    return record
+
+def test_valid_payload():
+    batch = parse_vacancies([_vacancy(1), _vacancy(2, price=1500.0)])
+
+    assert not batch.errors
+    assert len(batch) == 2
+    assert batch.table.prices.tolist() == [3100.0, 1600.0]
+    assert batch.table.capacities.tolist() == [2.0, 2.0]
+    assert [hotel.hotel_id for hotel in batch.recommendations([1, 0])] == ["2", "1"]
+
+def test_malformed_records_are_dropped_with_their_errors():
+    payload = [
+        _vacancy(1),
+        _vacancy(2, latitude="unknown"),
+        {"id": 3},  # no name
+        5,
+        None,
+        _vacancy(6)
+    ]
+
+    batch = parse_vacancies(payload)
+
+    assert [record["id"] for record in batch.records] == [1, 6]
+    assert [(error.index, error.hotel_id) for error in batch.errors] == [(1, 2), (2, 3), (3, None), (4, None)]
+    assert [hotel.hotel_id for hotel in batch.recommendations(range(len(batch)))] == ["1", "6"]
+
+def test_records_failing_to_build_are_reported_not_raised():
+    # Only the ranking fields are validated up front; the county is read when the model is built
+    batch = parse_vacancies([_vacancy(1), _vacancy(2, county="臺北市"), _vacancy(3)])
+    assert not batch.errors
+
+    recommendations = batch.recommendations(range(len(batch)))
+
+    assert [hotel.hotel_id for hotel in recommendations] == ["1", "3"]
+    assert [(error.index, error.hotel_id) for error in batch.errors] == [(1, 2)]
+
+def test_missing_ranking_fields_are_nan():
+    batch = parse_vacancies([_vacancy(1, latitude=None, suitable_room_types=None)])
+
+    assert not batch.errors
+    assert math.isnan(batch.table.latitudes[0])
+    assert math.isnan(batch.table.prices[0])
+
+def test_free_room_list_price_is_not_missing():
+    room = {"name": "招待房", "bed_type": "雙人床", "adults": 2, "price": 0}
+    batch = parse_vacancies([_vacancy(1, suitable_room_types=[room])])
+
+    assert not batch.errors
+    assert batch.table.prices[0] == 0.0
+
+def test_payload_that_is_not_a_list():
+    batch = parse_vacancies({"error": "rate limited"})
+
+    assert len(batch) == 0
+    assert [error.index for error in batch.errors] == [-1]
+    assert len(batch.table) == 0
@@ -0,0 +1,47 @@
+import asyncio
+
+import pytest
+
+from app.workflow.events import IntentionEvent
+from app.workflow.models import IntentType
+from app.workflow.travel_itinerary import TravelItineraryWorkflow
+
+@pytest.fixture
+def workflow(monkeypatch):
+    monkeypatch.setenv("JTCG_API_KEY", "test")
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    workflow = TravelItineraryWorkflow(speculative_context=True, prefetch_hotels=False, timeout=None)
+    workflow.extractions = []
+    workflow.intention_published = asyncio.Event()
+
+    async def detect(query):
+        return IntentionEvent(event_id="1", intent_type=IntentType.NEW_TRIP.value, confidence=1.0)
+
+    async def extract(query):
+        workflow.extractions.append(asyncio.current_task())
+        await asyncio.sleep(10)
+
+    publish = workflow._publish
+
+    async def publish_slowly(ctx, event):
+        # Holds the run after the intention is known, before a step takes the speculation over
+        if isinstance(event, IntentionEvent):
+            workflow.intention_published.set()
+            await asyncio.sleep(10)
+        return await publish(ctx, event)
+
+    monkeypatch.setattr(workflow.intention_agent, "process", detect)
+    monkeypatch.setattr(workflow.context_agent, "process", extract)
+    monkeypatch.setattr(workflow, "_publish", publish_slowly)
+    return workflow
+
+def test_cancelling_between_steps_cancels_the_speculative_context(workflow):
+    async def run():
+        handler = workflow.run(query="我想去花蓮玩三天")
+        await workflow.intention_published.wait()
+        await workflow.cancel(handler)
+        await asyncio.sleep(0)
+        return [extraction.cancelled() for extraction in workflow.extractions]
+
+    assert asyncio.run(run()) == [True]
+    assert workflow.speculation_metrics()["wasted"] == 1